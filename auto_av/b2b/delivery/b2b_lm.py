@@ -3,7 +3,7 @@ from collections import OrderedDict
 
 from django.db import transaction
 
-from network.models import Hub
+from network.reference import network_reference
 from opv2.dto import BulkAVDTO
 from opv2.services import OrderService
 from ...models import OrderB2B, StageChoices
@@ -12,19 +12,11 @@ logger = logging.getLogger(__name__)
 
 
 def __get_hub_b2b_coordinates(hub_id):
-    try:
-        # Fetch the Hub object by its ID
-        hub = Hub.objects.get(id=hub_id)
-
-        # Check if the hub has a related HubB2B object
-        if hub.b2b_hub:
-            latitude = hub.b2b_hub.latitude
-            longitude = hub.b2b_hub.longitude
-            return latitude, longitude
-        else:
-            return None, None
-    except Hub.DoesNotExist:
+    # Resolved from the in-memory network reference, without a query per order
+    b2b_hub = network_reference.b2b_hub_of(hub_id)
+    if b2b_hub is None:
         return None, None
+    return b2b_hub.latitude, b2b_hub.longitude
 
 
 def address_verification_to_b2b_lm():
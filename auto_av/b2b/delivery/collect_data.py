@@ -1,30 +1,61 @@
 import logging
+from datetime import timezone as dt_timezone
+from typing import List, Optional
 
+import pandas as pd
 from django.db.models import Q
 from django.db.models.functions import Lower
+from django.utils import timezone
 from simple_history.utils import bulk_create_with_history
 
 from network.models import Zone
 from opv2.models import ShipperB2B
 from opv2.services import OrderService
+from stos.utils import configs, parse_datetime
 from ...models import OrderB2B, StageChoices
 
 logger = logging.getLogger(__name__)
 
+# End of the creation range searched by the last successful run, in UTC
+LAST_SEARCH_CONFIG_KEY = 'AUTO_AV_B2B_LM_LAST_SEARCH'
+# End of the last successful full search, in UTC
+LAST_FULL_SEARCH_CONFIG_KEY = 'AUTO_AV_B2B_LM_LAST_FULL_SEARCH'
+# The search filters on the creation time, an address verified after a run passed its creation time is only
+# found by a full search of the last 60 days, run at least this often
+FULL_SEARCH_INTERVAL = timezone.timedelta(hours=6)
+LAST_SEARCH_FORMAT = '%Y-%m-%d %H:%M:%S'
 
-def collect_order_av_to_b2b_lm():
-    # Get all shipper b2b ids
-    shipper_b2b_ids = list(ShipperB2B.objects.values_list('shipper_id', flat=True))
 
-    order_service = OrderService(logger)
+def __load_last_search(key: str) -> Optional[timezone.datetime]:
+    value = parse_datetime(configs.get(key))
+    # Stored in UTC, compared with the aware end of the range
+    return timezone.make_aware(value, dt_timezone.utc) if value else None
+
+
+def __save_last_search(key: str, value: timezone.datetime):
+    configs.set(key, value.astimezone(dt_timezone.utc).strftime(LAST_SEARCH_FORMAT))
 
-    stt_code, orders = order_service.parcel_address_search(shipper_b2b_ids, df=True)
 
-    if stt_code != 200:
-        logger.error(f"Error when get parcel address search: {orders}")
-        return
+def collect_order_av_to_b2b_lm(incremental: bool = True):
+    """
+    Collect the verified B2B orders delivered by a NJV hub into the B2B AV queue.
 
-    logger.info(f"Got {len(orders)} orders")
+    Logic:
+    1. Stream the parcel address search of all B2B shippers in chunks
+    2. Drop orders in B2B zones or in hub VIET, and orders already in the system
+    3. Create the new Order B2B records chunk by chunk
+    4. Record the end of the searched range for the next incremental run
+
+    Args:
+        incremental (bool): Only search the records created since the last successful run, unless the last
+            full search is older than FULL_SEARCH_INTERVAL. A full run searches the last 60 days and also picks
+            up addresses verified late.
+
+    Raises:
+        Exception: If a page of the search or the creation of the records fails, the last search is not advanced.
+    """
+    # Get all shipper b2b ids
+    shipper_b2b_ids = list(ShipperB2B.objects.values_list('shipper_id', flat=True))
 
     # Get all zones b2b
     zone_ids = list(Zone.objects.annotate(
@@ -34,33 +65,59 @@ def collect_order_av_to_b2b_lm():
     ).values_list('id', flat=True))
     logger.info(f"Have {len(zone_ids)} zones b2b")
 
-    orders = orders[~orders['zone_id'].isin(zone_ids)].reset_index(drop=True)
+    end_date = timezone.now() - timezone.timedelta(minutes=10)
+    last_full_search = __load_last_search(LAST_FULL_SEARCH_CONFIG_KEY)
+    if last_full_search is None or end_date - last_full_search >= FULL_SEARCH_INTERVAL:
+        incremental = False
+    start_date = __load_last_search(LAST_SEARCH_CONFIG_KEY) if incremental else None
+    logger.info(f"Searching orders created from {start_date or '60 days ago'} to {end_date}")
+
+    order_service = OrderService(logger)
+
+    total, created_total = 0, 0
+    for orders in order_service.iter_parcel_address_search(shipper_b2b_ids, start_date=start_date, end_date=end_date):
+        total += len(orders)
+        created_total += __create_order_b2b(orders, zone_ids)
+
+    __save_last_search(LAST_SEARCH_CONFIG_KEY, end_date)
+    if not incremental:
+        __save_last_search(LAST_FULL_SEARCH_CONFIG_KEY, end_date)
+    logger.info(f"Got {total} orders, created {created_total} new Order B2B records.")
+
+
+def __create_order_b2b(orders: pd.DataFrame, zone_ids: List[int]) -> int:
+    orders = orders[~orders['zone_id'].isin(zone_ids)]
 
     # Filter not hub VIET (ID: 1)
-    orders = orders[orders['hub_id'] != 1].reset_index(drop=True)
+    orders = orders[orders['hub_id'] != 1]
+
+    # Windows share their boundaries, drop the records seen twice
+    orders = orders.drop_duplicates(subset='tracking_id').reset_index(drop=True)
 
     logger.info(f"Filtered {len(orders)} orders")
 
-    exiting_records = list(OrderB2B.objects.filter(
+    if orders.empty:
+        return 0
+
+    exiting_records = set(OrderB2B.objects.filter(
         Q(tracking_id__in=orders['tracking_id'].tolist())
         & Q(stage__in=[StageChoices.IN_QUEUE, StageChoices.NOT_VERIFIED, StageChoices.B2B_LM_AV])
     ).values_list('tracking_id', flat=True).distinct())
 
     new_records = []
-    for index, order in orders.iterrows():
+    for order in orders.itertuples(index=False):
         try:
-            tracking_id = order['tracking_id']
-            if tracking_id in exiting_records:
-                logger.info(f"Order {tracking_id} is already in the system.")
+            if order.tracking_id in exiting_records:
+                logger.info(f"Order {order.tracking_id} is already in the system.")
                 continue
             order_b2b = OrderB2B(
-                tracking_id=order['tracking_id'],
-                order_id=order['order_id'],
-                shipper_id=order['global_shipper_id'],
-                waypoint=order['waypoint_id'],
-                address=f"{order['address_one']} {order['address_two']}",
-                zone_id=order['zone_id'],
-                hub_id=order['hub_id'],
+                tracking_id=order.tracking_id,
+                order_id=order.order_id,
+                shipper_id=order.global_shipper_id,
+                waypoint=order.waypoint_id,
+                address=f"{order.address_one} {order.address_two}",
+                zone_id=order.zone_id,
+                hub_id=order.hub_id,
             )
             new_records.append(order_b2b)
         except Exception as e:
@@ -70,6 +127,7 @@ def collect_order_av_to_b2b_lm():
     try:
         created = bulk_create_with_history(new_records, OrderB2B, batch_size=1000, ignore_conflicts=True)
         logger.info(f"Created {len(created)} new Order B2B records.")
+        return len(created)
     except Exception as e:
         logger.error(f"Error when create order b2b: {e}")
-        return
+        raise e
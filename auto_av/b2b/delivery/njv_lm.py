@@ -1,18 +1,28 @@
 import logging
 from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
 
-import pandas as pd
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import Q, Count
+from django.db.models import Q, Exists, OuterRef
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
 
-from network.models import Zone
+from network.reference import network_reference
 from opv2.base.order import GranularStatusChoices
 from opv2.dto import BulkAVDTO
 from opv2.services import OrderService
+from stos.utils import run_concurrently
 from ...models import OrderB2B, StageChoices
 
 logger = logging.getLogger(__name__)
 
+PARCEL_SIZE_CACHE_KEY = 'auto_av_parcel_size_{order_id}'
+PARCEL_SIZE_CACHE_TIMEOUT = 60 * 60 * 24 * 30  # 30 days, the first DWS of an order never changes
+
+# Number of orders whose events are fetched in parallel on OPv2
+EVENTS_MAX_WORKERS = 10
+
 
 def update_order_info():
     orders = OrderB2B.objects.filter(
@@ -54,32 +64,89 @@ def update_order_info():
         logger.error(f"Error when updating order info: {e}")
 
 
-def __get_first_dws(data):
-    df = pd.DataFrame(data)
+def _first_dws_parcel_size(events: Iterable[dict]) -> Optional[Any]:
+    """
+    Scan the events of an order for the first DWS scan and return the parcel size it recorded.
+
+    The DWS scan is the first `HUB_INBOUND_SCAN` made with `CLIENT_CREDENTIALS`, the scan stops at the first match.
+
+    Args:
+        events (Iterable[dict]): The events of the order, oldest first.
 
-    # Filter DWS
-    df = df[(df['type'] == 'HUB_INBOUND_SCAN') & (df['user_grant_type'] == 'CLIENT_CREDENTIALS')].reset_index(drop=True)
+    Returns:
+        Optional[Any]: The parcel size ID, or None if the order has no DWS scan.
+    """
+    first_dws = next(
+        (
+            event for event in events
+            if event.get('type') == 'HUB_INBOUND_SCAN' and event.get('user_grant_type') == 'CLIENT_CREDENTIALS'
+        ),
+        None
+    )
 
-    if df.empty:
+    if first_dws is None:
         return None
 
-    # First DWS
-    parcel_size_id = (df['data'][0]).get('parcel_size_id').get('new_value')
+    return ((first_dws.get('data') or {}).get('parcel_size_id') or {}).get('new_value')
+
+
+def resolve_parcel_sizes(order_ids: List[int]) -> Dict[int, Any]:
+    """
+    Resolve the parcel size of the first DWS scan for many orders.
+
+    The first DWS never changes, so resolved sizes are cached per order ID and only the
+    missing orders have their events fetched, concurrently.
+
+    Args:
+        order_ids (List[int]): The OPv2 order IDs.
+
+    Returns:
+        Dict[int, Any]: The parcel size ID by order ID, orders without a DWS scan are left out.
+    """
+    cache_keys = {order_id: PARCEL_SIZE_CACHE_KEY.format(order_id=order_id) for order_id in order_ids}
+    cached = cache.get_many(list(cache_keys.values()))
+    parcel_sizes = {order_id: cached[key] for order_id, key in cache_keys.items() if key in cached}
+
+    missing_order_ids = [order_id for order_id in cache_keys if order_id not in parcel_sizes]
+    if not missing_order_ids:
+        return parcel_sizes
+
+    order_svc = OrderService(logger)
+
+    def get_parcel_size(order_id: int) -> Optional[Any]:
+        stt_code, result = order_svc.get_events(order_id)
+
+        if stt_code != 200:
+            logger.error(f"Error when get order history {order_id}: {result}")
+            return None
+
+        return _first_dws_parcel_size(result)
+
+    results = run_concurrently(get_parcel_size, missing_order_ids, max_workers=EVENTS_MAX_WORKERS)
+    resolved = {
+        order_id: parcel_size
+        for order_id, parcel_size in zip(missing_order_ids, results)
+        if parcel_size is not None
+    }
 
-    return parcel_size_id
+    if resolved:
+        cache.set_many({cache_keys[order_id]: parcel_size for order_id, parcel_size in resolved.items()},
+                       timeout=PARCEL_SIZE_CACHE_TIMEOUT)
+
+    parcel_sizes.update(resolved)
+    return parcel_sizes
 
 
 def update_parcel_size():
-    orders = (
-        OrderB2B.objects.values('mps_id')
-        .annotate(mps_count=Count('mps_id'))
-        .filter(
-            Q(mps_count=1)
-        )
+    # Only single-parcel orders, i.e. no other order shares their MPS
+    other_parcels_in_mps = OrderB2B.objects.filter(
+        Q(mps_id=OuterRef('mps_id'))
+        & ~Q(pk=OuterRef('pk'))
     )
 
-    final_orders = OrderB2B.objects.filter(
-        Q(mps_id__in=[order['mps_id'] for order in orders])
+    final_orders = list(OrderB2B.objects.filter(
+        Q(mps_id__isnull=False)
+        & ~Exists(other_parcels_in_mps)
         & Q(stage=StageChoices.B2B_AV)
         & ~Q(shipper_id__in=[10180487])
         & Q(parcel_size__isnull=True)
@@ -88,38 +155,42 @@ def update_parcel_size():
             GranularStatusChoices.cancelled,
             GranularStatusChoices.rts
         ])
-    )
+    ))
 
-    if not final_orders.exists():
+    if not final_orders:
         logger.info("No orders to update")
         return
 
-    order_svc = OrderService(logger)
+    parcel_sizes = resolve_parcel_sizes([order.order_id for order in final_orders if order.order_id])
+
+    update = []
     for order in final_orders:
-        stt_code, result = order_svc.get_events(order.order_id)
+        parcel_size_id = parcel_sizes.get(order.order_id)
 
-        if stt_code != 200:
-            logger.error(f"Error when get order history: {result}")
+        if parcel_size_id is None:
+            logger.error(f"Order {order.tracking_id} not found DWS")
             continue
 
-        parcel_size_id = __get_first_dws(result)
+        order.parcel_size = parcel_size_id
+        order.updated_date = timezone.now()
+        update.append(order)
 
-        if parcel_size_id is not None:
-            order.parcel_size = parcel_size_id
-            order.save()
-        else:
-            logger.error(f"Order {order.tracking_id} not found DWS")
+    if not update:
+        return
+
+    try:
+        success = bulk_update_with_history(update, OrderB2B, ['parcel_size', 'updated_date'], batch_size=1000)
+        logger.info(f"Updated parcel size of {success}/{len(final_orders)} orders")
+    except Exception as e:
+        logger.error(f"Error when updating parcel size: {e}")
 
 
 def __get_zone_njv_coordinates(zone_id):
-    try:
-        # Fetch the Hub object by its ID
-        hub = Zone.objects.get(id=zone_id)
-        latitude = hub.latitude
-        longitude = hub.longitude
-        return latitude, longitude
-    except Zone.DoesNotExist:
+    # Resolved from the in-memory network reference, without a query per order
+    zone = network_reference.zone(zone_id)
+    if zone is None:
         return None, None
+    return zone.latitude, zone.longitude
 
 
 def address_verification_to_njv_lm():
@@ -193,6 +264,6 @@ def test():
     order_sv = OrderService(logger)
     stt_code, result = order_sv.get_events(379114498)
 
-    parcel_size_id = __get_first_dws(result)
+    parcel_size_id = _first_dws_parcel_size(result)
 
     print(parcel_size_id)
@@ -0,0 +1,171 @@
+import logging
+import time
+import uuid
+from typing import Callable, Optional
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def _redis_client():
+    """
+    Get the Redis client behind the default cache, None when the cache is not backed by Redis.
+    """
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except (ImportError, NotImplementedError):
+        return None
+
+
+class CredentialBroker:
+    """
+    Coordinate the refresh of a credential shared by every worker process.
+
+    The credential is stored in the cache under `cache_key`, next to a version number bumped on every refresh.
+    When the credential expires, a single refresher is elected per credential through a lock in the cache, it
+    sends the alert once and polls the source until a new credential lands, then publishes it on a Redis
+    pub/sub channel. The other processes block on that channel until the version changes or the wait times out.
+
+    Attributes:
+        name (str): Name of the credential, used in the lock, alert and channel keys.
+        cache_key (str): Cache key of the credential.
+        timeout (int): Seconds the credential stays cached.
+        wait_timeout (int): Seconds a refresh waits for a new credential before giving up. Defaults to 60.
+        poll_interval (int): Seconds between two reads of the source by the refresher. Defaults to 10.
+    """
+
+    def __init__(self, name: str, cache_key: str, timeout: int, wait_timeout: int = 60, poll_interval: int = 10,
+                 logger: logging.Logger = logger):
+        self.name = name
+        self.cache_key = cache_key
+        self.timeout = timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._logger = logger
+
+        self._version_key = f'{cache_key}:version'
+        self._lock_key = f'credential:{name}:refresh'
+        self._channel = f'credential:{name}'
+
+    @property
+    def value(self) -> Optional[str]:
+        """
+        The current credential, None if not cached.
+        """
+        return cache.get(self.cache_key)
+
+    @property
+    def version(self) -> int:
+        """
+        The number of refreshes of the credential, 0 if never refreshed.
+        """
+        return cache.get(self._version_key, 0)
+
+    def publish(self, value: str) -> int:
+        """
+        Store a new credential and notify the waiting processes.
+
+        Args:
+            value (str): The new credential.
+
+        Returns:
+            int: The new version of the credential.
+        """
+        cache.add(self._version_key, 0, timeout=None)
+        cache.set(self.cache_key, value, timeout=self.timeout)
+        version = cache.incr(self._version_key)
+
+        client = _redis_client()
+        if client is not None:
+            client.publish(self._channel, version)
+        return version
+
+    def wait(self, version: int, timeout: float) -> bool:
+        """
+        Block until the credential is refreshed past a version.
+
+        Args:
+            version (int): The version seen as expired.
+            timeout (float): Seconds to wait at most.
+
+        Returns:
+            bool: True if a newer credential was published, False on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        client = _redis_client()
+        if client is None:
+            # Without Redis there is no channel to block on, the version is polled instead
+            while self.version == version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(1.0, remaining))
+            return True
+
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._channel)
+        try:
+            while True:
+                # Checked after subscribing, so a refresh landing in between is not missed
+                if self.version != version:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                pubsub.get_message(timeout=remaining)
+        finally:
+            pubsub.close()
+
+    def refresh(self, fetch: Callable[[], str], on_expired: Callable[[Optional[str]], None] = None,
+                on_updated: Callable[[str], None] = None) -> bool:
+        """
+        Refresh the expired credential once across the processes.
+
+        The elected refresher reads the source right away, alerts once per expired version when the source
+        still holds the expired credential, and polls it until a new credential appears or `wait_timeout`
+        elapses. The other processes wait for the refresher to publish.
+
+        Args:
+            fetch (Callable[[], str]): Reads the credential from its source, e.g. the configs Google Sheet.
+            on_expired (Callable[[Optional[str]], None], optional): Alerts that the credential must be updated.
+            on_updated (Callable[[str], None], optional): Notifies that a new credential was published.
+
+        Returns:
+            bool: True if a new credential is available, False on timeout.
+        """
+        seen_version = self.version
+        expired = self.value
+
+        owner = uuid.uuid4().hex
+        if not cache.add(self._lock_key, owner, timeout=self.wait_timeout + self.poll_interval):
+            self._logger.info(f"{self.name} credential is being refreshed by another process, waiting...")
+            return self.wait(seen_version, self.wait_timeout)
+
+        try:
+            if self.version != seen_version:
+                return True
+
+            deadline = time.monotonic() + self.wait_timeout
+            while True:
+                self._logger.info(f"Attempting to refresh the {self.name} credential...")
+                value = fetch()
+                if value and value != expired:
+                    version = self.publish(value)
+                    self._logger.info(f"{self.name} credential refreshed to version {version}.")
+                    if on_updated:
+                        on_updated(value)
+                    return True
+
+                if on_expired and cache.add(f'credential:{self.name}:alerted:{seen_version}', True, timeout=self.timeout):
+                    on_expired(expired)
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._logger.warning(f"{self.name} credential not updated after {self.wait_timeout}s.")
+                    return False
+                time.sleep(min(self.poll_interval, remaining))
+        finally:
+            if cache.get(self._lock_key) == owner:
+                cache.delete(self._lock_key)
@@ -0,0 +1,90 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import DatabaseError, InterfaceError, connections
+from django.db.backends.signals import connection_created
+
+from .metrics import DB_CONNECTIONS_OPENED, DB_CONNECTIONS_RECYCLED, DB_CONNECTIONS_REUSED
+
+logger = logging.getLogger(__name__)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    DB_CONNECTIONS_OPENED.labels(connection.alias).inc()
+
+
+def track_connections():
+    """
+    Count the database connections opened by the process, e.g. from the worker process init.
+    """
+    connection_created.connect(_on_connection_created, dispatch_uid='stos_db_connections_opened')
+
+
+def recycle_connections():
+    """
+    Close the connections of the current thread which are broken or older than CONN_MAX_AGE, and keep the
+    others for the next task. With CONN_HEALTH_CHECKS the kept connections are pinged before their next query.
+
+    Called at the task boundaries, like Django does at the request boundaries.
+    """
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is None:
+            continue
+        try:
+            connection.close_if_unusable_or_obsolete()
+        except (InterfaceError, DatabaseError) as e:
+            logger.warning(f"Error closing the database connection {connection.alias}: {e}")
+
+        if connection.connection is None:
+            DB_CONNECTIONS_RECYCLED.labels(connection.alias).inc()
+        else:
+            DB_CONNECTIONS_REUSED.labels(connection.alias).inc()
+
+
+def close_connections():
+    """
+    Close every connection of the current thread.
+    """
+    for connection in connections.all(initialized_only=True):
+        try:
+            connection.close()
+        except (InterfaceError, DatabaseError) as e:
+            logger.warning(f"Error closing the database connection {connection.alias}: {e}")
+
+
+def _call_recycling(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        recycle_connections()
+
+
+def _close_at_barrier(barrier: threading.Barrier):
+    # Holding every thread at the barrier makes each of them run exactly one of the closing calls
+    try:
+        barrier.wait(timeout=30)
+    except threading.BrokenBarrierError:
+        pass
+    close_connections()
+
+
+class DatabaseThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    Thread pool whose calls may use the database.
+
+    Django connections belong to the thread which opened them. The connections of a pool thread are recycled
+    after each call, like at a task boundary, and closed in every thread when the pool shuts down, so the
+    threads do not leave connections open on the server.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(_call_recycling, fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        threads = len(self._threads)
+        if wait and not cancel_futures and threads:
+            barrier = threading.Barrier(threads)
+            for _ in range(threads):
+                super().submit(_close_at_barrier, barrier)
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
@@ -0,0 +1,267 @@
+import contextvars
+import functools
+import gc
+import logging
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+TRACE_CACHE_KEY = 'task_memory:trace:{task_name}'
+CHUNKED_CACHE_KEY = 'memory_budget:chunked:{name}'
+
+# Seconds between the checks of the traced memory of a run, its allocation sites are captured at its peak
+SAMPLE_INTERVAL = 1
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Per-process accounting is only meaningful when a process runs one task at a time,
+# it is enabled in the prefork pool processes by the worker_process_init signal
+tracking_enabled = False
+
+
+def current_rss() -> int:
+    """
+    Get the resident set size of the process in bytes, the peak RSS where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """
+    Get the highest resident set size of the process so far in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux, in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, limit: int = 10) -> List[dict]:
+    """
+    Get the allocation sites holding the most memory in a tracemalloc snapshot.
+
+    Returns:
+        List[dict]: The sites, e.g. {'site': 'sla_tool/handler/shopee.py:226', 'size_kb': 10240, 'count': 5000}.
+    """
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    base_dir = f'{settings.BASE_DIR}{os.sep}'
+    sites = []
+    for stat in snapshot.statistics('lineno')[:limit]:
+        frame = stat.traceback[0]
+        sites.append({
+            'site': f'{frame.filename.removeprefix(base_dir)}:{frame.lineno}',
+            'size_kb': round(stat.size / 1024),
+            'count': stat.count,
+        })
+    return sites
+
+
+@dataclass
+class TaskMemoryUsage:
+    rss_before: int
+    rss_after: int
+    peak: int
+    allocations: Optional[List[dict]] = None
+
+    @property
+    def growth(self) -> int:
+        """
+        The RSS added by the run at its peak, in bytes.
+        """
+        return self.peak - self.rss_before
+
+
+class TaskMemoryTracker:
+    """
+    Memory accounting of the task run by a pool process.
+
+    The peak RSS of a run is the new high-water mark of the process when the run raised it, the larger of
+    its start and end RSS otherwise. A run crossing the thresholds flags its task name for `TASK_MEMORY_TRACE_TTL`
+    seconds, the next run of the task takes the flag and is traced with tracemalloc to record its top allocation sites.
+    """
+
+    def __init__(self, task_name: str):
+        self.task_name = task_name
+        self.tracing = False
+        self._rss_before = 0
+        self._peak_before = 0
+        self._stopped = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._traced_peak = (0, None)
+
+    def start(self):
+        self._rss_before = current_rss()
+        self._peak_before = peak_rss()
+        trace_key = TRACE_CACHE_KEY.format(task_name=self.task_name)
+        # The flag is taken by a single run, tracemalloc slows the traced run down
+        if not tracemalloc.is_tracing() and cache.get(trace_key) and cache.delete(trace_key):
+            tracemalloc.start(settings.TASK_MEMORY_TRACE_FRAMES)
+            self.tracing = True
+            self._sampler = threading.Thread(target=self._sample, name='task-memory-sampler', daemon=True)
+            self._sampler.start()
+
+    def _capture(self):
+        traced, _ = tracemalloc.get_traced_memory()
+        # Snapshots are costly, a new one is only taken 10% above the previous peak
+        if traced > self._traced_peak[0] * 1.1:
+            self._traced_peak = (traced, top_allocations(tracemalloc.take_snapshot(), settings.TASK_MEMORY_TOP_ALLOCATIONS))
+
+    def _sample(self):
+        # Most of the allocations of a run are released by its end, the sites are captured at the traced peak
+        while not self._stopped.wait(SAMPLE_INTERVAL):
+            try:
+                self._capture()
+            except Exception as e:
+                logger.error(f"Failed to capture the allocations of task {self.task_name}: {e}")
+                return
+
+    def stop(self) -> TaskMemoryUsage:
+        rss_after = current_rss()
+        peak_after = peak_rss()
+        usage = TaskMemoryUsage(
+            rss_before=self._rss_before,
+            rss_after=rss_after,
+            peak=peak_after if peak_after > self._peak_before else max(self._rss_before, rss_after),
+        )
+        if self.tracing:
+            self._stopped.set()
+            self._sampler.join()
+            try:
+                self._capture()
+                usage.allocations = self._traced_peak[1]
+            finally:
+                tracemalloc.stop()
+                self.tracing = False
+        return usage
+
+    @staticmethod
+    def exceeded(usage: TaskMemoryUsage) -> bool:
+        peak_threshold = settings.TASK_MEMORY_PEAK_THRESHOLD_MB
+        growth_threshold = settings.TASK_MEMORY_GROWTH_THRESHOLD_MB
+        return bool(
+            (peak_threshold and usage.peak >= peak_threshold * MB)
+            or (growth_threshold and usage.growth >= growth_threshold * MB)
+        )
+
+    def flag(self):
+        """
+        Trace the allocations of the next run of the task.
+        """
+        cache.set(TRACE_CACHE_KEY.format(task_name=self.task_name), True, timeout=settings.TASK_MEMORY_TRACE_TTL)
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+@dataclass
+class _Budget:
+    name: str
+    limit: int
+    rss_before: int
+    chunked: bool
+
+
+_budget: contextvars.ContextVar[Optional[_Budget]] = contextvars.ContextVar('memory_budget', default=None)
+
+
+def check_memory_budget():
+    """
+    Raise when the handler running under `@memory_budget` grew the RSS past its budget.
+
+    Call it right after loading a large dataset and before writing anything, so a handler re-run in
+    chunked mode does not repeat side effects. Does nothing outside of a budget.
+
+    Raises:
+        MemoryBudgetExceeded: If the budget is exceeded.
+    """
+    budget = _budget.get()
+    if budget is None:
+        return
+
+    growth = current_rss() - budget.rss_before
+    if growth > budget.limit:
+        raise MemoryBudgetExceeded(
+            f"{budget.name} used {growth / MB:.0f} MB over its {budget.limit / MB:.0f} MB budget"
+            + (" in chunked mode" if budget.chunked else "")
+        )
+
+
+def memory_budget(limit_mb: int, chunk_size: int = None) -> Callable:
+    """
+    Bound the memory a handler may add to the process.
+
+    The handler calls `check_memory_budget()` at its checkpoints. Without `chunk_size` the handler fails
+    fast with MemoryBudgetExceeded when a checkpoint is over the budget. With `chunk_size` the handler
+    accepts a `chunk_size` keyword (None loading everything at once): it is re-run with `chunk_size` when
+    over the budget, and its next runs start in chunked mode for `MEMORY_BUDGET_CHUNKED_TTL` seconds.
+
+    Checkpoints of the first pass should come before any write, so the re-run does not repeat them. A
+    MemoryBudgetExceeded raised in chunked mode fails the handler and keeps the chunks written before it,
+    each chunk must be idempotent (e.g. an update of the orders of the chunk) so a retry writes them again.
+
+    Example:
+        @memory_budget(512, chunk_size=5000)
+        def update_orders(chunk_size: int = None):
+            for chunk in chunk_list(tracking_ids, chunk_size or len(tracking_ids)):
+                orders = search(chunk)
+                check_memory_budget()
+                ...
+
+    Args:
+        limit_mb (int): The RSS growth allowed to the handler, in MB.
+        chunk_size (int, optional): The chunk size of the chunked mode. Defaults to None, failing fast.
+    """
+
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        chunked_key = CHUNKED_CACHE_KEY.format(name=name)
+
+        def run(args, kwargs, chunked: bool):
+            token = _budget.set(_Budget(name, limit_mb * MB, current_rss(), chunked))
+            try:
+                if chunked:
+                    return func(*args, **{**kwargs, 'chunk_size': chunk_size})
+                return func(*args, **kwargs)
+            finally:
+                _budget.reset(token)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if chunk_size is None or 'chunk_size' in kwargs:
+                return run(args, kwargs, chunked=False)
+
+            if cache.get(chunked_key):
+                return run(args, kwargs, chunked=True)
+
+            try:
+                return run(args, kwargs, chunked=False)
+            except MemoryBudgetExceeded as e:
+                logger.warning(f"{e}, running it again in chunks of {chunk_size}")
+                cache.set(chunked_key, True, timeout=settings.MEMORY_BUDGET_CHUNKED_TTL)
+
+            # Outside of the except block, the traceback holding the loaded data is released first
+            gc.collect()
+            return run(args, kwargs, chunked=True)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,163 @@
+import logging
+import os
+import re
+import time
+from contextlib import ContextDecorator
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, start_http_server
+from prometheus_client import multiprocess
+
+logger = logging.getLogger(__name__)
+
+# Buckets from 10ms to 30min, tasks and stages range from quick lookups to full sheet syncs
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+HTTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+TASK_DURATION = Histogram(
+    'stos_task_duration_seconds', 'Duration of Celery tasks',
+    ['task', 'outcome'], buckets=DURATION_BUCKETS
+)
+TASK_RETRIES = Counter('stos_task_retries_total', 'Retries of Celery tasks', ['task'])
+
+# Buckets from 64MB to 8GB
+MEMORY_BUCKETS = tuple(2 ** power * 1024 * 1024 for power in range(6, 14))
+TASK_PEAK_RSS = Histogram(
+    'stos_task_peak_rss_bytes', 'Peak resident memory of the pool process during Celery tasks',
+    ['task'], buckets=MEMORY_BUCKETS
+)
+TASK_MEMORY_EXCEEDED = Counter(
+    'stos_task_memory_exceeded_total', 'Celery task runs over the peak RSS or RSS growth threshold', ['task']
+)
+
+STAGE_DURATION = Histogram(
+    'stos_stage_duration_seconds', 'Duration of the sub-steps of tasks',
+    ['stage', 'outcome'], buckets=DURATION_BUCKETS
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    'stos_http_request_duration_seconds', 'Latency of the requests to external APIs',
+    ['service', 'method', 'endpoint'], buckets=HTTP_BUCKETS
+)
+HTTP_RESPONSES = Counter(
+    'stos_http_responses_total', 'Responses of external APIs by status code',
+    ['service', 'method', 'endpoint', 'status']
+)
+
+DB_CONNECTIONS_OPENED = Counter('stos_db_connections_opened_total', 'Database connections opened', ['alias'])
+DB_CONNECTIONS_RECYCLED = Counter(
+    'stos_db_connections_recycled_total', 'Database connections closed at a task boundary, broken or past CONN_MAX_AGE',
+    ['alias']
+)
+DB_CONNECTIONS_REUSED = Counter(
+    'stos_db_connections_reused_total', 'Database connections kept open for the next task at a task boundary', ['alias']
+)
+
+# Path segments holding ids, e.g. /orders/123 or /tracking/SPEVN12345, are folded to keep the labels bounded
+_ID_SEGMENT = re.compile(r'^\d+$|^(?=.*\d)[\w\-.:]{5,}$')
+
+
+def endpoint_label(url: str) -> str:
+    """
+    Get the endpoint label of a URL: the host and the path with the id segments replaced by {id}.
+
+    Args:
+        url (str): The request URL.
+
+    Returns:
+        str: The label, e.g. 'api.ninjavan.co/vn/core/orders/{id}'.
+    """
+    parts = urlsplit(url)
+    segments = ['{id}' if _ID_SEGMENT.match(segment) else segment for segment in parts.path.split('/')]
+    return f"{parts.netloc}{'/'.join(segments)}"
+
+
+def observe_http(service: str, method: str, url: str, status, duration: float):
+    """
+    Record the latency and the status of a request to an external API.
+
+    Args:
+        service (str): The service class name.
+        method (str): The HTTP method.
+        url (str): The request URL.
+        status: The status code, or a short error name when no response was received.
+        duration (float): The latency in seconds.
+    """
+    endpoint = endpoint_label(url)
+    method = method.upper()
+    HTTP_REQUEST_DURATION.labels(service, method, endpoint).observe(duration)
+    HTTP_RESPONSES.labels(service, method, endpoint, f'{status}').inc()
+
+
+class stage(ContextDecorator):
+    """
+    Time a sub-step of a task, as a decorator or a context manager.
+
+    Example:
+        @stage('fail_pickup.upload_image')
+        def upload(...):
+            ...
+
+        with stage('fail_pickup.save_checkpoints'):
+            bulk_update_with_history(...)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def _recreate_cm(self):
+        # A decorated function may run on several threads at once, each call times itself on a new instance
+        return stage(self.name)
+
+    def __enter__(self):
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = 'failure' if exc_type else 'success'
+        STAGE_DURATION.labels(self.name, outcome).observe(time.perf_counter() - self._started_at)
+        return False
+
+
+def clear_multiprocess_dir():
+    """
+    Remove the metric files of the previous worker run, to call in the parent process before forking.
+    """
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not path:
+        return
+
+    Path(path).mkdir(parents=True, exist_ok=True)
+    for file in Path(path).glob('*.db'):
+        file.unlink()
+
+
+def start_exporter(port: int):
+    """
+    Serve the metrics of all the processes of the worker pool on a port.
+
+    With PROMETHEUS_MULTIPROC_DIR set, each forked process writes its samples to the directory and the
+    exporter aggregates them, so the metrics of every pool process are scraped from one endpoint.
+    Without it only the metrics of the current process are served.
+
+    Args:
+        port (int): The port of the HTTP exporter.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(port, registry=registry)
+    else:
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set, metrics of the pool processes are not aggregated")
+        start_http_server(port)
+
+    logger.info(f"Serving metrics on port {port}")
+
+
+def mark_process_dead(pid: int):
+    """
+    Drop the live gauges of an exited pool process.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,202 @@
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from celery import chain, group, shared_task
+from django.core.cache import cache
+
+from .metrics import stage as metrics_stage
+from .task import STOsParallel
+
+logger = logging.getLogger(__name__)
+
+# Run id of the pipeline stage executing in this context, None outside a pipeline run
+_current_run: ContextVar[Optional[str]] = ContextVar('pipeline_run', default=None)
+
+_pipelines: Dict[str, 'Pipeline'] = {}
+
+
+def memoized_stage(freshness: int = 300):
+    """
+    Decorator memoizing an idempotent refresh function per pipeline run.
+
+    Inside a run, a call is skipped when the function already completed in the same run less than
+    `freshness` seconds ago and was not invalidated since, e.g. the repeated `load_order_info` calls
+    of the stages of one run. Outside a run the function always executes.
+
+    Functions changing the data the refresh reads call `<func>.invalidate()` so the next call runs again.
+
+    Args:
+        freshness (int, optional): Seconds a completed call stays fresh. Defaults to 300.
+    """
+
+    def decorator(func: Callable[[], None]):
+        key = f'{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def wrapper():
+            run_id = _current_run.get()
+            if run_id is None:
+                return func()
+
+            ran_at = cache.get(f'pipeline:{run_id}:{key}:ran_at')
+            invalidated_at = cache.get(f'pipeline:{run_id}:{key}:invalidated_at', 0)
+            if ran_at is not None and ran_at > invalidated_at:
+                logger.info(f"Skipped {func.__name__}, refreshed {time.time() - ran_at:.0f}s ago in run {run_id}")
+                return
+
+            # The start time is stored, so an invalidation during the call makes the next call run again
+            started_at = time.time()
+            func()
+            cache.set(f'pipeline:{run_id}:{key}:ran_at', started_at, timeout=freshness)
+
+        def invalidate():
+            run_id = _current_run.get()
+            if run_id is not None:
+                cache.set(f'pipeline:{run_id}:{key}:invalidated_at', time.time(), timeout=freshness)
+
+        wrapper.invalidate = invalidate
+        return wrapper
+
+    return decorator
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable
+    after: Tuple[str, ...] = ()
+    kwargs: dict = field(default_factory=dict)
+
+
+class Pipeline:
+    """
+    A DAG of stages run on Celery.
+
+    Each stage declares the stages it runs after. The stages are scheduled level by level: a level is
+    a group of the stages whose dependencies all completed, run in parallel, and the next level starts
+    once the whole group completed (a chord). A failed stage stops the run.
+
+    Only one run of a pipeline is active at a time, a run dispatched while another one is active is skipped.
+
+    Example:
+        pipeline = Pipeline('pre_success_sla')
+        pipeline.stage('collect', collect_vendor_call_data)
+        pipeline.stage('orders', load_order_info, after=['collect'])
+        pipeline.stage('tickets', load_ticket_info_sla, after=['collect'])
+        pipeline.stage('sweep', parcel_sweeper_live, after=['orders', 'tickets'], sla_enabled=True)
+        pipeline.run()
+    """
+
+    def __init__(self, name: str, timeout: int = 60 * 60 * 2):
+        """
+        Args:
+            name (str): The unique name of the pipeline.
+            timeout (int, optional): Seconds after which the run lock of a stuck run expires. Defaults to 2 hours.
+        """
+        if name in _pipelines:
+            raise ValueError(f"Pipeline {name} is already registered")
+
+        self.name = name
+        self.timeout = timeout
+        self.stages: Dict[str, Stage] = {}
+        _pipelines[name] = self
+
+    def stage(self, name: str, func: Callable, after: List[str] = (), **kwargs) -> 'Pipeline':
+        """
+        Add a stage calling `func(**kwargs)` after the given stages.
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage {name} is already in pipeline {self.name}")
+
+        unknown = set(after) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Stage {name} runs after unknown stages {unknown}, declare them first")
+
+        self.stages[name] = Stage(name=name, func=func, after=tuple(after), kwargs=kwargs)
+        return self
+
+    def levels(self) -> List[List[Stage]]:
+        """
+        Group the stages in levels, each stage in the first level after all its dependencies.
+        """
+        depth = {}
+        for stage in self.stages.values():
+            # Dependencies are declared first, so their depth is known
+            depth[stage.name] = max((depth[name] + 1 for name in stage.after), default=0)
+
+        levels = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for stage in self.stages.values():
+            levels[depth[stage.name]].append(stage)
+        return levels
+
+    def signature(self, run_id: str):
+        """
+        Build the Celery canvas of a run.
+        """
+        steps = []
+        for level in self.levels():
+            tasks = [run_stage.si(self.name, stage.name, run_id) for stage in level]
+            steps.append(tasks[0] if len(tasks) == 1 else group(tasks))
+        steps.append(finish_run.si(self.name, run_id))
+
+        canvas = chain(*steps)
+        canvas.link_error(finish_run.si(self.name, run_id))
+        return canvas
+
+    def run(self) -> Optional[str]:
+        """
+        Dispatch a run of the pipeline.
+
+        Returns:
+            Optional[str]: The run id, None if another run is active.
+        """
+        run_id = uuid.uuid4().hex
+        if not cache.add(self.__lock_key, run_id, timeout=self.timeout):
+            logger.warning(f"Pipeline {self.name} run {cache.get(self.__lock_key)} is still active, skipped")
+            return None
+
+        logger.info(f"Starting pipeline {self.name} run {run_id}: {[[stage.name for stage in level] for level in self.levels()]}")
+        try:
+            self.signature(run_id).apply_async()
+        except Exception:
+            cache.delete(self.__lock_key)
+            raise
+        return run_id
+
+    def release(self, run_id: str):
+        """
+        Release the run lock if it is held by the run.
+        """
+        if cache.get(self.__lock_key) == run_id:
+            cache.delete(self.__lock_key)
+
+    @property
+    def __lock_key(self):
+        return f'pipeline:{self.name}:running'
+
+
+# The results only serve the chords joining the stages of a level, kept for the duration of a run
+@shared_task(name='[Pipeline] Run Stage', base=STOsParallel, result_ttl=60 * 60 * 3)
+def run_stage(pipeline_name: str, stage_name: str, run_id: str):
+    stage = _pipelines[pipeline_name].stages[stage_name]
+
+    token = _current_run.set(run_id)
+    started_at = time.time()
+    try:
+        with metrics_stage(f'{pipeline_name}.{stage_name}'):
+            stage.func(**stage.kwargs)
+    finally:
+        _current_run.reset(token)
+
+    logger.info(f"Pipeline {pipeline_name} run {run_id}: stage {stage_name} done in {time.time() - started_at:.1f}s")
+
+
+@shared_task(name='[Pipeline] Finish Run', base=STOsParallel, ignore_result=True)
+def finish_run(pipeline_name: str, run_id: str):
+    _pipelines[pipeline_name].release(run_id)
+    logger.info(f"Pipeline {pipeline_name} run {run_id} finished")
@@ -0,0 +1,117 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+
+from celery.backends.redis import RedisBackend
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class TTLRedisBackend(RedisBackend):
+    """
+    Redis result backend expiring the results of each task after its `result_ttl` attribute,
+    e.g. `@shared_task(result_ttl=600)`, or after `CELERY_RESULT_EXPIRES` by default.
+
+    Tasks opt out of result storage with `ignore_result=True`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ttl = threading.local()
+
+    def _store_result(self, task_id, result, state, traceback=None, request=None, **kwargs):
+        task = self.app.tasks.get(getattr(request, 'task', None) or '')
+        self._ttl.value = getattr(task, 'result_ttl', None)
+        try:
+            return super()._store_result(task_id, result, state, traceback=traceback, request=request, **kwargs)
+        finally:
+            self._ttl.value = None
+
+    def _set(self, key, value):
+        ttl = getattr(self._ttl, 'value', None)
+        if not ttl:
+            return super()._set(key, value)
+
+        with self.client.pipeline() as pipe:
+            pipe.setex(key, ttl, value)
+            pipe.publish(key, value)
+            pipe.execute()
+
+
+class SummaryBuffer:
+    """
+    Per-process buffer of the task summaries, written to the TaskSummary table in batches.
+
+    The buffer is flushed when it holds `size` summaries, when a failure is added, and every `interval`
+    seconds by a background thread.
+    """
+
+    def __init__(self, size: int = 100, interval: float = 10):
+        self.size = size
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._rows: List[dict] = []
+        self._pid = None
+
+    def _ensure_flusher(self):
+        # Forked pool processes inherit the buffer but not the flusher thread, each process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._rows = []
+            threading.Thread(target=self._run, name='task-summaries', daemon=True).start()
+
+    def add(self, task_id: str, task_name: str, status: str, worker: Optional[str], duration: Optional[float],
+            exc: Optional[BaseException] = None):
+        self._ensure_flusher()
+        row = {
+            'task_id': task_id,
+            'task_name': task_name,
+            'status': status,
+            'worker': worker,
+            'duration': duration,
+            'error': type(exc).__name__ if exc else None,
+            'error_message': str(exc)[:1000] if exc else None,
+            'date_done': timezone.now(),
+        }
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.size
+
+        if full or exc is not None:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return
+
+        from stos.models import TaskSummary
+
+        try:
+            TaskSummary.objects.bulk_create([TaskSummary(**row) for row in rows], batch_size=500)
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} task summaries: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            finally:
+                # The thread keeps its own connection, it is closed when broken or past CONN_MAX_AGE
+                close_old_connections()
+
+
+summaries = SummaryBuffer()
+# The summaries buffered by the worker process itself, e.g. in the threads pool, are written on exit
+atexit.register(summaries.flush)
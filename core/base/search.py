@@ -0,0 +1,95 @@
+import re
+import unicodedata
+from functools import reduce
+from operator import and_, or_
+from typing import Dict, Iterable, List
+
+from django.db import models
+from django.db.models import Q
+
+_SPACES = re.compile(r'\s+')
+
+
+def fold_text(text) -> str:
+    """
+    Normalize Vietnamese text for searching: diacritics folded, đ to d, lowercase and single spaces.
+
+    Args:
+        text: The text, None gives an empty string.
+
+    Returns:
+        str: The folded text, e.g. 'Hồ Chí  Minh' gives 'ho chi minh'.
+    """
+    if not text:
+        return ''
+
+    text = unicodedata.normalize('NFD', f'{text}'.replace('Đ', 'D').replace('đ', 'd'))
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    return _SPACES.sub(' ', text).strip().lower()
+
+
+class SearchTextField(models.TextField):
+    """
+    Shadow column holding the folded text of other columns, searched with the `match` lookup.
+    """
+
+
+@SearchTextField.register_lookup
+class Match(models.Lookup):
+    """
+    `field__match='text'`: the folded column contains the folded text.
+
+    A single LIKE on the folded column keeps the substring semantics of icontains. There is no FULLTEXT
+    pre-filter: the ngram parser drops the tokens holding a stopword and short words, a phrase search
+    would miss rows icontains finds.
+    """
+    lookup_name = 'match'
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [fold_text(value)]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        like = connection.operators['contains'] % rhs
+        patterns = [f'%{connection.ops.prep_for_like_query(value)}%' for value in rhs_params]
+        return f"{lhs} {like}", lhs_params + patterns
+
+
+def search_q(field: str, terms: Iterable[str], match_all: bool = False) -> Q:
+    """
+    Build the filter matching a search column against terms.
+
+    Args:
+        field (str): The SearchTextField lookup path, e.g. 'search_text' or 'detect__search_province'.
+        terms (Iterable[str]): The terms, folded before matching.
+        match_all (bool, optional): Require all the terms instead of any of them. Defaults to False.
+
+    Returns:
+        Q: The filter.
+    """
+    conditions = [Q(**{f'{field}__match': term}) for term in terms]
+    if not conditions:
+        return Q()
+    return reduce(and_ if match_all else or_, conditions)
+
+
+class SearchIndexMixin(models.Model):
+    """
+    Keeps the SearchTextField shadow columns of a model in sync with their source columns.
+
+    `search_sources` maps each shadow column to its source columns. Shadow columns are refreshed on save,
+    bulk writes must call `refresh_search_columns` on the objects and write the shadow columns too.
+    """
+    search_sources: Dict[str, List[str]] = {}
+
+    class Meta:
+        abstract = True
+
+    def refresh_search_columns(self):
+        for column, sources in self.search_sources.items():
+            setattr(self, column, fold_text(' '.join(f'{getattr(self, source)}' for source in sources if getattr(self, source))))
+
+    def save(self, *args, **kwargs):
+        self.refresh_search_columns()
+        super().save(*args, **kwargs)
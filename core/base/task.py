@@ -1,4 +1,5 @@
 import logging
+import time
 
 from celery import Task
 from celery_once import QueueOnce
@@ -12,11 +13,113 @@ from google_wrapper.utils.card_builder.elements import (
     Section,
 )
 from stos.utils import configs
+from . import memory
+from .metrics import TASK_DURATION, TASK_MEMORY_EXCEEDED, TASK_PEAK_RSS, TASK_RETRIES
+from .results import summaries
 
 logger = logging.getLogger(__name__)
 
 
-class STOsQueueOnce(QueueOnce):
+class TaskMetricsMixin:
+    """
+    Record the duration, the outcome and the retries of a task per task name.
+    """
+
+    def before_start(self, task_id, args, kwargs):
+        self.request.metrics_started_at = time.perf_counter()
+        super().before_start(task_id, args, kwargs)
+
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        TASK_RETRIES.labels(self.name).inc()
+        super().on_retry(exc, task_id, args, kwargs, einfo)
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        started_at = getattr(self.request, 'metrics_started_at', None)
+        if started_at is not None:
+            TASK_DURATION.labels(self.name, status.lower()).observe(time.perf_counter() - started_at)
+        super().after_return(status, retval, task_id, args, kwargs, einfo)
+
+
+class TaskSummaryMixin:
+    """
+    Record a compact summary of each run (name, status, duration, error class) in the TaskSummary table.
+    """
+
+    def before_start(self, task_id, args, kwargs):
+        self.request.summary_started_at = time.perf_counter()
+        super().before_start(task_id, args, kwargs)
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        started_at = getattr(self.request, 'summary_started_at', None)
+        try:
+            summaries.add(
+                task_id=task_id,
+                task_name=self.name,
+                status=status,
+                worker=self.request.hostname,
+                duration=round(time.perf_counter() - started_at, 3) if started_at is not None else None,
+                # Celery passes the exception of a failed run as its return value
+                exc=retval if isinstance(retval, BaseException) else None,
+            )
+        except Exception as e:
+            logger.error(f"Failed to record the summary of task {task_id}: {e}")
+        super().after_return(status, retval, task_id, args, kwargs, einfo)
+
+
+class TaskMemoryMixin:
+    """
+    Record the peak RSS of each run per task name, and the runs crossing the memory thresholds in the
+    TaskMemory table, a traced run with its top allocation sites. Only in the prefork pool processes.
+    """
+
+    def before_start(self, task_id, args, kwargs):
+        if memory.tracking_enabled:
+            tracker = memory.TaskMemoryTracker(self.name)
+            try:
+                tracker.start()
+                self.request.memory_tracker = tracker
+            except Exception as e:
+                logger.error(f"Failed to start the memory tracking of task {task_id}: {e}")
+        super().before_start(task_id, args, kwargs)
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        tracker = getattr(self.request, 'memory_tracker', None)
+        if tracker is not None:
+            try:
+                self._record_memory(tracker, task_id)
+            except Exception as e:
+                logger.error(f"Failed to record the memory usage of task {task_id}: {e}")
+        super().after_return(status, retval, task_id, args, kwargs, einfo)
+
+    def _record_memory(self, tracker, task_id):
+        from stos.models import TaskMemory
+
+        usage = tracker.stop()
+        TASK_PEAK_RSS.labels(self.name).observe(usage.peak)
+        if not tracker.exceeded(usage):
+            return
+
+        TASK_MEMORY_EXCEEDED.labels(self.name).inc()
+        # A traced run records its allocation sites, an untraced one has the next run traced
+        if usage.allocations is None:
+            tracker.flag()
+        logger.warning(
+            f"Task {self.name} peaked at {usage.peak // memory.MB} MB RSS "
+            f"({usage.growth // memory.MB:+} MB over the run)"
+        )
+        TaskMemory.objects.create(
+            task_id=task_id,
+            task_name=self.name,
+            worker=self.request.hostname,
+            rss_before=usage.rss_before,
+            rss_after=usage.rss_after,
+            peak_rss=usage.peak,
+            top_allocations=usage.allocations,
+            date_done=timezone.now(),
+        )
+
+
+class STOsQueueOnce(TaskMetricsMixin, TaskSummaryMixin, TaskMemoryMixin, QueueOnce):
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         """
         exc – The exception raised by the task.
@@ -31,12 +134,13 @@ class STOsQueueOnce(QueueOnce):
             try:
                 # Build and send the Google Chat notification
                 card = self._build_failure_card(exc, task_id, args, kwargs, einfo)
-                chat_service = GoogleChatService()
-                chat_service.webhook_send(
+                # Queued for the background sender, repeats of the same failure are coalesced into one card
+                GoogleChatService.send_async(
                     webhook_url=hook_url,
                     card=card,
+                    coalesce_key=f'{self.name}:{type(exc).__name__}:{exc}',
                 )
-                logger.info(f"Task failure notification sent for task {task_id}")
+                logger.info(f"Task failure notification queued for task {task_id}")
             except Exception as notification_exc:
                 # Log any errors that occur during notification to avoid masking the actual task failure
                 logger.error(
@@ -83,7 +187,7 @@ class STOsQueueOnce(QueueOnce):
         return card_builder.card
 
 
-class STOsParallel(Task):
+class STOsParallel(TaskMetricsMixin, TaskSummaryMixin, TaskMemoryMixin, Task):
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         """
         exc – The exception raised by the task.
@@ -98,12 +202,13 @@ class STOsParallel(Task):
             try:
                 # Build and send the Google Chat notification
                 card = self._build_failure_card(exc, task_id, args, kwargs, einfo)
-                chat_service = GoogleChatService()
-                chat_service.webhook_send(
+                # Queued for the background sender, repeats of the same failure are coalesced into one card
+                GoogleChatService.send_async(
                     webhook_url=hook_url,
                     card=card,
+                    coalesce_key=f'{self.name}:{type(exc).__name__}:{exc}',
                 )
-                logger.info(f"Task failure notification sent for task {task_id}")
+                logger.info(f"Task failure notification queued for task {task_id}")
             except Exception as notification_exc:
                 # Log any errors that occur during notification to avoid masking the actual task failure
                 logger.error(
@@ -148,3 +253,22 @@ class STOsParallel(Task):
         card_builder.add_section(section)
 
         return card_builder.card
+
+
+class QueueAnnotations:
+    """
+    Task annotations applying the `options` of the queue a task is routed to in `TASK_QUEUES`,
+    e.g. a time limit for the tasks of a tool. QueueOnce tasks are never acknowledged late.
+    """
+    LATE_ACK_OPTIONS = ('acks_late', 'reject_on_worker_lost')
+
+    def annotate(self, task):
+        from django.conf import settings
+
+        for queue in settings.TASK_QUEUES.values():
+            if any(task.name.startswith(prefix) for prefix in queue['prefixes']):
+                options = queue.get('options')
+                if options and isinstance(task, QueueOnce):
+                    # A task re-delivered by a lost worker would be rejected while its once lock is held
+                    options = {key: value for key, value in options.items() if key not in self.LATE_ACK_OPTIONS}
+                return options
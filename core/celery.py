@@ -1,7 +1,15 @@
 import os
 
 from celery import Celery
-from celery.signals import after_setup_logger, after_setup_task_logger
+from celery.signals import (
+    after_setup_logger,
+    after_setup_task_logger,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
@@ -31,3 +39,71 @@ def setup_task_logging(logger, *args, **kwargs):
     from logging.config import dictConfig
 
     dictConfig(settings.LOGGING)
+
+
+# Serve the Prometheus metrics of the worker pool
+@worker_init.connect
+def start_metrics_exporter(*args, **kwargs):
+    from django.conf import settings
+    from core.base.metrics import clear_multiprocess_dir, start_exporter
+
+    if not settings.METRICS_PORT:
+        return
+
+    clear_multiprocess_dir()
+    start_exporter(settings.METRICS_PORT)
+
+
+@worker_process_shutdown.connect
+def cleanup_metrics(pid=None, *args, **kwargs):
+    from core.base.metrics import mark_process_dead
+
+    mark_process_dead(pid)
+
+
+# Prefork pool processes exit without running the atexit hooks, pending Pub/Sub batches are sent here
+@worker_process_shutdown.connect
+def flush_pubsub_publishers(*args, **kwargs):
+    from google_wrapper.services.gpub_sub import flush_publishers
+
+    flush_publishers()
+
+
+@worker_process_shutdown.connect
+def flush_chat_notifications(*args, **kwargs):
+    from google_wrapper.services import GoogleChatService
+
+    GoogleChatService.flush(timeout=10)
+
+
+@worker_process_shutdown.connect
+def flush_task_summaries(*args, **kwargs):
+    from core.base.results import summaries
+
+    summaries.flush()
+
+
+# Persistent database connections, recycled at the task boundaries when broken or past CONN_MAX_AGE
+@worker_init.connect
+def track_database_connections(*args, **kwargs):
+    from core.base.db import track_connections
+
+    track_connections()
+
+
+@task_prerun.connect
+@task_postrun.connect
+def recycle_database_connections(sender=None, *args, **kwargs):
+    from core.base.db import recycle_connections
+
+    if sender is not None and getattr(sender.request, 'is_eager', False):
+        return
+    recycle_connections()
+
+
+# Memory accounting of the tasks, per process it only holds in the prefork pool where a process runs one task at a time
+@worker_process_init.connect
+def enable_task_memory_tracking(*args, **kwargs):
+    from core.base import memory
+
+    memory.tracking_enabled = True
@@ -10,9 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import re
 from pathlib import Path
 
 from decouple import config, Csv
+from kombu import Queue
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -106,6 +108,12 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='root'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='3306'),
+        # Persistent connections, checked before their first use by each request or task
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=300, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT', default=10, cast=int),
+        },
     }
 }
 
@@ -192,8 +200,26 @@ CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = USE_TZ
-CELERY_RESULT_BACKEND = 'django-db'
-CELERY_RESULT_EXTENDED = True
+# Results are kept in Redis for CELERY_RESULT_EXPIRES or the `result_ttl` of their task, the runs are summarized
+# in the TaskSummary table. Tasks whose results are never read opt out with `ignore_result=True`.
+CELERY_RESULT_BACKEND = 'core.base.results:TTLRedisBackend+' + config('CELERY_RESULT_BACKEND_URL', default='redis://localhost:6379/2')
+CELERY_RESULT_EXPIRES = config('CELERY_RESULT_EXPIRES', default=60 * 60 * 24, cast=int)
+CELERY_RESULT_EXTENDED = False
+# Days the task summaries are kept, purged by the `[Background] Purge Task Summaries` task
+TASK_SUMMARY_RETENTION_DAYS = config('TASK_SUMMARY_RETENTION_DAYS', default=30, cast=int)
+# Runs over a peak RSS or an RSS growth (MB) are recorded in the TaskMemory table, 0 disables a threshold.
+# The next run of their task within TASK_MEMORY_TRACE_TTL seconds is traced with tracemalloc.
+TASK_MEMORY_PEAK_THRESHOLD_MB = config('TASK_MEMORY_PEAK_THRESHOLD_MB', default=1024, cast=int)
+TASK_MEMORY_GROWTH_THRESHOLD_MB = config('TASK_MEMORY_GROWTH_THRESHOLD_MB', default=256, cast=int)
+TASK_MEMORY_TRACE_TTL = config('TASK_MEMORY_TRACE_TTL', default=60 * 60 * 6, cast=int)
+TASK_MEMORY_TRACE_FRAMES = 1
+TASK_MEMORY_TOP_ALLOCATIONS = 10
+# Seconds a handler over its `@memory_budget` keeps running in chunked mode
+MEMORY_BUDGET_CHUNKED_TTL = config('MEMORY_BUDGET_CHUNKED_TTL', default=60 * 60 * 24, cast=int)
+# Prefork pool processes are replaced after these many tasks or above this RSS (KiB), the worker commands
+# of docker-compose.yml override them per queue group
+CELERY_WORKER_MAX_TASKS_PER_CHILD = config('CELERY_WORKER_MAX_TASKS_PER_CHILD', default=100, cast=int)
+CELERY_WORKER_MAX_MEMORY_PER_CHILD = config('CELERY_WORKER_MAX_MEMORY_PER_CHILD', default=1024 * 1024, cast=int)
 CELERY_TASK_DEFAULT_RETRY_DELAY = 30
 CELERY_TASK_MAX_RETRIES = 3
 # Celery Beat
@@ -208,8 +234,65 @@ CELERY_ONCE = {
         'default_timeout': 60 * 5
     }
 }
+
+# Queue of each tool, matched on the task name prefixes in order, the other tasks go to the default `celery` queue.
+# `priority` orders the messages of the queues consumed by a worker, 0 first.
+# `options` are task options of the queue. QueueOnce tasks keep the early acknowledgement: a late acknowledged task
+# re-delivered by a lost worker is rejected while its once lock is held. The worker pools are in docker-compose.yml.
+TASK_QUEUES = {
+    # Fan-out tasks rendering images in their own threads or crunching pandas frames, consumed by the prefork pool
+    'fanout': {'prefixes': ['[Fail Pickup] Fail Pickup Jobs', '[Auto AV B2B LM]'], 'priority': 0},
+    # I/O-bound HTTP calls, consumed by the threads pool
+    'fail_pickup': {'prefixes': ['[Fail Pickup]'], 'priority': 2},
+    # Long batch tasks, consumed by the prefork pool one task at a time
+    # The pipeline stages are acknowledged once done, a stage lost with its worker is re-delivered instead of
+    # leaving its chord and the run lock waiting
+    'pipeline': {'prefixes': ['[Pipeline]'], 'priority': 5, 'options': {'acks_late': True, 'reject_on_worker_lost': True}},
+    'pre_success': {'prefixes': ['[Pre Success]'], 'priority': 5},
+    'reco_ticket': {'prefixes': ['[Reco Ticket]'], 'priority': 5},
+    'sla_tool': {'prefixes': ['[SLA Tool]'], 'priority': 6},
+    'wms': {'prefixes': ['WMS '], 'priority': 3},
+    'shein': {'prefixes': ['[Shein]'], 'priority': 3},
+    'add_tag': {'prefixes': ['[Add Tag]'], 'priority': 4},
+    'background': {'prefixes': ['[Background]', '[Cron Job]'], 'priority': 8},
+}
+CELERY_TASK_QUEUES = [Queue('celery')] + [Queue(name) for name in TASK_QUEUES]
+# The prefixes contain brackets, they are matched as escaped regexes instead of globs
+CELERY_TASK_ROUTES = {
+    re.compile(re.escape(prefix)): {'queue': name, 'priority': queue['priority']}
+    for name, queue in TASK_QUEUES.items() for prefix in queue['prefixes']
+}
+CELERY_TASK_ANNOTATIONS = ['core.base.task.QueueAnnotations']
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    # Late acknowledged tasks are re-delivered when not acknowledged within this delay, longer than the longest task
+    'visibility_timeout': 60 * 60 * 6,
+    # Priorities of the routes, a worker pops the highest priority across its queues first
+    'queue_order_strategy': 'priority',
+    'priority_steps': list(range(10)),
+}
 # endregion Celery settings
 
+# region Metrics settings
+# Port of the Prometheus exporter of the Celery workers, disabled when empty.
+# Set PROMETHEUS_MULTIPROC_DIR in the environment to aggregate the metrics of the prefork pool processes.
+METRICS_PORT = config('METRICS_PORT', default=None, cast=lambda value: int(value) if value else None)
+# endregion Metrics settings
+
+# region Pub/Sub settings
+# Streaming pull consumer started with `python manage.py consume_pubsub`.
+# Set PUBSUB_EMULATOR_HOST in the environment to consume from the local Pub/Sub emulator.
+PUBSUB_MAX_MESSAGES = config('PUBSUB_MAX_MESSAGES', default=100, cast=int)
+PUBSUB_MAX_BYTES = config('PUBSUB_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+PUBSUB_ACK_DEADLINE = config('PUBSUB_ACK_DEADLINE', default=60, cast=int)
+# Dispatch table, messages of a subscription start its task once per `debounce` seconds and `key`
+PUBSUB_ROUTES = [
+    {'subscription': 'stos-pre-success-status', 'topic': 'pre-success-status', 'task': '[Pre Success] Fetch Status', 'debounce': 10},
+    {'subscription': 'stos-shein', 'topic': 'shein', 'task': '[Shein] Handle', 'debounce': 10},
+    {'subscription': 'stos-wms-collect', 'topic': 'wms-collect', 'task': 'WMS Collect Data', 'debounce': 10},
+    {'subscription': 'stos-fail-pickup-zns', 'topic': 'fail-pickup-zns', 'task': '[Fail Pickup] Collect ZNS Response', 'debounce': 10},
+]
+# endregion Pub/Sub settings
+
 # Get log level from the environment variables
 LOG_LEVEL = config('LOGGING_LEVEL', default='INFO')
 LOKI_IP = config('LOKI_IP', default='localhost')
@@ -4,9 +4,10 @@ from abc import ABC
 from typing import Any
 
 import requests
-from django.core.cache import cache
 from django.utils import timezone
 
+from core.base.credentials import CredentialBroker
+from core.base.metrics import observe_http
 from core.patterns import SingletonMeta
 from google_wrapper.models import ServiceAccount
 from google_wrapper.services import GoogleSheetService, GoogleChatService
@@ -33,6 +34,7 @@ class TokenManager(metaclass=SingletonMeta):
         self.__logger = logger
         self.__configs = configs
         self.__webhook_url = self.__configs.get('ROOT_NOTIFICATION_WEBHOOK')
+        self.__broker = CredentialBroker('driver', self.TOKEN_CACHE_KEY, self.TOKEN_CACHE_TIMEOUT, logger=self.__logger)
 
     @staticmethod
     def _build_card(header: str, message: str):
@@ -116,28 +118,27 @@ class TokenManager(metaclass=SingletonMeta):
 
     def update_token(self) -> None:
         """
-        Update the token by retrieving it from Google Sheets.
-        Retry until a valid token is fetched and cached.
+        Refresh the expired token from Google Sheets, once across the worker processes.
+        The elected refresher alerts and polls the sheet, the other processes wait for the new token.
         """
         chat_service = GoogleChatService(logger=self.__logger)
-        card = self._build_card(
-            header='<font color="#de1304">Driver Token Expired</font>',
-            message=f'Token: "{self.token}".\nPlease update token in Google Sheet.\nRetrying in 60 seconds.'
-        )
-        chat_service.webhook_send(self.__webhook_url, card=card)
-        time.sleep(60)
+
+        def on_expired(token: str):
+            card = self._build_card(
+                header='<font color="#de1304">Driver Token Expired</font>',
+                message=f'Token: "{token}".\nPlease update token in Google Sheet.'
+            )
+            chat_service.send_async(self.__webhook_url, card=card)
+
+        def on_updated(token: str):
+            card = self._build_card(
+                header='<font color="#38761d">Driver Token Updated</font>',
+                message=f'Updated token: "{token}".'
+            )
+            chat_service.send_async(self.__webhook_url, card=card)
+
         try:
-            self.__logger.info('Attempting to update token...')
-            new_token = self._get_token_from_gsheet()
-            if new_token != self.token:
-                cache.set(self.TOKEN_CACHE_KEY, new_token, timeout=self.TOKEN_CACHE_TIMEOUT)
-                self.__logger.info('Token successfully updated and cached.')
-
-                card = self._build_card(
-                    header='<font color="#38761d">OPv2 Token Updated</font>',
-                    message=f'Updated token: "{new_token}".'
-                )
-                chat_service.webhook_send(self.__webhook_url, card=card)
+            self.__broker.refresh(self._get_token_from_gsheet, on_expired=on_expired, on_updated=on_updated)
         except Exception as error:
             self.__logger.error(f'Error updating token: {error}')
             raise error
@@ -170,7 +171,7 @@ class TokenManager(metaclass=SingletonMeta):
         Returns:
             str: Cached token or None if not set.
         """
-        return cache.get(self.TOKEN_CACHE_KEY)
+        return self.__broker.value
 
 
 class BaseService(ABC):
@@ -232,9 +233,11 @@ class BaseService(ABC):
         """
         self._set_session_headers()
 
+        started_at = time.perf_counter()
         try:
             self._logger.debug(f"Payload: {payload}")
             response = self.session.request(method, url, json=payload, data=data, files=files)
+            observe_http(type(self).__name__, method, url, response.status_code, time.perf_counter() - started_at)
             self._logger.info(f"{response.url} {response.request.method} {response.status_code}")
             response.raise_for_status()
             return self._process_response(response)
@@ -243,6 +246,7 @@ class BaseService(ABC):
             return self._process_response(http_error.response)
 
         except requests.exceptions.RequestException as req_error:
+            observe_http(type(self).__name__, method, url, type(req_error).__name__, time.perf_counter() - started_at)
             self._logger.error(f"Request exception: {req_error}")
             return 500, {'error': str(req_error)}
 
@@ -1,16 +1,35 @@
 import logging
 
 import pandas as pd
-from django.db.models import Q
-from simple_history.utils import bulk_create_with_history
 
 from google_wrapper.services import GoogleSheetService
 from google_wrapper.utils import get_service_account
-from stos.utils import configs, chunk_list
+from stos.utils import configs, bulk_insert_new
 from ..models import Source
 
 logger = logging.getLogger(__name__)
 
+SOURCE_COLUMNS = ['tracking_id', 'shipper_name', 'response_type', 'customer_response']
+SOURCE_KEY = ['tracking_id', 'response_type']
+# Rows without response type are loaded too, deduplicated with the other blank ones of their tracking id
+SOURCE_REQUIRED_KEY = ['tracking_id']
+
+
+def __load_sources(data: pd.DataFrame):
+    """
+    Insert the sources not in the database yet, deduplicated on tracking id and response type.
+    """
+    data = data.reindex(columns=SOURCE_COLUMNS)
+    missing = data['tracking_id'].isna() | (data['tracking_id'] == '')
+    if missing.any():
+        logger.info(f"No tracking id found in {missing.sum()} rows")
+
+    inserted = bulk_insert_new(Source, data, key_fields=SOURCE_KEY, required_fields=SOURCE_REQUIRED_KEY)
+    if inserted:
+        logger.info(f"Successfully added {len(inserted)} new records to the database")
+    else:
+        logger.info("No new records to add to the database")
+
 
 def retrieve_rts_call():
     spreadsheet_id = "1K3Xy7SW12z7IIGi5xSWpkD4NGsLxbquZY9gLTLN6V3w"
@@ -19,43 +38,12 @@ def retrieve_rts_call():
         spreadsheet_id=spreadsheet_id
     )
     data = gsheet.get_all_records("opv2")
-    print(data)
 
     if not data:
         logger.info("No data found in the Google Sheet")
         return
 
-    for chunk in chunk_list(data, 1000):
-        tracking_ids = [row.get('tracking_id') for row in chunk]
-        response_types = [row.get('response_type') for row in chunk]
-
-        record = []
-
-        already_exists = Source.objects.filter(
-            Q(tracking_id__in=tracking_ids) &
-            Q(response_type__in=response_types)
-        ).values_list('tracking_id', 'response_type')
-
-        for row in chunk:
-            if (row.get('tracking_id'), row.get('response_type')) in already_exists:
-                continue
-
-            if not row.get('tracking_id'):
-                logger.info("No tracking id found in row")
-                continue
-
-            record.append(Source(
-                tracking_id=row.get('tracking_id'),
-                shipper_name=row.get('shipper_name'),
-                response_type=row.get('response_type'),
-                customer_response=row.get('customer_response')
-            ))
-
-        if record:
-            success = bulk_create_with_history(record, Source, batch_size=1000, ignore_conflicts=True)
-            logger.info(f"Successfully added {len(success)} new records to the database")
-        else:
-            logger.info("No new records to add to the database")
+    __load_sources(pd.DataFrame(data))
 
 
 def retrieve_zns():
@@ -69,43 +57,15 @@ def retrieve_zns():
     data_first_attempt = gsheet.get_all_records_as_dataframe("sysops")
     data_zns_backlog = gsheet.get_all_records_as_dataframe("zns_backlog")
 
-    if not data_first_attempt.empty:
-        # logger.info("No data first attempt found in the Google Sheet")
-        data_first_attempt = data_first_attempt[['tracking_id', 'shipper_name', 'response_type', 'customer_response']]
-
     if data_zns_backlog.empty:
         logger.info("No data zns backlog found in the Google Sheet")
 
-    data_zns_backlog = data_zns_backlog[['tracking_id', 'shipper_name', 'response_type', 'customer_response']]
-    data = pd.concat([data_zns_backlog, data_first_attempt], ignore_index=True).to_dict() if not data_first_attempt.empty else data_zns_backlog.to_dict()
-    for chunk in chunk_list(data, 1000):
-        tracking_ids = [row.get('tracking_id') for row in chunk]
-        response_types = [row.get('response_type') for row in chunk]
-
-        record = []
-
-        already_exists = Source.objects.filter(
-            Q(tracking_id__in=tracking_ids) &
-            Q(response_type__in=response_types)
-        ).values_list('tracking_id', 'response_type')
-
-        for row in chunk:
-            if (row.get('tracking_id'), row.get('response_type')) in already_exists:
-                continue
-
-            if not row.get('tracking_id'):
-                logger.info("No tracking id found in row")
-                continue
-
-            record.append(Source(
-                tracking_id=row.get('tracking_id'),
-                shipper_name=row.get('shipper_name'),
-                response_type=row.get('response_type'),
-                customer_response=row.get('customer_response')
-            ))
-
-        if record:
-            success = bulk_create_with_history(record, Source, batch_size=1000, ignore_conflicts=True)
-            logger.info(f"Successfully added {len(success)} new records to the database")
-        else:
-            logger.info("No new records to add to the database")
+    data = pd.concat(
+        [frame.reindex(columns=SOURCE_COLUMNS) for frame in (data_zns_backlog, data_first_attempt) if not frame.empty],
+        ignore_index=True
+    )
+    if data.empty:
+        logger.info("No data found in the Google Sheet")
+        return
+
+    __load_sources(data)
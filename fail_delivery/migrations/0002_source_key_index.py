@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fail_delivery', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='source',
+            index=models.Index(fields=['tracking_id', 'response_type'], name='fail_delive_trackin_4c9128_idx'),
+        ),
+    ]
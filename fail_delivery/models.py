@@ -43,6 +43,9 @@ class Source(BaseModel):
     class Meta:
         verbose_name = 'Fail Delivery Source'
         verbose_name_plural = 'Fail Delivery Sources'
+        indexes = [
+            models.Index(fields=['tracking_id', 'response_type']),
+        ]
 
 
 class FailOrders(BaseModel):
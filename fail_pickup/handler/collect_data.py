@@ -10,7 +10,8 @@ from google_wrapper.services import GoogleSheetService
 from google_wrapper.utils import get_service_account
 from opv2.base.pickup import PickupJobStatusChoices
 from opv2.services import PickupService
-from stos.utils import configs, chunk_list, check_record_change, parse_datetime
+from stos.utils import configs, chunk_list, check_record_change, parse_datetime, day_range
+from .rollup import refresh_rollup
 from ..models import PickupJob, PickupJobOrder
 
 logger = logging.getLogger(__name__)
@@ -92,11 +93,13 @@ def collect_job_data():
             logger.info("No records to update.")
 
     logger.info(f"Processed {success_records}/{total_records} records.")
+    refresh_rollup()
 
 
 def collect_job_info():
+    start, end = day_range()
     pickup_jobs = PickupJob.objects.filter(
-        Q(created_date__date=timezone.now().date()) &
+        Q(created_date__gte=start) & Q(created_date__lt=end) &
         (
                 Q(status__isnull=True) |
                 ~Q(status__in=[PickupJobStatusChoices.FAILED, PickupJobStatusChoices.COMPLETED,
@@ -142,6 +145,9 @@ def collect_job_info():
         logger.info(f"Successfully updated {success} records.")
     except Exception as e:
         logger.error(f"Failed to update records: {e}")
+        return
+
+    refresh_rollup()
 
 
 def collect_packets():
@@ -175,5 +181,6 @@ def collect_packets():
     if orders_to_create:
         success = bulk_create_with_history(orders_to_create, PickupJobOrder, batch_size=1000, ignore_conflicts=True)
         logger.info(f"Successfully created {len(success)} records.")
+        refresh_rollup()
     else:
         logger.info("No records to create.")
@@ -1,18 +1,35 @@
 import logging
-from typing import List
+import threading
+from dataclasses import dataclass
+from functools import partial
+from queue import Queue
+from typing import Callable, List, Optional
 
 from celery import shared_task
+from django.db import connections
 from django.db.models import Q
 from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
 
+from core.base.metrics import stage
 from core.base.task import STOsParallel
 from driver.services import UploadService, PickupService
 from opv2.base.pickup import PickupJobStatusChoices
-from stos.utils import create_zns_image, chunk_list
+from stos.utils import ZNSImageRenderer, get_zns_renderer, chunk_list, day_range
+from .rollup import refresh_rollup
 from ..models import PickupJob
 
 logger = logging.getLogger(__name__)
 
+# Fail pipeline sizing, images are rendered in batches by one thread, uploading and failing use threads
+RENDER_BATCH_SIZE = 50
+UPLOAD_WORKERS = 8
+FAIL_WORKERS = 8
+QUEUE_SIZE = 50
+CHECKPOINT_BATCH_SIZE = 50
+
+_END = object()  # Marks the end of a pipeline queue
+
 
 def __make_physical_items(orders, reason_id, shipper_id):
     physical_items = []
@@ -32,98 +49,273 @@ def __make_physical_items(orders, reason_id, shipper_id):
     return physical_items
 
 
-@shared_task(base=STOsParallel, name='[Fail Pickup] Fail Pickup Jobs')
-def fail_job_task(job_ids: List[int] = None, reason_id: int = None):
-    if not job_ids or not reason_id:
-        return
-        # Init Driver Service
-    upload_service = UploadService()
-    pickup_service = PickupService()
+@dataclass
+class _FailJob:
+    """
+    A pickup job moving through the fail pipeline, built on the main thread so the stages never touch the database.
+    """
+    job_id: int
+    route_id: int
+    waypoint_id: int
+    contact: str
+    shipper_id: int
+    zns_info: dict
+    physical_items: list
+    zns_image: bytes = None
+    file_path: str = None
+    photo_url: str = None
 
-    jobs = PickupJob.objects.filter(job_id__in=job_ids)
-    success = 0
 
-    for job in jobs:
-        # Make ZNS Image
-        zns_info = {
+def __make_fail_job(job: PickupJob, reason_id: int) -> _FailJob:
+    return _FailJob(
+        job_id=job.job_id,
+        route_id=job.route.route_id,
+        waypoint_id=job.waypoint_id,
+        contact=job.contact,
+        shipper_id=job.shipper_id,
+        zns_info={
             "Shipper name": f'{job.shipper_name}',
             "Shipper address": f'{job.shipper_address}',
             "Shipper contact": f'{job.contact}',
             "Call center status": f'{job.call_center_status}',
             "Call center sent time": f'{job.call_center_sent_time.strftime("%d/%m/%Y %H:%M:%S")}',
             "Schedule PU date": f'{job.pickup_schedule_date.strftime("%d/%m/%Y")}',
-        }
-        zns_image = create_zns_image(zns_info)
-
-        # Upload ZNS Image
-        stt_code, photo_response = upload_service.upload_photo(job.route.route_id, job.waypoint_id, content=zns_image)
-        if stt_code != 200:
-            logger.error(f"Failed to upload photo: {photo_response}")
-            continue
-
-        file_path = photo_response['data'].get('file_path')
-        photo_url = photo_response['data'].get('url')
-
-        # Make Physical Items
-        physical_items = __make_physical_items(job.packets.all(), reason_id, job.shipper_id)
-
-        # Fail Job
-        stt_code, response = pickup_service.pickup_fail(
-            route_id=job.route.route_id,
-            waypoint_id=job.waypoint_id,
-            contact=job.contact,
-            file_path=file_path,
-            photo_url=photo_url,
-            failure_reason_id=reason_id,
-            shipper_id=job.shipper_id,
-            job_id=job.job_id,
-            physical_items=physical_items
-        )
-
-        if stt_code != 200:
-            logger.error(f"Failed to fail pickup job {job.job_id}: {response}")
-            continue
-
-        success += 1
-
-    logger.info(f"Successfully processed {success}/{len(jobs)} records.")
+        },
+        # Packets are prefetched with the jobs
+        physical_items=__make_physical_items(job.packets.all(), reason_id, job.shipper_id),
+    )
+
+
+@stage('fail_pickup.upload_photo')
+def _upload_stage(upload_service: UploadService, job: _FailJob) -> Optional[_FailJob]:
+    stt_code, photo_response = upload_service.upload_photo(job.route_id, job.waypoint_id, content=job.zns_image)
+    if stt_code != 200:
+        logger.error(f"Failed to upload photo for job {job.job_id}: {photo_response}")
+        return None
+
+    job.file_path = photo_response['data'].get('file_path')
+    job.photo_url = photo_response['data'].get('url')
+    job.zns_image = None  # Release the image, it is not needed anymore
+    return job
+
+
+@stage('fail_pickup.pickup_fail')
+def _fail_stage(pickup_service: PickupService, job: _FailJob, reason_id: int) -> Optional[int]:
+    stt_code, response = pickup_service.pickup_fail(
+        route_id=job.route_id,
+        waypoint_id=job.waypoint_id,
+        contact=job.contact,
+        file_path=job.file_path,
+        photo_url=job.photo_url,
+        failure_reason_id=reason_id,
+        shipper_id=job.shipper_id,
+        job_id=job.job_id,
+        physical_items=job.physical_items
+    )
+
+    if stt_code != 200:
+        logger.error(f"Failed to fail pickup job {job.job_id}: {response}")
+        return None
+
+    return job.job_id
+
+
+def _stage_worker(name: str, func: Callable, inbox: Queue, outbox: Queue, state: dict, downstream_workers: int,
+                  stop: threading.Event):
+    """
+    Take items from the inbox until the end marker, push the non-None results to the outbox.
+    Once stopped the items are drained without being processed.
+    The last worker of the stage to finish forwards one end marker per downstream worker.
+    """
+    try:
+        while True:
+            item = inbox.get()
+            if item is _END:
+                break
+            if stop.is_set():
+                continue
+
+            try:
+                result = func(item)
+            except Exception as e:
+                logger.error(f"Pipeline stage {name} failed: {e}")
+                continue
+
+            if result is not None:
+                outbox.put(result)
+    finally:
+        # A token refresh may read the configs, the connections of the thread are not left open
+        connections.close_all()
+
+    with state['lock']:
+        state['remaining'] -= 1
+        last = state['remaining'] == 0
+
+    if last:
+        for _ in range(downstream_workers):
+            outbox.put(_END)
+
+
+def _start_stage(name: str, funcs: List[Callable], inbox: Queue, outbox: Queue, downstream_workers: int,
+                 stop: threading.Event):
+    """
+    Start one worker thread per function, each function holding the services of its worker.
+    """
+    state = {'lock': threading.Lock(), 'remaining': len(funcs)}
+    for index, func in enumerate(funcs):
+        threading.Thread(
+            target=_stage_worker,
+            args=(name, func, inbox, outbox, state, downstream_workers, stop),
+            name=f'fail-pickup-{name}-{index}',
+            daemon=True
+        ).start()
+
+
+def _render(renderer: ZNSImageRenderer, jobs: List[_FailJob], outbox: Queue, downstream_workers: int,
+            stop: threading.Event):
+    """
+    Render the ZNS images batch by batch and feed the jobs to the upload stage, until stopped.
+    The end markers are always sent, the downstream workers never wait on an exited render thread.
+    """
+    try:
+        for chunk in chunk_list(jobs, RENDER_BATCH_SIZE):
+            if stop.is_set():
+                break
+
+            try:
+                images = renderer.render_many([job.zns_info for job in chunk])
+            except Exception as e:
+                logger.error(f"Pipeline stage render failed: {e}")
+                continue
+
+            for job, image in zip(chunk, images):
+                job.zns_image = image
+                outbox.put(job)
+    finally:
+        for _ in range(downstream_workers):
+            outbox.put(_END)
+
+
+@stage('fail_pickup.save_checkpoints')
+def __save_checkpoints(job_ids: List[int]):
+    if not job_ids:
+        return
+
+    now = timezone.now()
+    jobs = list(PickupJob.objects.filter(job_id__in=job_ids))
+    for job in jobs:
+        # The status is left to the job info sync, it keeps syncing the job until the Driver App reports it failed
+        job.fail_submitted_at = now
+        job.updated_date = now
+
+    bulk_update_with_history(jobs, PickupJob, batch_size=1000, fields=['fail_submitted_at', 'updated_date'])
+    refresh_rollup()
+
+
+# Fire-and-forget fan-out with 1000-id arguments, its results are never read
+@shared_task(base=STOsParallel, name='[Fail Pickup] Fail Pickup Jobs', ignore_result=True)
+def fail_job_task(job_ids: List[int] = None, reason_id: int = None):
+    """
+    Fail the pickup jobs on the Driver App through a pipeline of concurrent stages:
+    render the ZNS image, upload it, then fail the job.
+
+    Stages are connected by bounded queues, so a slow stage holds back the previous ones instead of piling up
+    images in memory. Every failed job is checkpointed, a retried task skips the jobs it already failed.
+    The renderer and the services are built on the calling thread, one service per stage worker, the stages never
+    touch the database.
+
+    Args:
+        job_ids (List[int]): The pickup job IDs to fail.
+        reason_id (int): The failure reason ID.
+
+    Raises:
+        Exception: If no job was failed.
+    """
+    if not job_ids or not reason_id:
+        return
+
+    jobs = PickupJob.objects.filter(
+        Q(job_id__in=job_ids) &
+        Q(fail_submitted_at__isnull=True)
+    ).select_related('route').prefetch_related('packets')
+
+    fail_jobs = [__make_fail_job(job, reason_id) for job in jobs]
+    if not fail_jobs:
+        logger.info(f"All {len(job_ids)} jobs were already failed")
+        return
+
+    # Built before any stage starts, a missing font fails the task instead of leaving the stages waiting
+    renderer = get_zns_renderer()
+    upload_queue, fail_queue, done_queue = Queue(QUEUE_SIZE), Queue(QUEUE_SIZE), Queue(QUEUE_SIZE)
+    upload_stages = [partial(_upload_stage, UploadService(logger=logger)) for _ in range(UPLOAD_WORKERS)]
+    fail_stages = [partial(_fail_stage, PickupService(logger=logger), reason_id=reason_id) for _ in range(FAIL_WORKERS)]
+    stop = threading.Event()
+
+    _start_stage('upload', upload_stages, upload_queue, fail_queue, FAIL_WORKERS, stop)
+    _start_stage('fail', fail_stages, fail_queue, done_queue, 1, stop)
+    threading.Thread(target=_render, args=(renderer, fail_jobs, upload_queue, UPLOAD_WORKERS, stop), daemon=True).start()
+
+    # Checkpoint the failed jobs as they come out of the pipeline, the database is only used on this thread
+    success, checkpoints = 0, []
+    try:
+        while (job_id := done_queue.get()) is not _END:
+            success += 1
+            checkpoints.append(job_id)
+            if len(checkpoints) >= CHECKPOINT_BATCH_SIZE:
+                __save_checkpoints(checkpoints)
+                checkpoints = []
+    except BaseException:
+        # The stages block on the full queues once this thread stops reading, they are stopped and drained,
+        # the jobs failed by the calls in flight are checkpointed with the others
+        stop.set()
+        while (job_id := done_queue.get()) is not _END:
+            checkpoints.append(job_id)
+        raise
+    finally:
+        __save_checkpoints(checkpoints)
+
+    logger.info(f"Successfully processed {success}/{len(fail_jobs)} records.")
     if success == 0:
         raise Exception('No job was failed')
 
 
 def fail_job_kll():
+    start, end = day_range()
     pickup_jobs = PickupJob.objects.filter(
-        Q(created_date__date=timezone.now().date()) &
+        Q(created_date__gte=start) & Q(created_date__lt=end) &
         Q(call_center_sent_time__isnull=False) &
         Q(route_id__isnull=False) &
         Q(status=PickupJobStatusChoices.IN_PROGRESS) &
         Q(call_center_status='Fail') &
-        Q(driver_id=1682343)
+        Q(driver_id=1682343) &
+        Q(fail_submitted_at__isnull=True)
     )
 
-    if not pickup_jobs.exists():
+    job_ids = list(pickup_jobs.values_list('job_id', flat=True))
+    if not job_ids:
         logger.info('No jobs KLL found for fail')
         return
 
-    for chunk in chunk_list(pickup_jobs, 1000):
-        job_ids = [job.job_id for job in chunk]
-        fail_job_task.delay(job_ids, 2711)
+    for chunk in chunk_list(job_ids, 1000):
+        fail_job_task.delay(chunk, 2711)
 
 
 def fail_job_sh():
+    start, end = day_range()
     pickup_jobs = PickupJob.objects.filter(
-        Q(created_date__date=timezone.now().date()) &
+        Q(created_date__gte=start) & Q(created_date__lt=end) &
         Q(call_center_sent_time__isnull=False) &
         Q(route_id__isnull=False) &
         Q(status=PickupJobStatusChoices.IN_PROGRESS) &
         Q(call_center_status='Success') &
-        Q(driver_id=1682343)
+        Q(driver_id=1682343) &
+        Q(fail_submitted_at__isnull=True)
     )
 
-    if not pickup_jobs.exists():
+    job_ids = list(pickup_jobs.values_list('job_id', flat=True))
+    if not job_ids:
         logger.info('No jobs SH found for fail')
         return
 
-    for chunk in chunk_list(pickup_jobs, 1000):
-        job_ids = [job.job_id for job in chunk]
-        fail_job_task.delay(job_ids, 2550)
+    for chunk in chunk_list(job_ids, 1000):
+        fail_job_task.delay(chunk, 2550)
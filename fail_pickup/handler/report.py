@@ -10,10 +10,9 @@ from google_wrapper.utils.card_builder.elements import (
     CardHeader,
     Section,
 )
-from opv2.base.pickup import PickupJobStatusChoices
-from stos.utils import configs
-from .collect_data import collect_job_info
-from ..models import PickupJob, Route, PickupJobOrder
+from stos.utils import configs, rollups, day_range
+from .rollup import FAIL_PICKUP_ROLLUP
+from ..models import Route
 
 logger = logging.getLogger(__name__)
 
@@ -46,43 +45,25 @@ def _build_report_card(total, fail_success, ops_overwrite, not_ready, total_pack
 
 
 def report_fail_job():
-    collect_job_info()
-    route = Route.objects.filter(
-        Q(created_date__date=timezone.now().date()) &
+    """
+    Report the fail pickup jobs of the day from the pre-aggregated rollup.
+    """
+    start, end = day_range()
+    has_route = Route.objects.filter(
+        Q(created_date__gte=start) & Q(created_date__lt=end) &
         Q(archived=False)
-    ).first()
+    ).exists()
 
-    if route is None:
+    if not has_route:
         return
 
-    pickup_jobs = PickupJob.objects.filter(
-        Q(created_date__date=timezone.now().date())
-    )
-
-    total = pickup_jobs.count()
-    fail_success = pickup_jobs.filter(
-        Q(driver_id=1682343) &
-        Q(status=PickupJobStatusChoices.FAILED)
-    ).count()
-
-    ops_overwrite = pickup_jobs.filter(
-        Q(route_id=route.route_id) &
-        ~Q(driver_id=1682343)
-    ).count()
-
-    not_ready = pickup_jobs.filter(
-        Q(route__isnull=True)
-    ).count()
-
-    total_package = PickupJobOrder.objects.filter(
-        Q(job_id__in=pickup_jobs)
-    ).count()
-
-    fail_package = PickupJobOrder.objects.filter(
-        Q(job_id__in=pickup_jobs) &
-        Q(job_id__status=PickupJobStatusChoices.FAILED) &
-        Q(job_id__driver_id=1682343)
-    ).count()
+    metrics = rollups.get(FAIL_PICKUP_ROLLUP)
+    total = metrics.get('total_jobs', 0)
+    fail_success = metrics.get('failed_jobs', 0)
+    ops_overwrite = metrics.get('ops_overwrite_jobs', 0)
+    not_ready = metrics.get('not_ready_jobs', 0)
+    total_package = metrics.get('total_packages', 0)
+    fail_package = metrics.get('failed_packages', 0)
 
     logger.info(
         f"Fail: {fail_success}/{total}, Ops Overwrite: {ops_overwrite}, Not Ready: {not_ready}, Fail Package: {fail_package}/{total_package}")
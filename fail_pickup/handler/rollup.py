@@ -0,0 +1,67 @@
+import logging
+from datetime import date
+
+from django.db.models import Count, Q
+
+from opv2.base.pickup import PickupJobStatusChoices
+from stos.utils import rollups, day_range
+from ..models import PickupJob, PickupJobOrder
+
+logger = logging.getLogger(__name__)
+
+FAIL_PICKUP_ROLLUP = 'fail_pickup'
+FAIL_DRIVER_ID = 1682343
+
+
+@rollups.register(FAIL_PICKUP_ROLLUP)
+def aggregate_fail_pickup(day: date) -> dict:
+    """
+    Aggregate the pickup jobs created on the day and their packages.
+
+    Returns:
+        dict: Job and package counts, overall and by status.
+    """
+    start, end = day_range(day)
+    day_jobs = Q(created_date__gte=start) & Q(created_date__lt=end)
+    # Jobs submitted by the fail pipeline count as failed before the job info sync confirms their status
+    failed = (Q(status=PickupJobStatusChoices.FAILED) | Q(fail_submitted_at__isnull=False)) & Q(driver_id=FAIL_DRIVER_ID)
+
+    jobs = PickupJob.objects.filter(day_jobs).aggregate(
+        total_jobs=Count('job_id'),
+        failed_jobs=Count('job_id', filter=failed),
+        ops_overwrite_jobs=Count('job_id', filter=Q(route__isnull=False) & Q(route__archived=False) & ~Q(driver_id=FAIL_DRIVER_ID)),
+        not_ready_jobs=Count('job_id', filter=Q(route__isnull=True)),
+    )
+    jobs['jobs_by_status'] = {
+        f'{row["status"]}': row['count']
+        for row in PickupJob.objects.filter(day_jobs).values('status').annotate(count=Count('job_id'))
+    }
+
+    # Packages follow the jobs of the day through the job_id foreign key index
+    packages = PickupJobOrder.objects.filter(
+        Q(job_id__created_date__gte=start) & Q(job_id__created_date__lt=end)
+    )
+    jobs.update(packages.aggregate(
+        total_packages=Count('id'),
+        failed_packages=Count('id', filter=(
+            (Q(job_id__status=PickupJobStatusChoices.FAILED) | Q(job_id__fail_submitted_at__isnull=False))
+            & Q(job_id__driver_id=FAIL_DRIVER_ID)
+        )),
+    ))
+    jobs['packages_by_status'] = {
+        f'{row["job_id__status"]}': row['count']
+        for row in packages.values('job_id__status').annotate(count=Count('id'))
+    }
+
+    return jobs
+
+
+def refresh_rollup(day: date = None):
+    """
+    Refresh the fail pickup rollup, called by the fail pickup handlers after their writes.
+    """
+    try:
+        rollups.refresh(FAIL_PICKUP_ROLLUP, day)
+    except Exception as e:
+        # The rollup is derived data, a failed refresh must not fail the write it follows
+        logger.error(f"Failed to refresh fail pickup rollup: {e}")
@@ -8,7 +8,9 @@ from simple_history.utils import bulk_update_with_history
 
 from opv2.base.pickup import PickupJobStatusChoices
 from opv2.services import RouteService, PickupService
+from stos.utils import day_range
 from .collect_data import collect_job_info
+from .rollup import refresh_rollup
 from ..models import PickupJob, Route, PickupJobOrder
 
 logger = logging.getLogger(__name__)
@@ -39,8 +41,9 @@ def __create_route():
 
 def __route_available() -> Route:
     try:
+        start, end = day_range()
         route = Route.objects.get(
-            Q(created_date__date=timezone.now().date()) &
+            Q(created_date__gte=start) & Q(created_date__lt=end) &
             Q(archived=False)
         )
         return route
@@ -55,8 +58,9 @@ def __route_available() -> Route:
 
 
 def job_routing():
+    start, end = day_range()
     pickup_jobs = PickupJob.objects.filter(
-        Q(created_date__date=timezone.now().date()) &
+        Q(created_date__gte=start) & Q(created_date__lt=end) &
         Q(route_id__isnull=True) &
         Q(status=PickupJobStatusChoices.READY_FOR_ROUTING)
     )
@@ -91,6 +95,7 @@ def job_routing():
     try:
         success = bulk_update_with_history(update, PickupJob, ['route', 'updated_date'], batch_size=1000)
         logger.info(f'Successfully updated {success} records')
+        refresh_rollup()
     except Exception as e:
         logger.error(f'Failed to update records: {e}')
         raise Exception('Failed to update records')
@@ -104,8 +109,9 @@ def job_routing():
 
 def start_route():
     collect_job_info()
+    start, end = day_range()
     route = Route.objects.filter(
-        Q(created_date__date=timezone.now().date()) &
+        Q(created_date__gte=start) & Q(created_date__lt=end) &
         Q(archived=False)
     ).first()
 
@@ -141,8 +147,9 @@ def start_route():
 
 
 def archive_route():
+    start, end = day_range()
     routes = Route.objects.filter(
-        Q(created_date__date=timezone.now().date()) &
+        Q(created_date__gte=start) & Q(created_date__lt=end) &
         Q(archived=False)
     )
 
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fail_pickup', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalpickupjob',
+            name='fail_submitted_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='pickupjob',
+            name='fail_submitted_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fail_pickup', '0002_pickupjob_fail_submitted_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pickupjob',
+            index=models.Index(fields=['created_date'], name='fail_pickup_created_55e1b4_idx'),
+        ),
+    ]
@@ -20,10 +20,14 @@ class PickupJob(BasePickup):
     shipper_address = models.CharField(max_length=255, null=True)
     call_center_status = models.CharField(max_length=255, null=True)
     call_center_sent_time = models.DateTimeField(null=True)
+    fail_submitted_at = models.DateTimeField(null=True)  # Checkpoint, set once the job is failed on the Driver App
 
     class Meta:
         verbose_name = 'Fail Pickup Job'
         verbose_name_plural = 'Fail Pickup Jobs'
+        indexes = [
+            models.Index(fields=['created_date']),
+        ]
 
 
 class PickupJobOrder(BaseModel):
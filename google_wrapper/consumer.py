@@ -0,0 +1,195 @@
+import json
+import logging
+import signal
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from celery import current_app
+from celery_once import AlreadyQueued, QueueOnce
+from django.core.cache import cache
+from google.api_core.exceptions import AlreadyExists
+from google.cloud import pubsub_v1
+from google.cloud.pubsub_v1.subscriber.message import Message
+
+from .services import GooglePubSubService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Route:
+    """
+    Dispatch of the messages of a subscription to a Celery task.
+
+    Attributes:
+        subscription (str): The subscription pulled.
+        task (str): The name of the Celery task started by the messages, e.g. '[Shein] Handle'.
+        topic (str, optional): The topic of the subscription, used to create the missing subscriptions.
+        key (str, optional): Message attribute or payload field debounced separately, e.g. 'tracking_id'.
+            Defaults to None, debouncing the whole subscription.
+        debounce (int): Seconds the messages of a key are coalesced into a single task, started at the end
+            of the window. Defaults to 5.
+    """
+    subscription: str
+    task: str
+    topic: Optional[str] = None
+    key: Optional[str] = None
+    debounce: int = 5
+
+
+def _message_key(route: Route, message: Message) -> str:
+    """
+    Get the debounce key of a message, from its attributes first then from its JSON payload.
+    """
+    if not route.key:
+        return '*'
+
+    if route.key in message.attributes:
+        return message.attributes[route.key]
+
+    try:
+        payload = json.loads(message.data)
+    except ValueError:
+        return '*'
+    if not isinstance(payload, dict):
+        return '*'
+
+    # Messages sent by GooglePubSubService.publish_message wrap the payload in an envelope
+    body = payload.get('message', payload)
+    if isinstance(body, dict) and body.get(route.key) is not None:
+        return str(body[route.key])
+    return '*'
+
+
+class PubSubConsumer:
+    """
+    Long-running consumer starting Celery tasks from Pub/Sub messages.
+
+    Every route is pulled over its own streaming pull, sharing the flow control limits. A message is
+    acknowledged once its task is scheduled or already queued, and nacked for redelivery when the scheduling fails.
+    Tasks are started through their registered class, a QueueOnce task takes its once lock like from the beat.
+    """
+
+    def __init__(self, service: GooglePubSubService, routes: List[Route], max_messages: int = 100,
+                 max_bytes: int = 10 * 1024 * 1024, ack_deadline: int = 60, logger: logging.Logger = logger):
+        """
+        Args:
+            service (GooglePubSubService): The Pub/Sub service of the project.
+            routes (List[Route]): The dispatch table.
+            max_messages (int, optional): Maximum outstanding messages per subscription. Defaults to 100.
+            max_bytes (int, optional): Maximum outstanding bytes per subscription. Defaults to 10 MB.
+            ack_deadline (int, optional): Seconds a message is leased before redelivery. Defaults to 60.
+            logger (logging.Logger, optional): Logger instance. Defaults to the module logger.
+        """
+        self.service = service
+        self.routes = routes
+        self.ack_deadline = ack_deadline
+        self.flow_control = pubsub_v1.types.FlowControl(
+            max_messages=max_messages,
+            max_bytes=max_bytes,
+            min_duration_per_lease_extension=ack_deadline,
+            max_duration_per_lease_extension=ack_deadline,
+        )
+        self._logger = logger
+        self._stopped = threading.Event()
+
+        # The tasks are registered by the autodiscovery of the worker, an unknown task fails the consumer start
+        current_app.loader.import_default_modules()
+        self._tasks = {route.task: current_app.tasks[route.task] for route in routes}
+
+    def create_subscriptions(self):
+        """
+        Create the topics and subscriptions of the routes which do not exist yet, e.g. on the emulator.
+        """
+        for route in self.routes:
+            if not route.topic:
+                continue
+            try:
+                self.service.create_topic(route.topic)
+            except AlreadyExists:
+                pass
+            try:
+                self.service.create_subscription(route.subscription, route.topic, ack_deadline_seconds=self.ack_deadline)
+            except AlreadyExists:
+                pass
+
+    def dispatch(self, route: Route, message: Message) -> bool:
+        """
+        Schedule the task of a message, unless a task of the same key is already scheduled.
+
+        Returns:
+            bool: True if a task was scheduled, False if the message was coalesced or its task already queued.
+        """
+        key = _message_key(route, message)
+        if route.debounce and not cache.add(f'pubsub:{route.subscription}:{key}', message.message_id, timeout=route.debounce):
+            self._logger.debug(f"Coalesced message {message.message_id} of {route.subscription} key {key}")
+            return False
+
+        task = self._tasks[route.task]
+        # Raise instead of the graceful rejection, the message is coalesced into the queued or running task
+        options = {'once': {'graceful': False}} if isinstance(task, QueueOnce) else {}
+        try:
+            task.apply_async(countdown=route.debounce, **options)
+        except AlreadyQueued:
+            self._logger.debug(f"Coalesced message {message.message_id} of {route.subscription}, '{route.task}' is already queued")
+            return False
+
+        self._logger.info(f"Scheduled '{route.task}' in {route.debounce}s from message {message.message_id} of {route.subscription}")
+        return True
+
+    def _callback(self, route: Route) -> Callable[[Message], None]:
+        def callback(message: Message):
+            try:
+                self.dispatch(route, message)
+            except Exception as error:
+                self._logger.error(f"Error dispatching message {message.message_id} of {route.subscription}: {error}")
+                message.nack()
+                return
+            message.ack()
+
+        return callback
+
+    def stop(self, *args):
+        self._stopped.set()
+
+    def run(self, timeout: float = None):
+        """
+        Pull the subscriptions until stopped by SIGINT/SIGTERM, the timeout or a failed stream.
+
+        Args:
+            timeout (float, optional): Seconds to consume before stopping. Defaults to forever.
+
+        Raises:
+            Exception: The error of a streaming pull which stopped.
+        """
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+
+        futures = {
+            route.subscription: self.service.subscribe(route.subscription, self._callback(route), flow_control=self.flow_control)
+            for route in self.routes
+        }
+        timer = threading.Timer(timeout, self.stop) if timeout else None
+        if timer:
+            timer.start()
+
+        try:
+            while not self._stopped.wait(1):
+                for subscription, future in futures.items():
+                    if future.done():
+                        self._logger.error(f"Streaming pull of {subscription} stopped")
+                        future.result()
+                        raise RuntimeError(f"Streaming pull of {subscription} stopped")
+        finally:
+            if timer:
+                timer.cancel()
+            for future in futures.values():
+                future.cancel()
+            for subscription, future in futures.items():
+                try:
+                    future.result(timeout=30)
+                except Exception as error:
+                    self._logger.debug(f"Streaming pull of {subscription} closed: {error}")
+            self._logger.info("Pub/Sub consumer stopped")
@@ -1,35 +1,208 @@
+import atexit
+import copy
 import json
 import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
 
 import requests
 
+from core.patterns import SingletonMeta
 from ..utils.card_builder import CardV2
 
+_local = threading.local()
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update({'Content-Type': 'application/json; charset=UTF-8'})
+    return session
+
+
+def _thread_session() -> requests.Session:
+    # Keep-alive session of the calling thread, a forked process inherits the locals of the forking thread
+    # and opens its own connections
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.session = _new_session()
+        _local.pid = os.getpid()
+    return _local.session
+
+
+def _payload(message: Optional[str], card: Optional[CardV2]) -> dict:
+    if not message and not card:
+        raise ValueError("Message or card must be provided.")
+
+    return {
+        'text': message,
+        'cardsV2': [card.to_dict()] if card else []
+    }
+
 
 class GoogleChatService:
     def __init__(self, logger: logging.Logger = logging.getLogger(__name__)):
         self.__logger = logger
 
     def webhook_send(self, webhook_url: str, message: str = None, card: CardV2 = None):
-        if not message and not card:
-            raise ValueError("Message or card must be provided.")
-
-        headers = {
-            'Content-Type': 'application/json; charset=UTF-8'
-        }
-
-        data = {
-            'text': message,
-            'cardsV2': [card.to_dict()] if card else []
-        }
+        data = _payload(message, card)
 
         try:
-            response = requests.post(
-                webhook_url, headers=headers, data=json.dumps(data)
-            )
+            response = _thread_session().post(webhook_url, data=json.dumps(data))
             response.raise_for_status()
         except requests.HTTPError as e:
             if e.response.status_code == 400:
                 self.__logger.error(f"Failed to webhook send: {e}")
         except requests.RequestException as e:
             self.__logger.error(f"Failed to webhook send: {e}")
+
+    @staticmethod
+    def send_async(webhook_url: str, message: str = None, card: CardV2 = None, coalesce_key: str = None):
+        """
+        Queue a message for the background sender of the process and return immediately.
+
+        Args:
+            webhook_url (str): The webhook of the space.
+            message (str, optional): The text of the message.
+            card (CardV2, optional): The card of the message.
+            coalesce_key (str, optional): Identical alerts share a key, the repeats within the coalescing
+                window are sent as one card with a count. Defaults to no coalescing.
+        """
+        ChatNotifier().send(webhook_url, _payload(message, card), coalesce_key)
+
+    @staticmethod
+    def flush(timeout: float = 30) -> bool:
+        """
+        Wait until the queued messages and the pending repeat counts are sent.
+
+        Returns:
+            bool: True if everything was sent within the timeout.
+        """
+        return ChatNotifier().flush(timeout)
+
+
+@dataclass
+class _Window:
+    webhook_url: str
+    data: dict
+    opened_at: float
+    repeats: int = 0
+
+
+class ChatNotifier(metaclass=SingletonMeta):
+    """
+    Background sender of the Google Chat messages of the process.
+
+    Messages are queued in memory and sent by a daemon thread over its own keep-alive session, at most `rate`
+    messages per second with bursts of `burst` (the webhooks of a space accept about one message per second).
+    The first alert of a coalescing key is sent right away, its repeats within `window` seconds are counted
+    and sent as a single copy of the alert with the count when the window closes.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 5, window: float = 60, logger: logging.Logger = logging.getLogger(__name__)):
+        self.rate = rate
+        self.burst = burst
+        self.window = window
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue: queue.Queue = None
+        self._session: requests.Session = None
+        self._windows: Dict[str, _Window] = {}
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+
+    def _ensure_sender(self):
+        # Forked pool processes inherit the queue and the session but not the sender thread, each process
+        # starts its own with a new session used by the sender thread only
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._session = _new_session()
+            self._windows = {}
+            threading.Thread(target=self._run, name='chat-notifier', daemon=True).start()
+
+    def send(self, webhook_url: str, data: dict, coalesce_key: str = None):
+        self._ensure_sender()
+        self._queue.put((webhook_url, data, coalesce_key))
+
+    def flush(self, timeout: float = 30) -> bool:
+        if self._pid != os.getpid():
+            return True
+
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=1)
+            except queue.Empty:
+                item = None
+
+            try:
+                if isinstance(item, threading.Event):
+                    self._close_windows(force=True)
+                    item.set()
+                    continue
+                if item is not None:
+                    self._handle(*item)
+                self._close_windows()
+            except Exception as e:
+                self._logger.error(f"Chat notifier error: {e}")
+
+    def _handle(self, webhook_url: str, data: dict, coalesce_key: Optional[str]):
+        if coalesce_key:
+            window = self._windows.get(coalesce_key)
+            if window is not None:
+                window.repeats += 1
+                return
+            self._windows[coalesce_key] = _Window(webhook_url, data, opened_at=time.monotonic())
+        self._post(webhook_url, data)
+
+    def _close_windows(self, force: bool = False):
+        now = time.monotonic()
+        for key, window in list(self._windows.items()):
+            if not force and now - window.opened_at < self.window:
+                continue
+            del self._windows[key]
+            if window.repeats:
+                data = copy.deepcopy(window.data)
+                data['text'] = f"Repeated {window.repeats} more time(s) in the last {int(now - window.opened_at)}s"
+                self._post(window.webhook_url, data)
+
+    def _take_token(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            time.sleep((1 - self._tokens) / self.rate)
+
+    def _post(self, webhook_url: str, data: dict, attempts: int = 3):
+        for attempt in range(1, attempts + 1):
+            self._take_token()
+            try:
+                response = self._session.post(webhook_url, data=json.dumps(data))
+                if response.status_code == 429 and attempt < attempts:
+                    time.sleep(attempt)
+                    continue
+                response.raise_for_status()
+                return
+            except requests.RequestException as e:
+                self._logger.error(f"Failed to webhook send: {e}")
+                return
+
+
+def _flush_on_exit():
+    GoogleChatService.flush(timeout=10)
+
+
+atexit.register(_flush_on_exit)
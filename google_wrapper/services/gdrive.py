@@ -1,8 +1,10 @@
 import io
 import logging
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Union
 
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
@@ -12,6 +14,40 @@ from ..dto import FileDTO
 from ..models import ServiceAccount
 
 
+class _DownloadStream(io.RawIOBase):
+    """
+    Readable stream over a Drive download, fetching the next chunk once the previous one is consumed,
+    so at most one chunk of the file is held in memory.
+    """
+
+    def __init__(self, request, chunk_size: int, logger: logging.Logger):
+        self.__logger = logger
+        self.__buffer = io.BytesIO()
+        self.__downloader = MediaIoBaseDownload(self.__buffer, request, chunksize=chunk_size)
+        self.__chunk = b''
+        self.__offset = 0
+        self.__done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while self.__offset >= len(self.__chunk):
+            if self.__done:
+                return 0
+            status, self.__done = self.__downloader.next_chunk()
+            self.__logger.info(f"Download {int(status.progress() * 100)}%.")
+            self.__chunk = self.__buffer.getvalue()
+            self.__offset = 0
+            self.__buffer.seek(0)
+            self.__buffer.truncate()
+
+        size = min(len(b), len(self.__chunk) - self.__offset)
+        b[:size] = self.__chunk[self.__offset:self.__offset + size]
+        self.__offset += size
+        return size
+
+
 class GoogleDriveService:
     def __init__(self, service_account: ServiceAccount, logger: logging.Logger = logging.getLogger(__name__)):
         """Initialize the GoogleDriveService using a GoogleServiceAccount model instance."""
@@ -136,33 +172,69 @@ class GoogleDriveService:
             self.__logger.error(f"Error in get_or_convert_to_google_sheet: {e}")
             raise Exception(f"Error in get_or_convert_to_google_sheet: {e}")
 
-    def csv_get_all_records(self, file_id: str) -> pd.DataFrame:
+    def _open_csv(self, file_id: str, columns: Optional[List[str]], dtypes: Optional[Dict[str, Union[str, pa.DataType]]],
+                  block_size: int, chunk_size: int) -> pa_csv.CSVStreamingReader:
+        request = self.drive_service.files().get_media(fileId=file_id)
+        stream = _DownloadStream(request, chunk_size=chunk_size, logger=self.__logger)
+        column_types = {
+            column: pa.type_for_alias(dtype) if isinstance(dtype, str) else dtype
+            for column, dtype in (dtypes or {}).items()
+        }
+        return pa_csv.open_csv(
+            stream,
+            read_options=pa_csv.ReadOptions(block_size=block_size),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=columns or [],
+                column_types=column_types,
+                strings_can_be_null=True,
+            ),
+        )
+
+    def csv_stream_batches(self, file_id: str, columns: Optional[List[str]] = None,
+                           dtypes: Optional[Dict[str, Union[str, pa.DataType]]] = None,
+                           block_size: int = 1024 * 1024, chunk_size: int = 8 * 1024 * 1024) -> Iterator[pa.RecordBatch]:
         """
-        Download a CSV file from Google Drive and return its content as a Pandas DataFrame.
+        Stream a CSV file from Google Drive as record batches, parsed while the download is in flight.
+
+        The column types are inferred from the first block, give the `dtypes` of the columns whose values
+        may not match it later in the file (e.g. ids which look numeric, or dates to keep as strings).
 
         :param file_id: The ID of the CSV file on Google Drive.
-        :return: A Pandas DataFrame containing the CSV data.
+        :param columns: The columns to read, all by default.
+        :param dtypes: The types of some columns, by column name, e.g. {'tracking_id': 'string'}.
+        :param block_size: The bytes of CSV parsed into each record batch.
+        :param chunk_size: The bytes downloaded per request.
+        :return: An iterator of pyarrow RecordBatches.
         """
         try:
-            # Request the file content from Google Drive
-            request = self.drive_service.files().get_media(fileId=file_id)
-            file_io = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_io, request)
+            reader = self._open_csv(file_id, columns, dtypes, block_size, chunk_size)
+            for batch in reader:
+                yield batch
+            self.__logger.info(f"Successfully streamed records from CSV file (ID: {file_id}).")
 
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                self.__logger.info(f"Download {int(status.progress() * 100)}%.")
+        except (HttpError, pa.ArrowInvalid) as e:
+            self.__logger.error(f"Failed to download or parse CSV file: {e}")
+            raise Exception(f"Failed to download or parse CSV file: {e}")
 
-            # Seek to the start of the file in the buffer
-            file_io.seek(0)
+    def csv_get_all_records(self, file_id: str, columns: Optional[List[str]] = None,
+                            dtypes: Optional[Dict[str, Union[str, pa.DataType]]] = None) -> pd.DataFrame:
+        """
+        Download a CSV file from Google Drive and return its content as a Pandas DataFrame.
 
-            # Read the CSV file content into a Pandas DataFrame
-            df = pd.read_csv(io.BytesIO(file_io.getvalue()))
+        The file is parsed while it downloads, see `csv_stream_batches` to process it batch by batch instead.
+
+        :param file_id: The ID of the CSV file on Google Drive.
+        :param columns: The columns to read, all by default.
+        :param dtypes: The types of some columns, by column name.
+        :return: A Pandas DataFrame containing the CSV data.
+        """
+        try:
+            table = self._open_csv(file_id, columns, dtypes, block_size=1024 * 1024, chunk_size=8 * 1024 * 1024).read_all()
+            df = table.to_pandas()
 
             self.__logger.info(f"Successfully retrieved records from CSV file (ID: {file_id}).")
             return df
 
-        except HttpError as e:
+        except (HttpError, pa.ArrowInvalid) as e:
             self.__logger.error(f"Failed to download or parse CSV file: {e}")
             raise Exception(f"Failed to download or parse CSV file: {e}")
@@ -1,16 +1,65 @@
+import atexit
 import json
 import logging
-from typing import Optional, Union
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 from uuid import uuid4
 
 from django.utils import timezone
 from google.api_core.exceptions import AlreadyExists, GoogleAPIError
 from google.auth import jwt
 from google.cloud import pubsub_v1
+from google.cloud.pubsub_v1.subscriber.futures import StreamingPullFuture
 from google.pubsub_v1.types import pubsub
 
 from ..models import ServiceAccount
 
+# Batches of up to 500 messages or 1 MB, sent at the latest 50 ms after their first message
+DEFAULT_BATCH_SETTINGS = pubsub_v1.types.BatchSettings(max_messages=500, max_bytes=1024 * 1024, max_latency=0.05)
+
+# Publisher clients shared by the services of the process, by service account and publishing options
+_publishers: Dict[tuple, pubsub_v1.PublisherClient] = {}
+_publishers_lock = threading.Lock()
+
+
+def _shared_publisher(service_account: ServiceAccount, batch_settings: pubsub_v1.types.BatchSettings,
+                      enable_ordering: bool) -> pubsub_v1.PublisherClient:
+    """
+    Get the long-lived publisher client of the process for a service account and publishing options.
+    """
+    key = (service_account.private_key_id, tuple(batch_settings), enable_ordering)
+    with _publishers_lock:
+        if key not in _publishers:
+            credentials = jwt.Credentials.from_service_account_info(
+                service_account.to_dict(),
+                audience="https://pubsub.googleapis.com/google.pubsub.v1.Publisher"
+            )
+            _publishers[key] = pubsub_v1.PublisherClient(
+                batch_settings=batch_settings,
+                publisher_options=pubsub_v1.types.PublisherOptions(enable_message_ordering=enable_ordering),
+                credentials=credentials
+            )
+        return _publishers[key]
+
+
+def flush_publishers():
+    """
+    Send the pending batches of the shared publisher clients and close them, on process shutdown.
+    """
+    with _publishers_lock:
+        publishers = list(_publishers.values())
+        _publishers.clear()
+
+    for publisher in publishers:
+        try:
+            publisher.stop()
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Error flushing the Pub/Sub publisher: {e}")
+
+
+atexit.register(flush_publishers)
+
 
 class GooglePubSubService:
     """
@@ -22,20 +71,24 @@ class GooglePubSubService:
         __logger (logging.Logger): Logger for recording Pub/Sub operations.
     """
 
-    def __init__(self, service_account: ServiceAccount, logger: logging.Logger = logging.getLogger(__name__)):
+    def __init__(self, service_account: ServiceAccount, logger: logging.Logger = logging.getLogger(__name__),
+                 batch_settings: pubsub_v1.types.BatchSettings = DEFAULT_BATCH_SETTINGS, enable_ordering: bool = False):
         """
         Initialize the GooglePubSubService using a GoogleServiceAccount model instance.
 
         Args:
             service_account (ServiceAccount): The service account containing project credentials.
             logger (logging.Logger, optional): Logger instance for logging messages. Defaults to the module logger.
+            batch_settings (pubsub_v1.types.BatchSettings, optional): Batching of the published messages.
+                Defaults to DEFAULT_BATCH_SETTINGS.
+            enable_ordering (bool, optional): Deliver the messages of an ordering key in publish order. Defaults to False.
         """
         self.__logger = logger
         self.__service_account = service_account
         self.__project_id = self.__service_account.project_id
 
-        # Initialize publisher and subscriber clients
-        self.__publisher = self._create_pubsub_client('Publisher')
+        # The publisher is shared by the process so its batches span the service instances
+        self.__publisher = _shared_publisher(service_account, batch_settings, enable_ordering)
         self.__subscriber = self._create_pubsub_client('Subscriber')
 
     def _create_pubsub_client(self, audience: str) -> Union[pubsub_v1.PublisherClient, pubsub_v1.SubscriberClient]:
@@ -85,7 +138,8 @@ class GooglePubSubService:
             self.__logger.error(f"An unexpected error occurred: {e}")
             raise
 
-    def create_subscription(self, subscription_name: str, topic_name: str, push_endpoint: Optional[str] = None) -> pubsub.Subscription:
+    def create_subscription(self, subscription_name: str, topic_name: str, push_endpoint: Optional[str] = None,
+                            ack_deadline_seconds: Optional[int] = None) -> pubsub.Subscription:
         """
         Create a Pub/Sub subscription for the given topic.
 
@@ -93,6 +147,8 @@ class GooglePubSubService:
             subscription_name (str): The name of the subscription to create.
             topic_name (str): The topic to subscribe to.
             push_endpoint (Optional[str], optional): The push endpoint for the subscription. Defaults to None.
+            ack_deadline_seconds (Optional[int], optional): Seconds to acknowledge a message before redelivery. Defaults to
+                the Pub/Sub default of 10 seconds.
 
         Returns:
             pubsub.Subscription: The created Pub/Sub subscription.
@@ -103,14 +159,15 @@ class GooglePubSubService:
         """
         subscription_path = self.__subscriber.subscription_path(self.__project_id, subscription_name)
         topic_path = self.__publisher.topic_path(self.__project_id, topic_name)
+        request = {
+            "name": subscription_path,
+            "topic": topic_path,
+            "push_config": {"push_endpoint": push_endpoint} if push_endpoint else {}
+        }
+        if ack_deadline_seconds:
+            request["ack_deadline_seconds"] = ack_deadline_seconds
         try:
-            subscription = self.__subscriber.create_subscription(
-                request={
-                    "name": subscription_path,
-                    "topic": topic_path,
-                    "push_config": {"push_endpoint": push_endpoint} if push_endpoint else {}
-                }
-            )
+            subscription = self.__subscriber.create_subscription(request=request)
             self.__logger.info(f"Subscription created: {subscription.name}")
             return subscription
         except AlreadyExists:
@@ -123,13 +180,43 @@ class GooglePubSubService:
             self.__logger.error(f"An unexpected error occurred: {e}")
             raise
 
-    def publish_message(self, topic_name: str, message: dict) -> str:
+    @staticmethod
+    def _encode(topic_name: str, message: dict) -> bytes:
+        """
+        Wrap a message payload in the envelope of the STOs messages.
+        """
+        publish_data = {
+            "uuid": str(uuid4()),
+            "datetime": timezone.now().isoformat(),
+            "topic": topic_name,
+            "message": message
+        }
+        return json.dumps(publish_data).encode("utf-8")
+
+    def publish(self, topic_name: str, message: dict, ordering_key: str = '') -> Future:
         """
-        Publish a message to a specified Pub/Sub topic.
+        Queue a message in the batch of a Pub/Sub topic without waiting for it to be sent.
 
         Args:
             topic_name (str): The name of the Pub/Sub topic to publish the message to.
             message (dict): The message payload to publish.
+            ordering_key (str, optional): Messages of a key are delivered in publish order, requires
+                `enable_ordering`. Defaults to no ordering.
+
+        Returns:
+            Future: Resolves to the message ID once the batch is sent.
+        """
+        topic_path = self.__publisher.topic_path(self.__project_id, topic_name)
+        return self.__publisher.publish(topic_path, data=self._encode(topic_name, message), ordering_key=ordering_key)
+
+    def publish_message(self, topic_name: str, message: dict, ordering_key: str = '') -> str:
+        """
+        Publish a message to a specified Pub/Sub topic and wait until it is sent.
+
+        Args:
+            topic_name (str): The name of the Pub/Sub topic to publish the message to.
+            message (dict): The message payload to publish.
+            ordering_key (str, optional): Ordering key of the message. Defaults to no ordering.
 
         Returns:
             str: The message ID of the published message.
@@ -138,19 +225,8 @@ class GooglePubSubService:
             GoogleAPIError: If there's a failure in publishing the message.
             Exception: For any unexpected error during publishing.
         """
-        topic_path = self.__publisher.topic_path(self.__project_id, topic_name)
         try:
-            publish_data = {
-                "uuid": str(uuid4()),
-                "datetime": timezone.now().isoformat(),
-                "topic": topic_name,
-                "message": message
-            }
-            data_to_publish = json.dumps(publish_data).encode("utf-8")
-
-            future = self.__publisher.publish(topic_path, data=data_to_publish)
-            message_id = future.result()
-
+            message_id = self.publish(topic_name, message, ordering_key=ordering_key).result()
             self.__logger.info(f"Published message '{message_id}' to topic '{topic_name}'")
             return message_id
         except GoogleAPIError as e:
@@ -160,13 +236,80 @@ class GooglePubSubService:
             self.__logger.error(f"An unexpected error occurred: {e}")
             raise
 
-    def subscribe(self, subscription_name: str, callback):
+    def publish_many(self, topic_name: str, messages: Iterable[dict],
+                     ordering_key: Union[str, Callable[[dict], str], None] = None) -> List[Future]:
+        """
+        Queue many messages in the batches of a Pub/Sub topic, sent together by the publisher.
+
+        Args:
+            topic_name (str): The name of the Pub/Sub topic to publish the messages to.
+            messages (Iterable[dict]): The message payloads to publish.
+            ordering_key (Union[str, Callable[[dict], str]], optional): Ordering key of all the messages, or a
+                function giving the key of each message. Defaults to no ordering.
+
+        Returns:
+            List[Future]: The future of each message, in order, see `wait_published`.
+        """
+        futures = []
+        for message in messages:
+            key = ordering_key(message) if callable(ordering_key) else ordering_key
+            futures.append(self.publish(topic_name, message, ordering_key=key or ''))
+
+        self.__logger.info(f"Queued {len(futures)} messages to topic '{topic_name}'")
+        return futures
+
+    def wait_published(self, topic_name: str, futures: List[Future], timeout: Optional[float] = None,
+                       ordering_keys: Iterable[str] = ()) -> Tuple[List[str], List[Tuple[int, Exception]]]:
+        """
+        Wait for published messages and aggregate their failures.
+
+        The publishing of an ordering key stops at its first failure, the given ordering keys are resumed
+        when any message failed so they can be published again.
+
+        Args:
+            topic_name (str): The topic the messages were published to.
+            futures (List[Future]): The futures returned by `publish` or `publish_many`.
+            timeout (float, optional): Seconds to wait for each message. Defaults to no limit.
+            ordering_keys (Iterable[str], optional): Ordering keys of the messages. Defaults to none.
+
+        Returns:
+            Tuple[List[str], List[Tuple[int, Exception]]]: The IDs of the sent messages, and the index and error
+            of the failed ones.
+        """
+        message_ids, errors = [], []
+        for index, future in enumerate(futures):
+            try:
+                message_ids.append(future.result(timeout=timeout))
+            except Exception as e:
+                errors.append((index, e))
+
+        if errors:
+            self.__logger.error(
+                f"Failed to publish {len(errors)}/{len(futures)} messages to topic '{topic_name}', first error: {errors[0][1]}"
+            )
+            topic_path = self.__publisher.topic_path(self.__project_id, topic_name)
+            for key in set(ordering_keys) - {''}:
+                self.__publisher.resume_publish(topic_path, key)
+        else:
+            self.__logger.info(f"Published {len(message_ids)} messages to topic '{topic_name}'")
+        return message_ids, errors
+
+    def subscribe(self, subscription_name: str, callback,
+                  flow_control: Optional[pubsub_v1.types.FlowControl] = None) -> StreamingPullFuture:
         """
         Subscribes to a Pub/Sub subscription and processes messages with the provided callback.
 
+        The messages are pulled over a streaming pull in background threads, the returned future
+        is used to wait on the stream or cancel it.
+
         Args:
             subscription_name (str): The name of the Pub/Sub subscription to subscribe to.
             callback: The callback function to process messages.
+            flow_control (Optional[pubsub_v1.types.FlowControl], optional): Limits of the outstanding messages
+                and bytes, and the lease extension of the messages. Defaults to the client defaults.
+
+        Returns:
+            StreamingPullFuture: The future of the streaming pull.
 
         Raises:
             GoogleAPIError: If there's a failure in subscribing to the topic.
@@ -174,8 +317,9 @@ class GooglePubSubService:
         """
         subscription_path = self.__subscriber.subscription_path(self.__project_id, subscription_name)
         try:
-            self.__subscriber.subscribe(subscription_path, callback=callback)
+            future = self.__subscriber.subscribe(subscription_path, callback=callback, flow_control=flow_control or ())
             self.__logger.info(f"Subscribed to '{subscription_name}'")
+            return future
         except GoogleAPIError as e:
             self.__logger.error(f"Failed to subscribe to '{subscription_name}': {e}")
             raise
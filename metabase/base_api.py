@@ -2,9 +2,10 @@ import logging
 import time
 
 import requests
-from django.core.cache import cache
 from django.utils import timezone
 
+from core.base.credentials import CredentialBroker
+from core.base.metrics import observe_http
 from core.patterns import SingletonMeta
 from google_wrapper.models import ServiceAccount
 from google_wrapper.services import GoogleSheetService, GoogleChatService
@@ -31,6 +32,7 @@ class SessionManager(metaclass=SingletonMeta):
         self.__logger = logger
         self.__configs = configs
         self.__webhook_url = self.__configs.get('ROOT_NOTIFICATION_WEBHOOK')
+        self.__broker = CredentialBroker('metabase', self.SESSION_CACHE_KEY, self.SESSION_CACHE_TIMEOUT, logger=self.__logger)
 
     @staticmethod
     def _build_card(header: str, message: str):
@@ -114,28 +116,27 @@ class SessionManager(metaclass=SingletonMeta):
 
     def update_session(self) -> None:
         """
-        Update the session by retrieving it from Google Sheets.
-        Retry until a valid session is fetched and cached.
+        Refresh the dead session from Google Sheets, once across the worker processes.
+        The elected refresher alerts and polls the sheet, the other processes wait for the new session.
         """
         chat_service = GoogleChatService(logger=self.__logger)
-        card = self._build_card(
-            header='<font color="#6953cc">Metabase Session ID Expired</font>',
-            message=f'Session ID: "{self.session}".\nPlease update token in Google Sheet.\nRetrying in 60 seconds.'
-        )
-        chat_service.webhook_send(self.__webhook_url, card=card)
-        time.sleep(60)
+
+        def on_expired(session_id: str):
+            card = self._build_card(
+                header='<font color="#6953cc">Metabase Session ID Expired</font>',
+                message=f'Session ID: "{session_id}".\nPlease update token in Google Sheet.'
+            )
+            chat_service.send_async(self.__webhook_url, card=card)
+
+        def on_updated(session_id: str):
+            card = self._build_card(
+                header='<font color="#e5ea60">Metabase Session Updated</font>',
+                message=f'Updated session ID: "{session_id}".'
+            )
+            chat_service.send_async(self.__webhook_url, card=card)
+
         try:
-            self.__logger.info('Attempting to update session...')
-            new_session = self._get_session_from_gsheet()
-            if new_session != self.session:
-                cache.set(self.SESSION_CACHE_KEY, new_session, timeout=self.SESSION_CACHE_TIMEOUT)
-                self.__logger.info('Session ID successfully updated and cached.')
-
-                card = self._build_card(
-                    header='<font color="#e5ea60">Metabase Session Updated</font>',
-                    message=f'Updated session ID: "{new_session}".'
-                )
-                chat_service.webhook_send(self.__webhook_url, card=card)
+            self.__broker.refresh(self._get_session_from_gsheet, on_expired=on_expired, on_updated=on_updated)
         except Exception as error:
             self.__logger.error(f'Error updating session ID: {error}')
             raise error
@@ -168,7 +169,7 @@ class SessionManager(metaclass=SingletonMeta):
         Returns:
             str: Cached session or None if not set.
         """
-        return cache.get(self.SESSION_CACHE_KEY)
+        return self.__broker.value
 
 
 class BaseAPI:
@@ -234,9 +235,11 @@ class BaseAPI:
         """
         self._set_session_headers()
 
+        started_at = time.perf_counter()
         try:
             self.__logger.debug(f"Payload: {payload}")
             response = self.session.request(method, url, json=payload, files=files)
+            observe_http(type(self).__name__, method, url, response.status_code, time.perf_counter() - started_at)
             self.__logger.info(f"{response.url} {response.request.method} {response.status_code}")
 
             response.raise_for_status()
@@ -248,5 +251,6 @@ class BaseAPI:
             return http_error.response.status_code, http_error.response.json()
 
         except requests.exceptions.RequestException as req_error:
+            observe_http(type(self).__name__, method, url, type(req_error).__name__, time.perf_counter() - started_at)
             self.__logger.error(f"Request failed due to error: {req_error}")
             return 500, {'error': 'Request failed due to error'}
@@ -6,6 +6,7 @@ from simple_history.utils import bulk_create_with_history, bulk_update_with_hist
 from opv2.services.network_service import NetworkService
 from stos.utils import chunk_list, check_record_change
 from ..models import Hub
+from ..reference import network_reference
 
 logger = logging.getLogger(__name__)
 
@@ -99,3 +100,6 @@ def collect_hubs():
             continue
 
     logger.info(f"Total success: {total_success}, Total updated: {total_updated}")
+
+    # The processes reload the zones and hubs on their next lookup
+    network_reference.invalidate()
@@ -4,6 +4,7 @@ from google_wrapper.services import GoogleSheetService
 from google_wrapper.utils import get_service_account
 from stos.utils import configs
 from .models import HubB2B, Hub
+from .reference import network_reference
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,12 @@ def manual_sync_b2b_zone():
     # Get the data from the Google Sheet
     data = gsheets_service.get_all_records(0)
 
+    # Load the hubs and B2B hubs of the sheet in two queries instead of one per row
+    hubs = Hub.objects.in_bulk({row.get('id') for row in data})
+    b2b_hubs = {}
+    for b2b_hub_obj in HubB2B.objects.filter(hub_name__in={row.get('b2b_hub') for row in data}).order_by('-id'):
+        b2b_hubs[b2b_hub_obj.hub_name] = b2b_hub_obj
+
     # Process the data
     update = []
     for row in data:
@@ -26,22 +33,21 @@ def manual_sync_b2b_zone():
         b2b_hub = row.get('b2b_hub')
 
         # Get the Hub object
-        try:
-            hub = Hub.objects.get(id=hub_id)
-        except Hub.DoesNotExist:
+        hub = hubs.get(hub_id)
+        if hub is None:
             logger.error(f"Hub with ID {hub_id} not found.")
             continue
 
         # Get the B2B Hub object
-        try:
-            b2b_hub_obj = HubB2B.objects.get(hub_name=b2b_hub)
-        except HubB2B.DoesNotExist:
+        b2b_hub_obj = b2b_hubs.get(b2b_hub)
+        if b2b_hub_obj is None:
             b2b_hub_obj = HubB2B.objects.create(
                 hub_name=b2b_hub,
                 code=row.get('code'),
                 latitude=row.get('latitude'),
                 longitude=row.get('longitude')
             )
+            b2b_hubs[b2b_hub] = b2b_hub_obj
 
         # Update the Hub object
         hub.b2b_hub = b2b_hub_obj
@@ -49,5 +55,6 @@ def manual_sync_b2b_zone():
 
     # Bulk update the Hub objects
     Hub.objects.bulk_update(update, ['b2b_hub'])
+    network_reference.invalidate()
 
     logger.info(f"B2B Hub sync completed. {len(update)}/{len(data)} Hubs updated.")
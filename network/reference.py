@@ -0,0 +1,275 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.core.cache import cache
+
+from .models import Hub, HubB2B, Zone
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'network:reference:version'
+EARTH_RADIUS_KM = 6371.0088
+
+
+@dataclass(frozen=True)
+class ZoneRef:
+    id: int
+    legacy_zone_id: Optional[int]
+    name: Optional[str]
+    short_name: Optional[str]
+    hub_id: Optional[int]
+    latitude: Optional[float]
+    longitude: Optional[float]
+
+
+@dataclass(frozen=True)
+class HubRef:
+    id: int
+    name: str
+    short_name: Optional[str]
+    active: bool
+    virtual_hub: bool
+    b2b_hub_id: Optional[int]
+    latitude: float
+    longitude: float
+
+
+@dataclass(frozen=True)
+class HubB2BRef:
+    id: int
+    hub_name: str
+    code: str
+    latitude: float
+    longitude: float
+
+
+def _unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """
+    Project coordinates in degrees on the unit sphere, the closest point by great-circle distance is the
+    one with the largest dot product.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lng = np.radians(np.asarray(longitudes, dtype=float))
+    return np.column_stack((np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)))
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in km between coordinates in degrees, element-wise for arrays.
+    """
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class _PointIndex:
+    """
+    Nearest-point index over the unit vectors of a list of references.
+    """
+
+    def __init__(self, items: Sequence):
+        self.items = list(items)
+        self.latitudes = np.array([item.latitude for item in self.items], dtype=float)
+        self.longitudes = np.array([item.longitude for item in self.items], dtype=float)
+        self.vectors = _unit_vectors(self.latitudes, self.longitudes)
+
+    def nearest(self, latitudes, longitudes, chunk_size: int = 2048) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the position and the distance in km of the nearest point of each coordinate.
+        """
+        queries = _unit_vectors(latitudes, longitudes)
+        positions = np.empty(len(queries), dtype=int)
+        for start in range(0, len(queries), chunk_size):
+            positions[start:start + chunk_size] = np.argmax(queries[start:start + chunk_size] @ self.vectors.T, axis=1)
+
+        distances = haversine(latitudes, longitudes, self.latitudes[positions], self.longitudes[positions])
+        return positions, distances
+
+
+class _Snapshot:
+    def __init__(self, version: int, zones: List[ZoneRef], hubs: List[HubRef], b2b_hubs: List[HubB2BRef]):
+        self.version = version
+        self.zones = {zone.id: zone for zone in zones}
+        self.hubs = {hub.id: hub for hub in hubs}
+        self.b2b_hubs = {b2b_hub.id: b2b_hub for b2b_hub in b2b_hubs}
+
+        # Zones, hubs and B2B hubs are loaded by id, the first one wins on duplicated legacy ids and names
+        self.zones_by_legacy_id: Dict[int, ZoneRef] = {}
+        self.zones_by_name: Dict[str, ZoneRef] = {}
+        for zone in zones:
+            if zone.legacy_zone_id is not None:
+                self.zones_by_legacy_id.setdefault(zone.legacy_zone_id, zone)
+            if zone.name:
+                self.zones_by_name.setdefault(zone.name, zone)
+
+        self.hubs_by_name: Dict[str, HubRef] = {}
+        for hub in hubs:
+            self.hubs_by_name.setdefault(hub.name, hub)
+
+        self.b2b_hubs_by_name: Dict[str, HubB2BRef] = {}
+        for b2b_hub in b2b_hubs:
+            self.b2b_hubs_by_name.setdefault(b2b_hub.hub_name, b2b_hub)
+
+        self._indexes: Dict[str, _PointIndex] = {}
+        self._lock = threading.Lock()
+
+    def index(self, name: str) -> Optional[_PointIndex]:
+        # Built on the first nearest query, most processes only use the lookups
+        with self._lock:
+            if name not in self._indexes:
+                if name == 'hubs':
+                    items = [hub for hub in self.hubs.values() if hub.active and not hub.virtual_hub]
+                elif name == 'all_hubs':
+                    items = list(self.hubs.values())
+                else:
+                    items = list(self.b2b_hubs.values())
+                self._indexes[name] = _PointIndex(items) if items else None
+            return self._indexes[name]
+
+
+class NetworkReference:
+    """
+    Process-wide read-only copy of the zones, hubs and B2B hubs, with O(1) lookups and nearest-hub queries.
+
+    The data is loaded once per process, then reloaded when the version in the shared cache changes, which
+    is bumped by `invalidate()` after the zones and hubs are collected. The version is checked at most
+    every `check_interval` seconds, so lookups in a loop do not query the database or the cache.
+    """
+
+    def __init__(self, check_interval: float = 60):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def invalidate():
+        """
+        Bump the shared version, every process reloads the data on its next version check.
+        """
+        cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+        try:
+            cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+
+    def refresh(self):
+        """
+        Check the version right away, e.g. at the start of a flow following a collection.
+        """
+        self._checked_at = 0.0
+        return self._get()
+
+    def _get(self) -> _Snapshot:
+        if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self._snapshot
+
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._snapshot
+
+            version = cache.get(VERSION_CACHE_KEY, 0)
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = self._load(version)
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    @staticmethod
+    def _load(version: int) -> _Snapshot:
+        zones = [
+            ZoneRef(*row) for row in Zone.objects.order_by('id').values_list(
+                'id', 'legacy_zone_id', 'name', 'short_name', 'hub_id', 'latitude', 'longitude'
+            )
+        ]
+        hubs = [
+            HubRef(*row) for row in Hub.objects.order_by('id').values_list(
+                'id', 'name', 'short_name', 'active', 'virtual_hub', 'b2b_hub_id', 'latitude', 'longitude'
+            )
+        ]
+        b2b_hubs = [
+            HubB2BRef(*row) for row in HubB2B.objects.order_by('id').values_list(
+                'id', 'hub_name', 'code', 'latitude', 'longitude'
+            )
+        ]
+        logger.info(f"Loaded network reference version {version}: {len(zones)} zones, {len(hubs)} hubs, {len(b2b_hubs)} B2B hubs")
+        return _Snapshot(version, zones, hubs, b2b_hubs)
+
+    def zone(self, zone_id: int) -> Optional[ZoneRef]:
+        return self._get().zones.get(zone_id)
+
+    def zone_by_legacy_id(self, legacy_zone_id: int) -> Optional[ZoneRef]:
+        return self._get().zones_by_legacy_id.get(legacy_zone_id)
+
+    def zone_by_name(self, name: str) -> Optional[ZoneRef]:
+        return self._get().zones_by_name.get(name)
+
+    def hub(self, hub_id: int) -> Optional[HubRef]:
+        return self._get().hubs.get(hub_id)
+
+    def hub_by_name(self, name: str) -> Optional[HubRef]:
+        return self._get().hubs_by_name.get(name)
+
+    def b2b_hub(self, b2b_hub_id: int) -> Optional[HubB2BRef]:
+        return self._get().b2b_hubs.get(b2b_hub_id)
+
+    def b2b_hub_by_name(self, hub_name: str) -> Optional[HubB2BRef]:
+        return self._get().b2b_hubs_by_name.get(hub_name)
+
+    def b2b_hub_of(self, hub_id: int) -> Optional[HubB2BRef]:
+        """
+        Get the B2B hub of a hub, None if the hub is unknown or has no B2B hub.
+        """
+        snapshot = self._get()
+        hub = snapshot.hubs.get(hub_id)
+        if hub is None or hub.b2b_hub_id is None:
+            return None
+        return snapshot.b2b_hubs.get(hub.b2b_hub_id)
+
+    def nearest_hubs(self, coordinates: Sequence[Tuple[float, float]],
+                     active_only: bool = True) -> List[Tuple[Optional[HubRef], Optional[float]]]:
+        """
+        Get the nearest hub of each coordinate, in a single vectorized pass.
+
+        Args:
+            coordinates (Sequence[Tuple[float, float]]): The (latitude, longitude) pairs in degrees.
+            active_only (bool, optional): Only match the active, non-virtual hubs. Defaults to True.
+
+        Returns:
+            List[Tuple[Optional[HubRef], Optional[float]]]: The hub and its distance in km for each
+                coordinate, (None, None) for a coordinate with a missing latitude or longitude.
+        """
+        return self._nearest('hubs' if active_only else 'all_hubs', coordinates)
+
+    def nearest_hub(self, latitude: float, longitude: float,
+                    active_only: bool = True) -> Tuple[Optional[HubRef], Optional[float]]:
+        return self.nearest_hubs([(latitude, longitude)], active_only)[0]
+
+    def nearest_b2b_hubs(self, coordinates: Sequence[Tuple[float, float]]) -> List[Tuple[Optional[HubB2BRef], Optional[float]]]:
+        """
+        Get the nearest B2B hub of each coordinate, see `nearest_hubs`.
+        """
+        return self._nearest('b2b_hubs', coordinates)
+
+    def nearest_b2b_hub(self, latitude: float, longitude: float) -> Tuple[Optional[HubB2BRef], Optional[float]]:
+        return self.nearest_b2b_hubs([(latitude, longitude)])[0]
+
+    def _nearest(self, index_name: str, coordinates: Sequence[Tuple[float, float]]) -> list:
+        result = [(None, None)] * len(coordinates)
+        index = self._get().index(index_name)
+        valid = [i for i, (lat, lng) in enumerate(coordinates) if lat is not None and lng is not None]
+        if index is None or not valid:
+            return result
+
+        latitudes = np.array([coordinates[i][0] for i in valid], dtype=float)
+        longitudes = np.array([coordinates[i][1] for i in valid], dtype=float)
+        positions, distances = index.nearest(latitudes, longitudes)
+        for i, position, distance in zip(valid, positions, distances):
+            result[i] = (index.items[position], float(distance))
+        return result
+
+
+network_reference = NetworkReference()
@@ -3,6 +3,8 @@ import json
 from dataclasses import dataclass
 from typing import Optional, Any, List
 
+import pandas as pd
+
 from stos.utils import parse_datetime
 
 
@@ -89,6 +91,42 @@ class AddressDTO:
     master_shipper_id: int
     address_type: str
 
+    # Parcel address search fields mapped to the DTO fields, in DTO order
+    SEARCH_COLUMNS = {
+        'rts': 'rts',
+        'postcode': 'postcode',
+        'district': 'district',
+        'city': 'city',
+        'state': 'state',
+        'country': 'country',
+        'latitude': 'latitude',
+        'longitude': 'longitude',
+        'order_id': 'order_id',
+        'waypoint_id': 'waypoint_id',
+        'tracking_number': 'tracking_id',
+        'created_at': 'created_at',
+        'address_one': 'address_one',
+        'address_two': 'address_two',
+        'zone_id': 'zone_id',
+        'zone_hub_id': 'hub_id',
+        'av_status': 'av_status',
+        'av_mode': 'av_mode',
+        'av_source': 'av_source',
+        'shipper_id': 'shipper_id',
+        'marketplace_id': 'marketplace_id',
+        'global_shipper_id': 'global_shipper_id',
+        'master_shipper_id': 'master_shipper_id',
+        'address_type': 'address_type',
+    }
+
+    @classmethod
+    def to_dataframe(cls, items: List[dict]) -> pd.DataFrame:
+        """Build a DataFrame with the DTO columns directly from parcel address search items"""
+        df = pd.DataFrame.from_records(items, columns=list(cls.SEARCH_COLUMNS))
+        df = df.rename(columns=cls.SEARCH_COLUMNS)
+        df['created_at'] = pd.to_datetime(df['created_at'], format='ISO8601', errors='coerce', utc=True)
+        return df
+
     @classmethod
     def form_dict(cls, data: dict):
         return cls(
@@ -1,16 +1,24 @@
 import logging
-from datetime import datetime
-from typing import List, Tuple, Union, Dict
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import List, Tuple, Union, Dict, Generator, Iterable, Optional
 
 import pandas as pd
 from django.utils import timezone
 from pandas.core.interchange.dataframe_protocol import DataFrame
+from requests.exceptions import HTTPError
+from retry import retry
 
 from stos.utils import chunk_list
 from ..base import BaseService
 from ..base.order import BaseOrder, TagChoices
 from ..dto import OrderDTO, AllOrderSearchFilterDTO, AddressDTO, BulkAVDTO
 
+# The parcel address search cannot page past this many records (from + size)
+PARCEL_ADDRESS_MAX_RESULT_WINDOW = 10000
+
 
 class OrderService(BaseService):
     """
@@ -28,9 +36,8 @@ class OrderService(BaseService):
     @staticmethod
     def __convert_search_data_to_order_dto(search_data: List[dict]) -> Dict[str, OrderDTO]:
         orders = {}
-        for item in search_data:
+        for order_data in search_data:
             try:
-                order_data = item.get("order")
                 if order_data:
                     order_dto = OrderDTO.from_dict(order_data)
                     orders[order_dto.tracking_id] = order_dto
@@ -49,26 +56,65 @@ class OrderService(BaseService):
         url = f"{self._base_url}/order-create/internal/4.1/batch"
         return self.make_request(url, method='POST')
 
-    def search_all(self, data: List[Union[str, int]], filter_by_shipper: bool = False,
-                   search_filters: List[AllOrderSearchFilterDTO] = None,
-                   start_date: datetime = None, end_date: datetime = None,
-                   time_range_type: str = "created_at") -> Tuple[int, Dict[str, OrderDTO]]:
+    @retry(exceptions=HTTPError, tries=3, delay=2, backoff=2, jitter=(1, 3))
+    def __search_page(self, payload: dict, size: int, search_after: Optional[int]) -> dict:
         """
-        Searches for orders based on the provided data.
+        Fetch one page of the order search, retried with backoff.
 
-        Args:
-            data (List[Union[str, int]]): List of tracking IDs or global shipper IDs.
-            filter_by_shipper (bool, optional): Whether to filter by shipper. Defaults to False.
-            search_filters (List[AllOrderSearchFilterDTO], optional): List of search filters. Defaults to None.
-            start_date (datetime, optional): The start date for the search range. Defaults to None.
-            end_date (datetime, optional): The end date for the search range. Defaults to None.
+        Raises:
+            HTTPError: If the search still fails after the retries.
+        """
+        url = f'{self._base_url}/order-search/search'
+        params = {
+            "size": size,
+            "search_after": search_after
+        }
+        status_code, result = self.make_request(url, method='POST', payload=payload, params=params)
 
-        Returns:
-            Tuple[int, dict]: A tuple containing the status code and the search result.
+        if status_code != 200 or not isinstance(result, dict):
+            self._logger.error(f"Failed to search for orders [{status_code}]: {result}")
+            raise HTTPError(f"Order search failed with status code {status_code}")
+
+        return result
+
+    def __iter_search_shard(self, payload: dict, size: int, stop: threading.Event) -> Generator[List[dict], None, None]:
         """
-        # Split the data into chunks of 1000 items
-        chunks = chunk_list(data, 1000)
-        search_data = {}
+        Page through the search results of one shard with `search_after`.
+        """
+        search_after = None
+        fetched = 0
+        while not stop.is_set():
+            result = self.__search_page(payload, size, search_after)
+
+            page = [item['order'] for item in result.get('search_data', []) if item.get('order')]
+            if page:
+                yield page
+
+            fetched += len(page)
+            if len(page) < size or fetched >= result.get('total', 0):
+                return
+
+            search_after = page[-1].get('id')
+
+    def _iter_search_pages(self, data: Iterable[Union[str, int]], filter_by_shipper: bool = False,
+                           search_filters: List[AllOrderSearchFilterDTO] = None,
+                           start_date: datetime = None, end_date: datetime = None,
+                           time_range_type: str = "created_at", page_size: int = 1000,
+                           max_workers: int = 5) -> Generator[List[dict], None, None]:
+        """
+        Stream the raw orders of the search, one list per page.
+
+        The data is split into shards of 1000 values paginated independently on a thread pool,
+        pages are yielded as soon as they arrive, in no particular order.
+
+        Raises:
+            HTTPError: If a page still fails after the retries.
+        """
+        # Evaluate lazy QuerySets once
+        shards = list(chunk_list(list(data), 1000))
+        if not shards:
+            return
+
         # Precompute search filters if they exist to avoid adding them repeatedly
         filter_dicts = [search_filter.to_dict() for search_filter in search_filters] if search_filters else []
 
@@ -81,45 +127,125 @@ class OrderService(BaseService):
                 "end_time": end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
             }
 
-        # Iterate over chunks and make requests
-        for chunk in chunks:
-            # Construct the URL for each chunk
-            url = f'{self._base_url}/order-search/search'
-            total = 1000
-            # Construct the payload with the search filters and range
-            payload = {
+        payloads = [
+            {
                 "search_filters": [
                     {
                         "field": "global_shipper_id" if filter_by_shipper else "tracking_id",
-                        "values": chunk
+                        "values": shard
                     },
                     *filter_dicts  # Include additional filters if provided
                 ],
                 "search_range": search_range,
                 "search_field": None
-            }
+            } for shard in shards
+        ]
 
-            params = {
-                "size": 1000,
-                'search_after': None
-            }
+        stop = threading.Event()
+        # Bounded, the shards wait for the consumer instead of buffering the whole search
+        pages = queue.Queue(maxsize=max_workers * 2)
+
+        def put(item):
+            # Give up once the consumer stopped, a closed generator no longer reads the queue
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=1)
+                    return
+                except queue.Full:
+                    continue
 
-            while total > 0:
-                # Make the request to the API
-                status_code, result = self.make_request(url, method='POST', payload=payload, params=params)
-                print(status_code)
-                if status_code != 200:
-                    self._logger.error(f"Failed to search for orders: {result}")
+        def run_shard(payload: dict):
+            try:
+                for page in self.__iter_search_shard(payload, page_size, stop):
+                    put(page)
+            except Exception as e:
+                put(e)
+            finally:
+                # Mark the shard as done
+                put(None)
+
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(payloads)))
+        try:
+            for payload in payloads:
+                executor.submit(run_shard, payload)
+
+            remaining = len(payloads)
+            while remaining:
+                page = pages.get()
+                if page is None:
+                    remaining -= 1
                     continue
-                # Check the response status and process the result if successful
-                if status_code == 200 and "search_data" in result:
-                    orders = self.__convert_search_data_to_order_dto(result["search_data"])
-                    search_data.update(orders)
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_search(self, data: Iterable[Union[str, int]], filter_by_shipper: bool = False,
+                    search_filters: List[AllOrderSearchFilterDTO] = None,
+                    start_date: datetime = None, end_date: datetime = None,
+                    time_range_type: str = "created_at", fields: List[str] = None,
+                    as_dataframe: bool = False, page_size: int = 1000,
+                    max_workers: int = 5) -> Generator[Union[Dict[str, list], pd.DataFrame], None, None]:
+        """
+        Streams the orders matching the provided data as columnar batches.
+
+        The data is split into shards of 1000 values searched concurrently, each shard is paginated with
+        `search_after` and every page is retried with backoff before giving up.
+
+        Args:
+            data (Iterable[Union[str, int]]): Tracking IDs or global shipper IDs, evaluated once.
+            filter_by_shipper (bool, optional): Whether to filter by shipper. Defaults to False.
+            search_filters (List[AllOrderSearchFilterDTO], optional): List of search filters. Defaults to None.
+            start_date (datetime, optional): The start date for the search range. Defaults to None.
+            end_date (datetime, optional): The end date for the search range. Defaults to None.
+            time_range_type (str, optional): The field the search range applies to. Defaults to "created_at".
+            fields (List[str], optional): Order fields to keep, e.g. ['tracking_id', 'granular_status']. Defaults to all.
+            as_dataframe (bool, optional): Yield DataFrames instead of dicts of lists. Defaults to False.
+            page_size (int, optional): Orders per page. Defaults to 1000.
+            max_workers (int, optional): Number of shards searched in parallel. Defaults to 5.
+
+        Yields:
+            Union[Dict[str, list], pd.DataFrame]: A batch of orders, one column per field.
+
+        Raises:
+            HTTPError: If a page still fails after the retries.
+        """
+        for page in self._iter_search_pages(data, filter_by_shipper, search_filters, start_date, end_date,
+                                            time_range_type, page_size, max_workers):
+            if as_dataframe:
+                yield pd.DataFrame.from_records(page, columns=fields)
+                continue
 
-                if result['total'] > total:
-                    params['search_after'] = result['search_data'][-1].get('order').get('id')
+            columns = fields or list(dict.fromkeys(key for order in page for key in order))
+            yield {column: [order.get(column) for order in page] for column in columns}
 
-                total = result['total'] - len(search_data)
+    def search_all(self, data: Iterable[Union[str, int]], filter_by_shipper: bool = False,
+                   search_filters: List[AllOrderSearchFilterDTO] = None,
+                   start_date: datetime = None, end_date: datetime = None,
+                   time_range_type: str = "created_at") -> Tuple[int, Dict[str, OrderDTO]]:
+        """
+        Searches for orders based on the provided data.
+
+        Args:
+            data (Iterable[Union[str, int]]): Tracking IDs or global shipper IDs, evaluated once.
+            filter_by_shipper (bool, optional): Whether to filter by shipper. Defaults to False.
+            search_filters (List[AllOrderSearchFilterDTO], optional): List of search filters. Defaults to None.
+            start_date (datetime, optional): The start date for the search range. Defaults to None.
+            end_date (datetime, optional): The end date for the search range. Defaults to None.
+            time_range_type (str, optional): The field the search range applies to. Defaults to "created_at".
+
+        Returns:
+            Tuple[int, dict]: A tuple containing the status code and the orders by tracking ID.
+        """
+        search_data = {}
+        try:
+            for page in self._iter_search_pages(data, filter_by_shipper, search_filters, start_date, end_date, time_range_type):
+                search_data.update(self.__convert_search_data_to_order_dto(page))
+        except HTTPError as e:
+            self._logger.error(f"Failed to search for orders: {e}")
+            return 500, {}
 
         # Return the appropriate response based on whether any data was found
         if not search_data:
@@ -264,21 +390,20 @@ class OrderService(BaseService):
 
         return 200, {'success': success, 'failed': failed}
 
-    def parcel_address_search(self, shipper_ids: List[int], df: bool = False) -> Tuple[int, Union[List[AddressDTO], DataFrame]]:
-        url = f"{self._base_url}/av/parceladdress/search/paginated"
-        payload = {
-            'from': 0,
-            'size': 10000,
+    def __parcel_address_payload(self, shipper_ids: List[int], start_date: datetime, end_date: datetime,
+                                 offset: int, size: int) -> dict:
+        return {
+            'from': offset,
+            'size': size,
             'search_criteria': {
                 'created_at': {
-                    'to': (timezone.now() - timezone.timedelta(minutes=10)).strftime('%Y-%m-%dT%H:%M:%S+0700'),
-                    'from': (timezone.now() - timezone.timedelta(days=60)).strftime('%Y-%m-%dT%H:%M:%S+0700')
+                    'to': end_date.strftime('%Y-%m-%dT%H:%M:%S+0700'),
+                    'from': start_date.strftime('%Y-%m-%dT%H:%M:%S+0700')
                 },
                 'av_statuses': [
                     'VERIFIED'
                 ],
                 'rts': False,
-                # Turn this on when run officially
                 "global_shipper_ids": shipper_ids,
                 'av_sources': [
                     'Bulk AV',
@@ -286,19 +411,118 @@ class OrderService(BaseService):
                 ]
             }
         }
-        stt_code, data = self.make_request(url, method='POST', payload=payload)
 
-        if stt_code != 200:
-            return stt_code, []
+    def __search_parcel_address_window(self, shipper_ids: List[int], start_date: datetime, end_date: datetime,
+                                       page_size: int) -> List[dict]:
+        """
+        Page through one time window of the parcel address search.
+
+        The search cannot page past PARCEL_ADDRESS_MAX_RESULT_WINDOW records, a window holding
+        more records is split in half and both halves are searched instead.
+        """
+        url = f"{self._base_url}/av/parceladdress/search/paginated"
+        records = []
+        offset = 0
+        while True:
+            if offset + page_size > PARCEL_ADDRESS_MAX_RESULT_WINDOW:
+                middle_date = start_date + (end_date - start_date) / 2
+                if middle_date.replace(microsecond=0) <= start_date:
+                    self._logger.warning(f"Parcel address window {start_date} - {end_date} is truncated at {len(records)} records")
+                    return records
+
+                return (self.__search_parcel_address_window(shipper_ids, start_date, middle_date, page_size)
+                        + self.__search_parcel_address_window(shipper_ids, middle_date, end_date, page_size))
+
+            payload = self.__parcel_address_payload(shipper_ids, start_date, end_date, offset, page_size)
+            stt_code, data = self.make_request(url, method='POST', payload=payload)
+
+            if stt_code != 200:
+                raise Exception(f"Failed to search parcel addresses from {start_date} to {end_date}: {data}")
+
+            page = data.get('data', [])
+            records.extend(page)
+
+            if len(page) < page_size:
+                return records
+
+            offset += page_size
+
+    def _iter_parcel_address_records(self, shipper_ids: List[int], start_date: datetime = None, end_date: datetime = None,
+                                     window: timedelta = timedelta(days=1), page_size: int = 1000,
+                                     max_workers: int = 5) -> Generator[List[dict], None, None]:
+        """
+        Stream the raw parcel address search items, one list per shipper chunk and time window.
 
-        result = [
-            AddressDTO.form_dict(item) for item in data.get('data', [])
+        Windows are searched concurrently and yielded as soon as they complete, in no particular order.
+        """
+        end_date = end_date or timezone.now() - timedelta(minutes=10)
+        start_date = start_date or end_date - timedelta(days=60)
+        # Naive bounds are taken in the current time zone, the windows compare them with aware datetimes
+        if timezone.is_naive(start_date):
+            start_date = timezone.make_aware(start_date)
+        if timezone.is_naive(end_date):
+            end_date = timezone.make_aware(end_date)
+
+        windows = []
+        window_start = start_date
+        while window_start < end_date:
+            windows.append((window_start, min(window_start + window, end_date)))
+            window_start += window
+
+        shards = [
+            (shipper_chunk, window_start, window_end)
+            for shipper_chunk in chunk_list(shipper_ids, 1000)
+            for window_start, window_end in windows
         ]
 
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self.__search_parcel_address_window, shipper_chunk, window_start, window_end, page_size)
+                for shipper_chunk, window_start, window_end in shards
+            ]
+            for future in as_completed(futures):
+                records = future.result()
+                if records:
+                    yield records
+
+    def iter_parcel_address_search(self, shipper_ids: List[int], start_date: datetime = None, end_date: datetime = None,
+                                   window: timedelta = timedelta(days=1), page_size: int = 1000,
+                                   max_workers: int = 5) -> Generator[pd.DataFrame, None, None]:
+        """
+        Streams the verified parcel addresses of the given shippers as DataFrame chunks.
+
+        The search range is sliced into time windows searched concurrently, each window is paginated
+        with `from`/`size` so no record is dropped past the first 10000.
+
+        Args:
+            shipper_ids (List[int]): Global shipper IDs to search.
+            start_date (datetime, optional): Start of the creation range. Defaults to 60 days before end_date,
+                pass the end of the last successful run to only fetch new records.
+            end_date (datetime, optional): End of the creation range. Defaults to 10 minutes ago.
+            window (timedelta, optional): Length of the time windows. Defaults to 1 day.
+            page_size (int, optional): Records per page. Defaults to 1000.
+            max_workers (int, optional): Number of windows searched in parallel. Defaults to 5.
+
+        Yields:
+            pd.DataFrame: A chunk of addresses with the AddressDTO columns.
+
+        Raises:
+            Exception: If a page of the search fails.
+        """
+        for records in self._iter_parcel_address_records(shipper_ids, start_date, end_date, window, page_size, max_workers):
+            yield AddressDTO.to_dataframe(records)
+
+    def parcel_address_search(self, shipper_ids: List[int], df: bool = False) -> Tuple[int, Union[List[AddressDTO], DataFrame]]:
+        try:
+            records = [record for chunk in self._iter_parcel_address_records(shipper_ids) for record in chunk]
+        except Exception as e:
+            self._logger.error(f"Failed to search parcel addresses: {e}")
+            return 500, []
+
         if df:
-            return stt_code, pd.DataFrame([vars(address) for address in result])
+            return 200, AddressDTO.to_dataframe(records)
 
-        return stt_code, result
+        return 200, [AddressDTO.form_dict(item) for item in records]
 
     def bulk_update_av(self, data: List[BulkAVDTO]) -> Tuple[int, dict]:
         url = f"{self._base_url}/av/1.0/verify-address/bulk/update"
@@ -12,6 +12,7 @@ from requests.exceptions import (
 from retry import retry
 
 from opv2.base.wms import WMSBin, WMSOrderStatus, WMSAction
+from stos.utils import run_concurrently
 from ..base import WMSBaseService
 
 logger = logging.getLogger(__name__)
@@ -90,6 +91,35 @@ class WMSService(WMSBaseService):
 
         return self.make_request(url, method="POST", payload=payload)
 
+    def load_orders_by_tracking_ids(self, tracking_ids: List[str], max_workers: int = 10) -> Dict[str, dict]:
+        """
+        Load orders info by tracking ids from WMS, looking up the tracking ids concurrently
+
+        Args:
+            tracking_ids (List[str]): Tracking ids to search
+            max_workers (int, optional): Maximum number of concurrent lookups. Defaults to 10.
+
+        Returns:
+            Dict[str, dict]: Parcel info by tracking id, tracking ids which failed to load are left out.
+        """
+
+        def load(tracking_id: str) -> dict:
+            try:
+                code, response = self.load_order_by_tracking_id(tracking_id)
+            except Exception as e:
+                self._logger.error(f"Error when load order {tracking_id} from WMS: {e}")
+                return {}
+
+            parcels = response.get("parcels") if code == 200 else None
+            if not parcels:
+                self._logger.error(f"Unable to load order {tracking_id} from WMS: {response}")
+                return {}
+
+            return parcels[0]
+
+        parcels = run_concurrently(load, tracking_ids, max_workers=max_workers)
+        return {tracking_id: parcel for tracking_id, parcel in zip(tracking_ids, parcels) if parcel}
+
     def load_bins(self) -> Tuple[int, dict]:
         """
         Load bins info from WMS
@@ -6,6 +6,7 @@ from django.utils import timezone
 from gql import gql
 from simple_history.utils import bulk_create_with_history, bulk_update_with_history
 
+from core.base.pipeline import memoized_stage
 from google_wrapper.services import GoogleSheetService
 from google_wrapper.utils import get_service_account
 from opv2.base.order import GranularStatusChoices
@@ -69,10 +70,12 @@ def collect_vendor_call_data():
         if new_records:
             success = bulk_create_with_history(new_records, Order, batch_size=1000, ignore_conflicts=True)
             logger.info(f"Successfully added {len(success)} new records to the database")
+            load_order_info.invalidate()
         else:
             logger.info("No new records to add to the database")
 
 
+@memoized_stage(freshness=60 * 10)
 def load_order_info():
     graphql_client = GraphQLService(
         url="https://api.ninjavan.co/vn/core/graphql/order",
@@ -270,6 +273,7 @@ def collect_vendor_call_proactive():
         if new_records:
             success = bulk_create_with_history(new_records, Order, batch_size=1000, ignore_conflicts=True)
             logger.info(f"Successfully added {len(success)} new records to the database")
+            load_order_info.invalidate()
         else:
             logger.info("No new records to add to the database")
 
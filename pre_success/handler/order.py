@@ -1,20 +1,28 @@
 import logging
+from collections import defaultdict
+from functools import partial
+from itertools import islice
+from math import ceil
+from typing import List, Tuple
 
-from django.db.models import Q
+from django.db.models import Q, Count
 from django.utils import timezone
 from simple_history.utils import bulk_update_with_history
 
 from google_wrapper.services import GoogleSheetService
 from google_wrapper.utils import get_service_account
 from opv2.base.order import GranularStatusChoices
-from opv2.services import ScanService, OrderService
-from pre_success.models import Order, ShipperGroup
-from stos.utils import configs
+from opv2.services import ScanService, OrderService, RouteService
+from pre_success.models import Order, Route, ShipperGroup
+from stos.utils import configs, run_concurrently
 from .collect_data import load_order_info
-from .route import get_route_available, create_route, add_order_to_route
+from .route import create_route, add_order_to_route, ROUTE_CAPACITY, ROUTE_OPEN_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
+# Number of orders pulled and added to routes in parallel on OPv2
+ROUTING_MAX_WORKERS = 10
+
 
 def parcel_sweeper_live(sla_enabled=False):
     if sla_enabled:
@@ -117,11 +125,12 @@ def reschedule_order():
     logger.info(f"Failed to reschedule {len(result.get('failed_orders'))} orders")
 
     logger.info('Fetching order info')
+    load_order_info.invalidate()
     load_order_info()
 
 
-def pull_route(order_id):
-    order_service = OrderService(logger=logger)
+def pull_route(order_id, order_service: OrderService = None):
+    order_service = order_service or OrderService(logger=logger)
 
     stt_code, result = order_service.pull_route(order_id)
 
@@ -138,43 +147,131 @@ def pull_route(order_id):
     return True
 
 
-def __add_orders_to_route(shipper_group: ShipperGroup):
+def _plan_route_assignment(shipper_group: ShipperGroup, orders: List[Order], routes: List[Route]) -> List[Tuple[Order, Route]]:
+    """
+    Bin-pack the pending orders of a shipper group into routes.
+
+    Routes holding fewer than ROUTE_OPEN_THRESHOLD orders are filled up to ROUTE_CAPACITY first,
+    the extra routes needed for the remaining orders are created up front.
+
+    Args:
+        shipper_group (ShipperGroup): The shipper group being routed.
+        orders (List[Order]): Orders waiting for a route.
+        routes (List[Route]): Today's routes of the shipper group annotated with `order_count`.
+
+    Returns:
+        List[Tuple[Order, Route]]: The planned (order, route) assignments.
+    """
+    bins = [
+        (route, ROUTE_CAPACITY - route.order_count)
+        for route in routes if route.order_count < ROUTE_OPEN_THRESHOLD
+    ]
+
+    missing = len(orders) - sum(capacity for _, capacity in bins)
+    for _ in range(max(ceil(missing / ROUTE_CAPACITY), 0)):
+        route = create_route(shipper_group)
+        if not route:
+            logger.error(f"Failed to create a new route for {shipper_group}")
+            break
+        bins.append((route, ROUTE_CAPACITY))
+
+    plan = []
+    pending = iter(orders)
+    for route, capacity in bins:
+        plan.extend((order, route) for order in islice(pending, capacity))
+
+    unassigned = len(orders) - len(plan)
+    if unassigned:
+        logger.error(f"No route available for {unassigned} orders of {shipper_group}")
+
+    return plan
+
+
+def _assign_order_to_route(order_service: OrderService, route_service: RouteService, assignment: Tuple[Order, Route]) -> bool:
+    order, route = assignment
+    if not pull_route(order.order_id, order_service):
+        return False
+
+    return add_order_to_route(order, route, route_service)
+
+
+def routing_orders():
+    """
+    Assign today's swept orders of Shopee, TikTok and TTDI to routes.
+
+    Logic:
+    1. Load the pending orders and the occupancy of today's routes once for all shipper groups
+    2. Plan the assignments in memory, creating the extra routes needed up front
+    3. Pull and add the orders to their routes concurrently on OPv2
+    4. Persist the successful assignments with one bulk update
+    """
+    shipper_groups = [ShipperGroup.shopee, ShipperGroup.tiktok, ShipperGroup.ttid]
     orders = Order.objects.filter(
         Q(created_date__date=timezone.now().date())
         & Q(granular_status__in=[GranularStatusChoices.en_route, GranularStatusChoices.arrived_sorting])
         & Q(parcel_sweeper=True)
-        & Q(shipper_group=shipper_group)
+        & Q(shipper_group__in=shipper_groups)
         & Q(rts=False)
         & Q(route_id__isnull=True)
     )
 
     if not orders.exists():
-        logger.info(f"No orders available to add to route for {shipper_group}")
+        logger.info("No orders available to add to route")
         return
 
-    # Get route for shipper group
-    route = get_route_available(shipper_group)
+    routes = Route.objects.filter(
+        created_date__date=timezone.now().date(),
+        shipper_group__in=shipper_groups,
+        archived=False,
+    ).annotate(
+        order_count=Count('orders', filter=Q(orders__delete_at__isnull=True))
+    ).order_by('created_date')
+
+    orders_by_group = defaultdict(list)
+    for order in orders:
+        orders_by_group[order.shipper_group].append(order)
+
+    routes_by_group = defaultdict(list)
+    for route in routes:
+        routes_by_group[route.shipper_group].append(route)
 
-    if not route:
-        logger.error(f"No route available for {shipper_group}")
+    plan = []
+    for shipper_group in shipper_groups:
+        if not orders_by_group[shipper_group]:
+            logger.info(f"No orders available to add to route for {shipper_group}")
+            continue
+
+        plan.extend(_plan_route_assignment(shipper_group, orders_by_group[shipper_group], routes_by_group[shipper_group]))
+
+    if not plan:
         return
 
-    # Assign orders to route
-    for order in orders:
-        if route.orders.count() >= 200:
-            logger.info(f"Route is full, creating a new route for {shipper_group}")
-            route = create_route(shipper_group)
-            if not route:
-                logger.error(f"Failed to create a new route for {shipper_group}")
-                return
+    logger.info(f"Assigning {len(plan)} orders to routes")
 
-        if pull_route(order.order_id):
-            add_order_to_route(order, route)
-            order.route = route
-            order.save()
+    # Share the services between the worker threads to reuse their connection pools
+    order_service = OrderService(logger=logger)
+    route_service = RouteService(logger=logger)
+    results = run_concurrently(
+        partial(_assign_order_to_route, order_service, route_service),
+        plan,
+        max_workers=ROUTING_MAX_WORKERS
+    )
 
+    assigned_orders = []
+    for (order, route), assigned in zip(plan, results):
+        if not assigned:
+            continue
 
-def routing_orders():
-    __add_orders_to_route(ShipperGroup.shopee)
-    __add_orders_to_route(ShipperGroup.tiktok)
-    __add_orders_to_route(ShipperGroup.ttid)
+        order.route = route
+        order.updated_date = timezone.now()
+        assigned_orders.append(order)
+
+    if not assigned_orders:
+        logger.info("No orders were added to route")
+        return
+
+    try:
+        success = bulk_update_with_history(assigned_orders, Order, ['route', 'updated_date'], batch_size=1000)
+        logger.info(f"Successfully added {success}/{len(plan)} orders to route")
+    except Exception as e:
+        logger.error(f"Failed to perform bulk update: {e}")
@@ -5,6 +5,7 @@ from django.utils import timezone
 
 from opv2.dto import CancelTicketDTO
 from opv2.services import TicketService
+from .collect_data import load_order_info
 from ..models import Order
 
 logger = logging.getLogger(__name__)
@@ -42,3 +43,7 @@ def cancel_ticket_proactive():
     success = result.get('success', [])
     failed = result.get('failed', [])
     logger.info(f"Successfully cancel tickets: success={success}, failed={failed}")
+
+    # Cancelled tickets change the status of their orders
+    if success:
+        load_order_info.invalidate()
@@ -1,9 +1,12 @@
 import logging
+from collections import Counter, defaultdict
 from random import choice
+from typing import Dict, List, Optional
 
 from django.db import transaction, IntegrityError
-from django.db.models import Q
+from django.db.models import Q, Count
 from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
 
 from google_wrapper.services import GoogleChatService
 from google_wrapper.utils.card_builder import CardBuilder
@@ -14,13 +17,21 @@ from google_wrapper.utils.card_builder.elements import (
 )
 from opv2.base.order import GranularStatusChoices
 from opv2.services import RouteService, ScanService
-from stos.utils import configs
+from stos.utils import configs, run_concurrently
 from .collect_data import load_order_info
 from .output import add_to_gsheet, add_to_pod
-from ..models import ShipperGroup, Route, Driver
+from ..models import ShipperGroup, Route, Driver, Order
 
 logger = logging.getLogger(__name__)
 
+# A route only accepts new orders while it holds fewer than ROUTE_OPEN_THRESHOLD orders,
+# and is filled up to ROUTE_CAPACITY orders once opened.
+ROUTE_OPEN_THRESHOLD = 190
+ROUTE_CAPACITY = 200
+
+# Number of route manifests fetched and routes archived in parallel on OPv2
+ROUTE_SYNC_MAX_WORKERS = 10
+
 
 def create_route(shipper_group: ShipperGroup) -> Route | None:
     route_service = RouteService(logger=logger)
@@ -57,19 +68,20 @@ def get_route_available(shipper_group: ShipperGroup) -> Route:
     )
 
     # Return the first available route if any
-    if routes.exists():
-        route = routes.first()
-        if route.orders.count() < 190:
-            logger.info(f"Found available route {route.route_id} for shipper group '{shipper_group.name}' with {route.orders.count()} orders")
-            return route
+    route = routes.annotate(
+        order_count=Count('orders', filter=Q(orders__delete_at__isnull=True))
+    ).order_by('created_date').first()
+    if route and route.order_count < ROUTE_OPEN_THRESHOLD:
+        logger.info(f"Found available route {route.route_id} for shipper group '{shipper_group.name}' with {route.order_count} orders")
+        return route
 
     # If no suitable route found, create a new one
     logger.info(f"No available route found for shipper group '{shipper_group.name}', creating a new route")
     return create_route(shipper_group)
 
 
-def add_order_to_route(order, route):
-    route_service = RouteService(logger=logger)
+def add_order_to_route(order, route, route_service: RouteService = None):
+    route_service = route_service or RouteService(logger=logger)
 
     stt_code, result = route_service.add_order_to_route(order_id=order.order_id, route_id=route.route_id)
 
@@ -105,44 +117,57 @@ def _build_card(header: str, message: str):
     return card_builder.card
 
 
-def start_route():
+def start_route(refresh_orders: bool = True):
     """
     Query all routes created today and start them.
 
     Logic:
     1. Filter routes created today and not archived with a driver assigned
-    2. For each route, check if there are orders to start
+    2. Load the orders of all routes in one query and group them by route
     3. If orders are available, start the route and notify the driver
     4. If all orders are added to the route, notify the driver that the route is started
     5. If no orders are available, log the message and continue to the next route
 
-
+    Args:
+        refresh_orders (bool): Refresh order info before starting. Callers that just ran
+            `load_order_info` pass False to skip the duplicate refresh.
     """
-    routes = Route.objects.filter(
+    routes = list(Route.objects.filter(
         Q(created_date__date=timezone.now().date())
         & Q(archived=False)
         & Q(driver__isnull=False)
-    )
+    ).select_related('driver'))
 
-    if not routes.exists():
+    if not routes:
         logger.info("No routes to start")
         return
 
     # Ensure order info is latest
-    load_order_info()
+    if refresh_orders:
+        load_order_info()
+
+    # Group the orders of every route at once instead of querying per route
+    total_orders = Counter()
+    startable_orders = defaultdict(list)
+    route_orders = Order.objects.filter(
+        route_id__in=[route.route_id for route in routes]
+    ).values_list('route_id', 'tracking_id', 'waypoint_id', 'granular_status')
+    for route_id, tracking_id, waypoint_id, granular_status in route_orders:
+        total_orders[route_id] += 1
+        if granular_status in (GranularStatusChoices.arrived_sorting, GranularStatusChoices.en_route):
+            startable_orders[route_id].append((tracking_id, waypoint_id))
 
     # Initialize the Service
     route_service = RouteService(logger=logger)
     scan_service = ScanService(logger=logger)
 
+    started_routes = 0
     for route in routes:
-        total_orders = route.orders.count()
-        tracking_ids = [order.tracking_id for order in
-                        route.orders.filter(Q(granular_status__in=[GranularStatusChoices.arrived_sorting, GranularStatusChoices.en_route]))]
-        waypoint_ids = [order.waypoint_id for order in
-                        route.orders.filter(Q(granular_status__in=[GranularStatusChoices.arrived_sorting, GranularStatusChoices.en_route]))]
+        total = total_orders[route.route_id]
+        tracking_ids = [tracking_id for tracking_id, _ in startable_orders[route.route_id]]
+        waypoint_ids = [waypoint_id for _, waypoint_id in startable_orders[route.route_id]]
         if not tracking_ids:
-            logger.info(f"Route started {total_orders - len(tracking_ids)}/{total_orders} orders. Skipping route {route.route_id}")
+            logger.info(f"Route started {total - len(tracking_ids)}/{total} orders. Skipping route {route.route_id}")
             continue
 
         # Van Inbound
@@ -157,9 +182,10 @@ def start_route():
             logger.error(f"Failed to start route {route.route_id}: {result}")
             continue
 
+        started_routes += 1
         logger.info(f"Successfully started route {route.route_id}")
         # notify drivers
-        if len(tracking_ids) < total_orders:
+        if len(tracking_ids) < total:
             card = _build_card(
                 header=f"<font color=\"#167a06\"> Route {route.route_id} ({route.driver.driver_name}) </font>",
                 message=f"Added {len(tracking_ids)} orders to route"
@@ -169,7 +195,7 @@ def start_route():
         else:
             card = _build_card(
                 header=f"<font color=\"#167a06\"> Route {route.route_id} ({route.driver.driver_name}) </font>",
-                message=f"Route started with {total_orders} orders"
+                message=f"Route started with {total} orders"
             )
             add_to_gsheet(route.driver_id, tracking_ids)
             add_to_pod(route.driver.driver_name, route.shipper_group, tracking_ids, True)
@@ -188,26 +214,43 @@ def start_route():
             continue
 
     # Fetch order info after starting routes
-    logger.info('Fetching order info after starting routes')
-    load_order_info()
+    if started_routes:
+        logger.info('Fetching order info after starting routes')
+        load_order_info()
 
 
-def _check_route_success(route_id: int) -> bool:
+def _fetch_manifests(route_ids: List[int]) -> Dict[int, Optional[list]]:
+    """
+    Fetch the manifests of the given routes concurrently, once per run.
+
+    Args:
+        route_ids (List[int]): IDs of the routes to fetch.
+
+    Returns:
+        Dict[int, Optional[list]]: Waypoints of each route, None when the manifest could not be fetched.
+    """
     route_service = RouteService(logger=logger)
 
-    stt_code, result = route_service.get_manifest(route_id)
-    if stt_code != 200:
-        logger.error(f"Failed to get manifest for route {route_id}: {result}")
-        return False
+    def get_manifest(route_id: int) -> Optional[list]:
+        stt_code, result = route_service.get_manifest(route_id)
+        if stt_code != 200:
+            logger.error(f"Failed to get manifest for route {route_id}: {result}")
+            return None
+
+        return result['data'] or []
 
-    data = result['data']
-    if not data:
+    manifests = run_concurrently(get_manifest, route_ids, max_workers=ROUTE_SYNC_MAX_WORKERS)
+    return dict(zip(route_ids, manifests))
+
+
+def _check_route_success(route_id: int, manifest: list) -> bool:
+    if not manifest:
         logger.error(f"No manifest found for route {route_id}")
         return True
 
-    total_in_route = len(data)
-    success_count = sum(1 for item in data if item["status"] == "Success")
-    failed_count = sum(1 for item in data if item["status"] == "Fail")
+    total_in_route = len(manifest)
+    success_count = sum(1 for item in manifest if item["status"] == "Success")
+    failed_count = sum(1 for item in manifest if item["status"] == "Fail")
     complete_count = success_count + failed_count
 
     if complete_count == total_in_route:
@@ -218,8 +261,8 @@ def _check_route_success(route_id: int) -> bool:
     return False
 
 
-def _archive_route(route_id: int):
-    route_service = RouteService(logger=logger)
+def _archive_route(route_id: int, route_service: RouteService = None):
+    route_service = route_service or RouteService(logger=logger)
 
     stt_code, result = route_service.archive_route(route_id)
     if stt_code != 204:
@@ -230,50 +273,52 @@ def _archive_route(route_id: int):
     return True
 
 
-def _fetch_order_in_route(route_id):
-    try:
-        route = Route.objects.get(route_id=route_id)
-    except Route.DoesNotExist:
-        logger.error(f"Route {route_id} not found")
-        return
+def _detach_pulled_orders(manifests: Dict[int, list]):
+    """
+    Detach the orders that were pulled out of their routes on OPv2.
 
-    # Initialize the Service
-    route_service = RouteService(logger=logger)
-    stt_code, result = route_service.get_manifest(route.route_id)
+    An order is considered pulled when its waypoint is no longer in the route manifest.
+    All detachments are applied with one bulk update.
 
-    if stt_code != 200:
-        logger.error(f"Failed to get manifest for route {route_id}: {result}")
+    Args:
+        manifests (Dict[int, list]): Manifests of the routes to check, keyed by route ID.
+    """
+    if not manifests:
         return
 
-    data = result['data']
-    if not data:
-        logger.error(f"No manifest found for route {route_id}")
-        return
+    route_waypoint_ids = {
+        route_id: {item['id'] for item in manifest}
+        for route_id, manifest in manifests.items()
+    }
 
-    route_waypoint_ids = [item['id'] for item in data]
-    tracking_ids_pulled = []
+    pulled_orders = []
+    tracking_ids_pulled = defaultdict(list)
+    for order in Order.objects.filter(route_id__in=route_waypoint_ids.keys()):
+        if order.waypoint_id in route_waypoint_ids[order.route_id]:
+            continue
 
-    for order in route.orders.all():
-        if order.waypoint_id not in route_waypoint_ids:
-            tracking_ids_pulled.append(order.tracking_id)
-            order.route = None
-            try:
-                with transaction.atomic():
-                    order.save()
-                    logger.info(f"Order {order.tracking_id} removed from route {route.route_id}")
+        tracking_ids_pulled[order.route_id].append(order.tracking_id)
+        order.route = None
+        order.updated_date = timezone.now()
+        pulled_orders.append(order)
 
-                tracking_ids_pulled.append(order.tracking_id)
-            except IntegrityError as ie:
-                logger.error(f"Integrity error removing order {order.tracking_id} from route {route.route_id}: {ie}")
-                continue
+    if not pulled_orders:
+        return
+
+    try:
+        success = bulk_update_with_history(pulled_orders, Order, ['route', 'updated_date'], batch_size=1000)
+        logger.info(f"Removed {success} orders from their routes")
+    except Exception as e:
+        logger.error(f"Failed to remove pulled orders from routes: {e}")
+        return
 
-    if tracking_ids_pulled:
+    hook_url = configs.get('ROOT_NOTIFICATION_WEBHOOK')
+    for route_id, tracking_ids in tracking_ids_pulled.items():
         card = _build_card(
-            header=f"<font color=\"#ab9100\"> Route {route.route_id} <font color=\"#167a06\">",
-            message=f"Pulled orders {', '.join(tracking_ids_pulled)} out of route"
+            header=f"<font color=\"#ab9100\"> Route {route_id} <font color=\"#167a06\">",
+            message=f"Pulled orders {', '.join(tracking_ids)} out of route"
         )
 
-        hook_url = configs.get('ROOT_NOTIFICATION_WEBHOOK')
         try:
             # Build and send the Google Chat notification
             chat_service = GoogleChatService(logger=logger)
@@ -281,10 +326,9 @@ def _fetch_order_in_route(route_id):
                 webhook_url=hook_url,
                 card=card,
             )
-            logger.info(f"Sent Google Chat notification for route {route.route_id}")
+            logger.info(f"Sent Google Chat notification for route {route_id}")
         except Exception as notification_exc:
-            logger.error(f"Failed to send Google Chat notification for route {route.route_id}: {notification_exc}")
-            return
+            logger.error(f"Failed to send Google Chat notification for route {route_id}: {notification_exc}")
 
 
 def assign_driver():
@@ -338,48 +382,80 @@ def assign_driver():
 
 
 def fetch_route():
-    routes = Route.objects.filter(
+    """
+    Sync today's started routes with OPv2.
+
+    Logic:
+    1. Fetch the manifests of all routes concurrently, once per run
+    2. Archive the completed routes and free their drivers
+    3. Detach the orders pulled out of the incomplete routes in one bulk update
+    4. Assign drivers to the routes without one and start them
+
+    `fetch_task` refreshes order info right before, so starting routes does not refresh it again.
+    """
+    routes = list(Route.objects.filter(
         Q(created_date__date=timezone.now().date())
         & Q(archived=False)
         & Q(driver__isnull=False)
-    )
+    ).select_related('driver'))
+
+    if routes:
+        manifests = _fetch_manifests([route.route_id for route in routes])
 
-    if routes.exists():
-        # Initialize the Service
+        complete_routes, incomplete_manifests = [], {}
         for route in routes:
-            if not _check_route_success(route.route_id):
-                _fetch_order_in_route(route.route_id)
-            elif _archive_route(route.route_id):
-                try:
-                    with transaction.atomic():
-                        route.archived = True
-                        route.save()
-                        route.driver.free = True
-                        route.driver.save()
-                        logger.info(f"Successfully archived route {route.route_id}")
-
-                        # region Notify
-                        card = _build_card(
-                            header=f"<font color=\"#167a06\"> Driver {route.driver.driver_name} <font color=\"#167a06\">",
-                            message=f"Route {route.route_id} is complete"
-                        )
-
-                        hook_url = configs.get('PDT_WEBHOOK_URL')
-
-                        # Build and send the Google Chat notification
-                        chat_service = GoogleChatService(logger=logger)
-                        chat_service.webhook_send(
-                            webhook_url=hook_url,
-                            card=card,
-                        )
-                        logger.info(f"Sent Google Chat notification for route {route.route_id}")
-                        # endregion
-
-                except IntegrityError as ie:
-                    logger.error(f"Integrity error archiving route {route.route_id}: {ie}")
+            manifest = manifests[route.route_id]
+            if manifest is None:
+                continue
+
+            if _check_route_success(route.route_id, manifest):
+                complete_routes.append(route)
+            else:
+                incomplete_manifests[route.route_id] = manifest
+
+        _detach_pulled_orders(incomplete_manifests)
+
+        route_service = RouteService(logger=logger)
+        archived = run_concurrently(
+            lambda r: _archive_route(r.route_id, route_service),
+            complete_routes,
+            max_workers=ROUTE_SYNC_MAX_WORKERS
+        )
+
+        for route, is_archived in zip(complete_routes, archived):
+            if not is_archived:
+                continue
+
+            try:
+                with transaction.atomic():
+                    route.archived = True
+                    route.save()
+                    route.driver.free = True
+                    route.driver.save()
+                    logger.info(f"Successfully archived route {route.route_id}")
+
+                    # region Notify
+                    card = _build_card(
+                        header=f"<font color=\"#167a06\"> Driver {route.driver.driver_name} <font color=\"#167a06\">",
+                        message=f"Route {route.route_id} is complete"
+                    )
+
+                    hook_url = configs.get('PDT_WEBHOOK_URL')
+
+                    # Build and send the Google Chat notification
+                    chat_service = GoogleChatService(logger=logger)
+                    chat_service.webhook_send(
+                        webhook_url=hook_url,
+                        card=card,
+                    )
+                    logger.info(f"Sent Google Chat notification for route {route.route_id}")
+                    # endregion
+
+            except IntegrityError as ie:
+                logger.error(f"Integrity error archiving route {route.route_id}: {ie}")
 
     # Assign driver to route not assigned
     assign_driver()
 
     # Start route
-    start_route()
+    start_route(refresh_orders=False)
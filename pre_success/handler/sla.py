@@ -29,14 +29,18 @@ def pull_route_ovfd():
         logger.info("No orders need pull route in the database")
         return
 
+    pulled = 0
     for order in orders:
         if pull_route(order.order_id):
             logger.info(f"Pull route successfully for order {order.tracking_id}")
+            pulled += 1
         else:
             logger.error(f"Failed to pull route for order {order.tracking_id}")
             continue
 
     # Ensure new status is updated
+    if pulled:
+        load_order_info.invalidate()
     load_order_info()
 
 
@@ -73,6 +77,10 @@ def cancel_ticket_missing():
     failed = result.get('failed', [])
     logger.info(f"Successfully cancel missing tickets: success={success}, failed={failed}")
 
+    # Cancelled tickets change the status of their orders
+    if success:
+        load_order_info.invalidate()
+
 
 def create_ms_ticket_again():
     yesterday = timezone.now().date() - timezone.timedelta(days=1)
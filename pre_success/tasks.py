@@ -1,5 +1,6 @@
 from celery import shared_task
 
+from core.base.pipeline import Pipeline
 from core.base.task import STOsQueueOnce
 from .handler.collect_data import (
     collect_vendor_call_data,
@@ -30,37 +31,76 @@ def fetch_task():
     fetch_route()
 
 
+def __dispatch_fetch():
+    fetch_task.apply_async()
+
+
+# Stages only wait for the stages whose data they read, the others run in parallel.
+# The stages writing the orders and refreshing them from OPv2 (cancel ticket, pull route OVFD, reschedule)
+# run one after the other, two concurrent refreshes would write the same Order rows.
+# `load_order_info` is memoized per run, the refresh stages and the refreshes inside the handlers
+# only call OPv2 again when a stage changed the orders since the last refresh.
+without_reschedule_pipeline = (
+    Pipeline('pre_success_without_reschedule')
+    .stage('collect', collect_vendor_call_data)
+    .stage('load_order_info', load_order_info, after=['collect'])
+    .stage('parcel_sweeper', parcel_sweeper_live, after=['load_order_info'])
+    .stage('routing', routing_orders, after=['parcel_sweeper'])
+    .stage('fetch', __dispatch_fetch, after=['routing'])
+)
+
+with_reschedule_pipeline = (
+    Pipeline('pre_success_with_reschedule')
+    .stage('collect', collect_vendor_call_data)
+    .stage('load_order_info', load_order_info, after=['collect'])
+    .stage('reschedule', reschedule_order, after=['load_order_info'])
+    .stage('parcel_sweeper', parcel_sweeper_live, after=['reschedule'])
+    .stage('routing', routing_orders, after=['parcel_sweeper'])
+    .stage('fetch', __dispatch_fetch, after=['routing'])
+)
+
+sla_pipeline = (
+    Pipeline('pre_success_sla')
+    .stage('collect', collect_vendor_call_data)
+    .stage('load_order_info', load_order_info, after=['collect'])
+    .stage('load_ticket_info', load_ticket_info_sla, after=['collect'])
+    .stage('cancel_ticket_missing', cancel_ticket_missing, after=['load_order_info', 'load_ticket_info'])
+    .stage('pull_route_ovfd', pull_route_ovfd, after=['cancel_ticket_missing'])
+    .stage('reschedule', reschedule_order, after=['pull_route_ovfd'])
+    .stage('refresh_order_info', load_order_info, after=['reschedule'])
+    .stage('parcel_sweeper', parcel_sweeper_live, after=['refresh_order_info'], sla_enabled=True)
+    .stage('routing', routing_orders, after=['parcel_sweeper'])
+    .stage('fetch', __dispatch_fetch, after=['routing'])
+)
+
+proactive_pipeline = (
+    Pipeline('pre_success_proactive')
+    .stage('collect', collect_vendor_call_proactive)
+    .stage('load_order_info', load_order_info, after=['collect'])
+    .stage('load_ticket_info', load_ticket_info_proactive, after=['collect'])
+    .stage('reschedule', reschedule_order, after=['load_order_info'])
+    .stage('cancel_ticket', cancel_ticket_proactive, after=['reschedule', 'load_ticket_info'])
+    .stage('refresh_order_info', load_order_info, after=['cancel_ticket'])
+    .stage('parcel_sweeper', parcel_sweeper_live, after=['refresh_order_info'])
+    .stage('routing', routing_orders, after=['parcel_sweeper'])
+    .stage('fetch', __dispatch_fetch, after=['routing'])
+)
+
+
 @shared_task(name='[Pre Success] Handle without reschedule', base=STOsQueueOnce, once={'graceful': True})
 def collect_vendor_call_data_with_task():
-    collect_vendor_call_data()
-    load_order_info()
-    parcel_sweeper_live()
-    routing_orders()
-    fetch_task.apply_async()
+    without_reschedule_pipeline.run()
 
 
 @shared_task(name='[Pre Success] Handle with reschedule', base=STOsQueueOnce, once={'graceful': True})
 def collect_vendor_call_data_task():
-    collect_vendor_call_data()
-    load_order_info()
-    reschedule_order()
-    parcel_sweeper_live()
-    routing_orders()
-    fetch_task.apply_async()
+    with_reschedule_pipeline.run()
 
 
 @shared_task(name='[Pre Success] Handler SLA', base=STOsQueueOnce, once={'graceful': True})
 def sla_task():
     """Run all tasks for SLA at once 22:00"""
-    collect_vendor_call_data()
-    load_order_info()
-    load_ticket_info_sla()
-    cancel_ticket_missing()
-    pull_route_ovfd()
-    reschedule_order()
-    parcel_sweeper_live(sla_enabled=True)
-    routing_orders()
-    fetch_task.apply_async()
+    sla_pipeline.run()
 
 
 @shared_task(name='[Pre Success] Create MS Ticket Again', base=STOsQueueOnce, once={'graceful': True})
@@ -70,12 +110,4 @@ def creat_ms_again_task():
 
 @shared_task(name='[Pre Success] Handle proactive', base=STOsQueueOnce, once={'graceful': True})
 def handle_proactive():
-    collect_vendor_call_proactive()
-    load_order_info()
-    reschedule_order()
-    load_ticket_info_proactive()
-    cancel_ticket_proactive()
-    load_order_info()
-    parcel_sweeper_live()
-    routing_orders()
-    fetch_task.apply_async()
+    proactive_pipeline.run()
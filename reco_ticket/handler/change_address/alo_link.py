@@ -1,10 +1,10 @@
 import logging
 
 from django.db.models import Q
-from django.db.models.functions import Lower
 from django.utils import timezone
 from simple_history.utils import bulk_update_with_history
 
+from core.base.search import search_q
 from opv2.dto import TicketResolveDTO
 from opv2.services import TicketService
 from ...models import TicketChangeAddress
@@ -65,22 +65,9 @@ def __resolve_tickets(tickets, new_instruction, action_reason):
 
 
 def solve_ticket_have_alo_link():
-    tickets = TicketChangeAddress.objects.annotate(
-        exception_reason_lower=Lower('exception_reason'),
-        notes_lower=Lower('notes'),
-        comments_lower=Lower('comments'),
-    ).filter(
+    tickets = TicketChangeAddress.objects.filter(
         Q(action__isnull=True)
-        & (
-                Q(exception_reason_lower__icontains='https://alo.njv.vn')
-                | Q(notes_lower__icontains='https://alo.njv.vn')
-                | Q(comments_lower__icontains='https://alo.njv.vn')
-        )
-        & (
-                Q(exception_reason_lower__icontains='đồng ý RTS'.lower())
-                | Q(notes_lower__icontains='đồng ý RTS'.lower())
-                | Q(comments_lower__icontains='đồng ý RTS'.lower())
-        )
+        & search_q('search_text', ['https://alo.njv.vn', 'đồng ý RTS'], match_all=True)
     )
 
     if not tickets.exists():
@@ -5,6 +5,7 @@ from django.db.models import Q
 from django.utils import timezone
 from simple_history.utils import bulk_update_with_history
 
+from core.base.search import search_q
 from opv2.dto import TicketResolveDTO
 from opv2.services import TicketService, OrderService
 from ...models import TicketChangeAddress
@@ -109,21 +110,10 @@ def approve_hcm_dn_hn():
     main_provinces = ['Hồ Chí Minh', 'Đà Nẵng', 'Hà Nội']
     abbreviations = ['HCM', 'ĐN', 'HN']
 
-    province_filters = Q()
-    for province in main_provinces + abbreviations:
-        province_filters |= Q(province__icontains=province) | Q(old_province__icontains=province)
-
-    address_filters = Q()
-    for term in main_provinces + abbreviations:
-        address_filters |= Q(old_address__icontains=term)
-
-    detect_filters = Q()
-    for term in main_provinces + abbreviations:
-        detect_filters |= Q(detect__province__icontains=term)
-
+    terms = main_provinces + abbreviations
     tickets = TicketChangeAddress.objects.filter(
-        (province_filters | address_filters) & detect_filters & Q(action__isnull=True)
-    )
+        search_q('search_address', terms) & search_q('detect__search_province', terms) & Q(action__isnull=True)
+    ).select_related('detect')
 
     if not tickets.exists():
         logger.info("No tickets to approve")
@@ -144,7 +134,7 @@ def approve_map_2_level():
     tickets = TicketChangeAddress.objects.filter(
         Q(action__isnull=True) &
         Q(detect__isnull=False)
-    )
+    ).select_related('detect')
 
     if not tickets.exists():
         logger.info("No ticket to approve")
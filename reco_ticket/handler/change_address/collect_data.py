@@ -5,7 +5,7 @@ from django.utils import timezone
 from gql import gql
 from simple_history.utils import bulk_create_with_history, bulk_update_with_history
 
-from network.models import Zone
+from network.reference import network_reference
 from opv2.services import OrderService, GraphQLService
 from redash.client import RedashClient
 from stos.utils import configs, chunk_list, check_record_change
@@ -66,8 +66,10 @@ def collect_ticket_change_address():
                 )
 
                 if s_updated:
+                    existing_record.refresh_search_columns()
                     update_tickets.append(existing_record)
             else:
+                ticket.refresh_search_columns()
                 new_tickets.append(ticket)
 
         try:
@@ -83,7 +85,7 @@ def collect_ticket_change_address():
                     update_tickets,
                     TicketChangeAddress,
                     batch_size=1000,
-                    fields=['investigating_hub_id', 'comments', 'notes', 'exception_reason', 'province']
+                    fields=['investigating_hub_id', 'comments', 'notes', 'exception_reason', 'province', 'search_text', 'search_address']
                 )
                 total_success += success
                 logger.info(f"Updated {success} tickets change address records.")
@@ -135,12 +137,11 @@ def load_zone_info(tracking_ids):
     tracking_zone_id_map = {order["order"]["trackingId"]: order["order"]["lastDelivery"]["waypoint"]["routingZoneId"] for order in list_orders}
     tracking_zone_name_map = {}
     for tracking_id, zone_id in tracking_zone_id_map.items():
-        try:
-            zone = Zone.objects.get(legacy_zone_id=zone_id)
-            tracking_zone_name_map[tracking_id] = zone.name
-        except Zone.DoesNotExist:
+        zone = network_reference.zone_by_legacy_id(zone_id)
+        if zone is None:
             logger.warning(f"Zone with ID {zone_id} not found")
             continue
+        tracking_zone_name_map[tracking_id] = zone.name
 
     return tracking_zone_name_map
 
@@ -175,6 +176,7 @@ def load_ticket_change_address_order_info():
         ticket.order_status = info.granular_status
         ticket.zone_name = tracking_zone_name_map.get(ticket.tracking_id)
         ticket.updated_date = timezone.now()
+        ticket.refresh_search_columns()
 
         update.append(ticket)
 
@@ -182,7 +184,7 @@ def load_ticket_change_address_order_info():
         success = bulk_update_with_history(
             update,
             TicketChangeAddress, batch_size=1000,
-            fields=['old_address', 'order_id', 'old_province', 'old_district', 'old_ward', 'rts_flag', 'order_status', 'zone_name', 'updated_date']
+            fields=['old_address', 'order_id', 'old_province', 'old_district', 'old_ward', 'rts_flag', 'order_status', 'zone_name', 'search_address', 'updated_date']
         )
 
         logger.info(f"Updated {success}/{tickets.count()} tickets' order info")
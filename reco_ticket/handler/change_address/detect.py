@@ -102,6 +102,7 @@ def detect_address():
             district=item.get('district'),
             ward=item.get('ward_commune'),
         )
+        new_detect.refresh_search_columns()
 
         update_data.append(new_detect)
 
@@ -4,6 +4,7 @@ from django.db.models import Q
 from django.utils import timezone
 from simple_history.utils import bulk_update_with_history
 
+from core.base.search import search_q
 from opv2.services import TicketService
 from ...models import TicketChangeAddress
 
@@ -12,12 +13,7 @@ logger = logging.getLogger(__name__)
 
 def manual_ticket_have_alo_link():
     tickets = TicketChangeAddress.objects.filter(
-        Q(action__isnull=True)
-        & (
-                Q(exception_reason__icontains='https://alo.njv.vn')
-                | Q(notes__icontains='https://alo.njv.vn')
-                | Q(comments__icontains='https://alo.njv.vn')
-        )
+        Q(action__isnull=True) & search_q('search_text', ['https://alo.njv.vn'])
     )
 
     if not tickets.exists():
@@ -1,18 +1,20 @@
 import logging
+from typing import List
 
-from django.db.models import Q, F
+import pandas as pd
+from django.db.models import Q, QuerySet
 from django.utils import timezone
 from simple_history.utils import bulk_update_with_history
 
-from opv2.base.order import GranularStatusChoices
 from opv2.dto import TicketResolveDTO
 from opv2.services import TicketService
+from .rules import ChangeDateRule, CHANGE_DATE_RULES, APPLY_ACTION_RULES, RULE_FIELDS, evaluate_rules
 from ...models import TicketChangeDate
 
 logger = logging.getLogger(__name__)
 
 
-def __resolve_tickets(tickets, new_instruction, action, action_reason):
+def __resolve_tickets(ticket_svc: TicketService, tickets: List[TicketChangeDate], new_instruction: str) -> List[TicketChangeDate]:
     # Prepare DTOs for resolving tickets
     data_resolve = [
         TicketResolveDTO(
@@ -24,144 +26,68 @@ def __resolve_tickets(tickets, new_instruction, action, action_reason):
         ) for ticket in tickets
     ]
 
-    # Initialize the ticket service and attempt to resolve tickets
-    ticket_svc = TicketService(logger=logger)
     stt_code, result = ticket_svc.resolve_tickets(data_resolve)
 
     if stt_code != 200:
         logger.error(f"Failed to resolve tickets with status code {stt_code}")
-        return
+        return []
 
     success_ticket_ids = result.get('success', [])
     if not success_ticket_ids:
         logger.warning("No tickets were successfully resolved")
-        return
+        return []
 
-    # Prepare tickets for bulk update
     map_ticket_id = {f'{ticket.ticket_id}': ticket for ticket in tickets}
-    tickets_to_update = []
-    for ticket_id in success_ticket_ids:
-        ticket = map_ticket_id.get(f'{ticket_id}')
-        if ticket is None:
-            continue
-
-        ticket.action = action
-        ticket.action_reason = action_reason
-        ticket.apply_action = timezone.now()
-        ticket.updated_date = timezone.now()
-        tickets_to_update.append(ticket)
-
-    # Attempt bulk update with history
-    try:
-        success = bulk_update_with_history(
-            tickets_to_update,
-            TicketChangeDate,
-            batch_size=1000,
-            fields=['action', 'updated_date', 'action_reason', 'apply_action']
-        )
-        logger.info(f"Updated {success}/{len(tickets_to_update)} tickets' statuses")
-    except Exception as e:
-        logger.error(f"Failed to update orders: {e}")
-        raise e
-
-
-def not_have_first_delivery_date():
-    tickets = TicketChangeDate.objects.filter(
-        Q(first_delivery_date__isnull=True)
-        & Q(action__isnull=True)
-    )
-
-    if not tickets.exists():
-        logger.info("No tickets to not have first delivery date")
-        return
-
-    __resolve_tickets(
-        tickets,
-        'Auto resolved by system. Not have first attempt.',
-        'Reject',
-        'Not have first attempt'
-    )
-
-
-def have_rts_or_last_status():
-    tickets = TicketChangeDate.objects.filter(
-        (Q(rts_flag=True) |
-         Q(order_status__in=[GranularStatusChoices.completed, GranularStatusChoices.cancelled])) &
-        Q(action__isnull=True)
-    )
-
-    if not tickets.exists():
-        logger.info("No tickets to RTS or last status")
-        return
-
-    __resolve_tickets(
-        tickets,
-        'Auto resolved by system. Order is RTS or has a granular status of Cancelled/Completed.',
-        'Reject',
-        'Order is last status or RTS'
-    )
+    return [map_ticket_id[f'{ticket_id}'] for ticket_id in success_ticket_ids if f'{ticket_id}' in map_ticket_id]
 
 
-def more_than_five_date():
-    tickets = TicketChangeDate.objects.filter(
-        Q(detected_date__gt=F('first_delivery_date') + timezone.timedelta(days=5))
-        & Q(action__isnull=True)
-    )
+def __apply_rules(tickets: QuerySet, rules: List[ChangeDateRule]):
+    """
+    Load the tickets once, evaluate the rules in a single pass, resolve each outcome
+    in one batch and save every ticket with one bulk update.
+    """
+    tickets = list(tickets)
 
-    if not tickets.exists():
-        logger.info("No tickets to more than five date")
+    if not tickets:
+        logger.info("No tickets to handle")
         return
 
-    __resolve_tickets(
-        tickets,
-        'Auto resolved by system. Greater than 5 days',
-        'Reject',
-        'Greater than 5 days'
-    )
-
+    df = pd.DataFrame([{field: getattr(ticket, field) for field in RULE_FIELDS} for ticket in tickets])
+    outcomes = evaluate_rules(df, rules, timezone.now().date())
 
-def incorrect_format_date():
-    tickets = TicketChangeDate.objects.filter(
-        Q(detected_date__isnull=True)
-        & Q(action__isnull=True)
-    )
+    ticket_svc = TicketService(logger=logger)
+    tickets_to_update = []
+    for rule in rules:
+        matched = [tickets[index] for index in outcomes.index[outcomes == rule.name]]
 
-    if not tickets.exists():
-        logger.info("No tickets to incorrect format")
-        return
+        if not matched:
+            logger.info(f"No tickets for rule {rule.name}")
+            continue
 
-    __resolve_tickets(
-        tickets,
-        'Auto resolved by system. Incorrect format. Please create new ticket correct format.',
-        'Reject',
-        'Incorrect format'
-    )
+        logger.info(f"Found {len(matched)} tickets for rule {rule.name}")
 
+        apply_action = None
+        if rule.new_instruction is not None:
+            matched = __resolve_tickets(ticket_svc, matched, rule.new_instruction)
+            apply_action = timezone.now()
 
-def approve_tickets():
-    tickets = TicketChangeDate.objects.filter(
-        Q(action__isnull=True) &
-        Q(detected_date__isnull=False)
-    )
+        for ticket in matched:
+            ticket.action = rule.action
+            ticket.action_reason = rule.action_reason
+            ticket.apply_action = apply_action
+            ticket.updated_date = timezone.now()
+            tickets_to_update.append(ticket)
 
-    if not tickets.exists():
-        logger.info("No tickets to approve")
+    if not tickets_to_update:
         return
 
-    tickets_to_update = []
-    for ticket in tickets:
-        ticket.action = 'Approve'
-        ticket.action_reason = 'Normal Approve'
-        ticket.updated_date = timezone.now()
-        tickets_to_update.append(ticket)
-
     # Attempt bulk update with history
     try:
         success = bulk_update_with_history(
             tickets_to_update,
             TicketChangeDate,
             batch_size=1000,
-            fields=['action', 'updated_date']
+            fields=['action', 'action_reason', 'apply_action', 'updated_date']
         )
         logger.info(f"Updated {success}/{len(tickets_to_update)} tickets' statuses")
     except Exception as e:
@@ -169,20 +95,24 @@ def approve_tickets():
         raise e
 
 
-def apply_action():
-    tickets = TicketChangeDate.objects.filter(
-        Q(action='Approve') &
-        Q(apply_action__isnull=True) &
-        Q(detected_date__lte=timezone.now().date())
+def handle_change_date_actions():
+    """
+    Decide the action of every ticket change date without action, following the priority of CHANGE_DATE_RULES.
+
+    Rejected tickets are resolved on OPv2, approved tickets are resolved by `apply_action` once their date is reached.
+    """
+    __apply_rules(
+        TicketChangeDate.objects.filter(Q(action__isnull=True)),
+        CHANGE_DATE_RULES
     )
 
-    if not tickets.exists():
-        logger.info("No tickets to apply action")
-        return
 
-    __resolve_tickets(
-        tickets,
-        'Auto resolved by system. Approved by system.',
-        'Approve',
-        'Normal Approve',
+def apply_action():
+    __apply_rules(
+        TicketChangeDate.objects.filter(
+            Q(action='Approve') &
+            Q(apply_action__isnull=True) &
+            Q(detected_date__lte=timezone.now().date())
+        ),
+        APPLY_ACTION_RULES
     )
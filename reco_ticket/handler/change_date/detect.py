@@ -8,6 +8,7 @@ from simple_history.utils import bulk_update_with_history
 
 from google_wrapper.services import GenminiAIService
 from stos.utils import configs, chunk_list, parse_datetime, swap_day_month_if_different
+from .rules import SKIP_DETECTION
 from ...models import TicketChangeDate
 
 logger = logging.getLogger(__name__)
@@ -51,7 +52,7 @@ def detect_date():
                 Q(comments__isnull=False)
         ) &
         Q(action__isnull=True)
-    )
+    ).exclude(SKIP_DETECTION)
 
     if not tickets.exists():
         logger.info("No tickets to detect address")
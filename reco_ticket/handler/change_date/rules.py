@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.db.models import Q
+
+from opv2.base.order import GranularStatusChoices
+
+# Ticket fields the rules are evaluated on
+RULE_FIELDS = ['rts_flag', 'order_status', 'first_delivery_date', 'detected_date']
+
+
+@dataclass(frozen=True)
+class ChangeDateRule:
+    """
+    A rule deciding the action of a ticket change date.
+
+    Attributes:
+        name (str): Unique name of the rule, used as the outcome of the evaluation.
+        condition (Callable[[pd.DataFrame, date], pd.Series]): Vectorized condition over the tickets and today's date.
+        action (str): Action recorded on the matched tickets.
+        action_reason (str): Reason recorded on the matched tickets.
+        new_instruction (Optional[str]): Instruction used to resolve the matched tickets on OPv2.
+            None records the action without resolving the tickets.
+    """
+    name: str
+    condition: Callable[[pd.DataFrame, date], pd.Series]
+    action: str
+    action_reason: str
+    new_instruction: Optional[str] = None
+
+
+def _to_datetime(series: pd.Series) -> pd.Series:
+    # Compare naive datetimes in the timezone the database stores them in
+    return pd.to_datetime(series, utc=True).dt.tz_localize(None)
+
+
+# Ordered by priority, a ticket gets the outcome of the first rule it matches
+CHANGE_DATE_RULES: List[ChangeDateRule] = [
+    ChangeDateRule(
+        name='rts_or_last_status',
+        condition=lambda df, today: df['rts_flag'].astype(bool) | df['order_status'].isin(
+            [GranularStatusChoices.completed, GranularStatusChoices.cancelled]
+        ),
+        action='Reject',
+        action_reason='Order is last status or RTS',
+        new_instruction='Auto resolved by system. Order is RTS or has a granular status of Cancelled/Completed.',
+    ),
+    ChangeDateRule(
+        name='no_first_delivery_date',
+        condition=lambda df, today: df['first_delivery_date'].isna(),
+        action='Reject',
+        action_reason='Not have first attempt',
+        new_instruction='Auto resolved by system. Not have first attempt.',
+    ),
+    ChangeDateRule(
+        name='more_than_five_days',
+        condition=lambda df, today: (
+                _to_datetime(df['detected_date']) > _to_datetime(df['first_delivery_date']) + pd.Timedelta(days=5)
+        ),
+        action='Reject',
+        action_reason='Greater than 5 days',
+        new_instruction='Auto resolved by system. Greater than 5 days',
+    ),
+    ChangeDateRule(
+        name='approve',
+        condition=lambda df, today: df['detected_date'].notna(),
+        action='Approve',
+        action_reason='Normal Approve',
+    ),
+    ChangeDateRule(
+        name='incorrect_format',
+        condition=lambda df, today: df['detected_date'].isna(),
+        action='Reject',
+        action_reason='Incorrect format',
+        new_instruction='Auto resolved by system. Incorrect format. Please create new ticket correct format.',
+    ),
+]
+
+# Applies the approved tickets once their detected date is reached
+APPLY_ACTION_RULES: List[ChangeDateRule] = [
+    ChangeDateRule(
+        name='apply_approved',
+        condition=lambda df, today: _to_datetime(df['detected_date']) <= pd.Timestamp(today),
+        action='Approve',
+        action_reason='Normal Approve',
+        new_instruction='Auto resolved by system. Approved by system.',
+    ),
+]
+
+# Tickets rejected by the rules whatever their detected date, no need to detect their date
+SKIP_DETECTION = (
+        Q(rts_flag=True)
+        | Q(order_status__in=[GranularStatusChoices.completed, GranularStatusChoices.cancelled])
+        | Q(first_delivery_date__isnull=True)
+)
+
+
+def evaluate_rules(df: pd.DataFrame, rules: List[ChangeDateRule], today: date) -> pd.Series:
+    """
+    Evaluate the rules over all tickets in a single vectorized pass.
+
+    Args:
+        df (pd.DataFrame): The tickets, with at least the RULE_FIELDS columns.
+        rules (List[ChangeDateRule]): The rules, ordered by priority.
+        today (date): The date the rules are evaluated on.
+
+    Returns:
+        pd.Series: The name of the first matching rule for each ticket, None when no rule matches.
+    """
+    if df.empty:
+        return pd.Series(dtype=object, index=df.index)
+
+    conditions = [rule.condition(df, today).fillna(False).astype(bool).to_numpy() for rule in rules]
+    outcomes = np.select(conditions, [rule.name for rule in rules], default=None)
+
+    return pd.Series(outcomes, index=df.index, dtype=object)
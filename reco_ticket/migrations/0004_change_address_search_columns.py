@@ -0,0 +1,93 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:32
+
+import core.base.search
+from django.db import migrations
+
+SEARCH_SOURCES = {
+    'TicketChangeAddress': {
+        'search_text': ['exception_reason', 'notes', 'comments'],
+        'search_address': ['province', 'old_province', 'old_address'],
+    },
+    'DetectChangeAddress': {
+        'search_province': ['province'],
+    },
+}
+
+FULLTEXT_INDEXES = [
+    ('reco_ticket_ticketchangeaddress', 'reco_ticket_tca_search_text_ft', 'search_text'),
+    ('reco_ticket_ticketchangeaddress', 'reco_ticket_tca_search_address_ft', 'search_address'),
+    ('reco_ticket_detectchangeaddress', 'reco_ticket_dca_search_province_ft', 'search_province'),
+]
+
+
+def backfill_search_columns(apps, schema_editor):
+    for model_name, sources in SEARCH_SOURCES.items():
+        model = apps.get_model('reco_ticket', model_name)
+        fields = [field for columns in sources.values() for field in columns]
+        batch = []
+        for obj in model._default_manager.only('pk', *fields).iterator(chunk_size=2000):
+            for column, columns in sources.items():
+                setattr(obj, column, core.base.search.fold_text(' '.join(f'{getattr(obj, c)}' for c in columns if getattr(obj, c))))
+            batch.append(obj)
+            if len(batch) >= 2000:
+                model._default_manager.bulk_update(batch, list(sources.keys()))
+                batch = []
+        if batch:
+            model._default_manager.bulk_update(batch, list(sources.keys()))
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    # FULLTEXT ngram indexes only exist on MySQL, other databases search with LIKE
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, name, column in FULLTEXT_INDEXES:
+        schema_editor.execute(f'ALTER TABLE `{table}` ADD FULLTEXT INDEX `{name}` (`{column}`) WITH PARSER ngram')
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, name, column in FULLTEXT_INDEXES:
+        schema_editor.execute(f'ALTER TABLE `{table}` DROP INDEX `{name}`')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reco_ticket', '0003_ticketmissing_historicalticketmissing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detectchangeaddress',
+            name='search_province',
+            field=core.base.search.SearchTextField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicaldetectchangeaddress',
+            name='search_province',
+            field=core.base.search.SearchTextField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalticketchangeaddress',
+            name='search_address',
+            field=core.base.search.SearchTextField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalticketchangeaddress',
+            name='search_text',
+            field=core.base.search.SearchTextField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticketchangeaddress',
+            name='search_address',
+            field=core.base.search.SearchTextField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticketchangeaddress',
+            name='search_text',
+            field=core.base.search.SearchTextField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_columns, migrations.RunPython.noop),
+        migrations.RunPython(add_fulltext_indexes, drop_fulltext_indexes),
+    ]
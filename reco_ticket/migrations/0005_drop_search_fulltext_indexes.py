@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-19 09:10
+
+from django.db import migrations
+
+FULLTEXT_INDEXES = [
+    ('reco_ticket_ticketchangeaddress', 'reco_ticket_tca_search_text_ft', 'search_text'),
+    ('reco_ticket_ticketchangeaddress', 'reco_ticket_tca_search_address_ft', 'search_address'),
+    ('reco_ticket_detectchangeaddress', 'reco_ticket_dca_search_province_ft', 'search_province'),
+]
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    # The search columns are matched with LIKE only, the ngram indexes are not used anymore
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, name, column in FULLTEXT_INDEXES:
+        schema_editor.execute(f'ALTER TABLE `{table}` DROP INDEX `{name}`')
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, name, column in FULLTEXT_INDEXES:
+        schema_editor.execute(f'ALTER TABLE `{table}` ADD FULLTEXT INDEX `{name}` (`{column}`) WITH PARSER ngram')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reco_ticket', '0004_change_address_search_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_fulltext_indexes, add_fulltext_indexes),
+    ]
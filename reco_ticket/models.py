@@ -1,6 +1,7 @@
 from django.db import models
 
 from core.base.model import BaseModel
+from core.base.search import SearchIndexMixin, SearchTextField
 from opv2.base.order import GranularStatusChoices
 from opv2.base.ticket import BaseTicket
 
@@ -28,7 +29,7 @@ class TicketChangeDate(BaseTicket):
         verbose_name_plural = 'Ticket Change Dates'
 
 
-class TicketChangeAddress(BaseTicket):
+class TicketChangeAddress(SearchIndexMixin, BaseTicket):
     created_at = models.DateTimeField(null=True, blank=True)
     comments = models.TextField(null=True, blank=True)
     notes = models.TextField(null=True, blank=True)
@@ -52,19 +53,32 @@ class TicketChangeAddress(BaseTicket):
     action = models.CharField(max_length=255, null=True, blank=True)
     action_reason = models.CharField(max_length=255, null=True, blank=True)
     out_sheet = models.BooleanField(default=False)
+    # Folded shadow columns for text search
+    search_text = SearchTextField(null=True, blank=True, editable=False)
+    search_address = SearchTextField(null=True, blank=True, editable=False)
+
+    search_sources = {
+        'search_text': ['exception_reason', 'notes', 'comments'],
+        'search_address': ['province', 'old_province', 'old_address'],
+    }
 
     class Meta:
         verbose_name = 'Ticket Change Address'
         verbose_name_plural = 'Ticket Change Addresses'
 
 
-class DetectChangeAddress(BaseModel):
+class DetectChangeAddress(SearchIndexMixin, BaseModel):
     input = models.TextField(null=True)
     address = models.TextField(null=True)
     province = models.CharField(max_length=255, null=True)
     district = models.CharField(max_length=255, null=True)
     ward = models.CharField(max_length=255, null=True)
     ticket = models.OneToOneField(TicketChangeAddress, on_delete=models.CASCADE, related_name='detect')
+    search_province = SearchTextField(null=True, blank=True, editable=False)
+
+    search_sources = {
+        'search_province': ['province'],
+    }
 
     class Meta:
         verbose_name = 'Detect Change Address'
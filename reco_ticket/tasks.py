@@ -28,11 +28,7 @@ from .handler.change_address.resolve import (
     resolved_ticket_incorrect_format
 )
 from .handler.change_date.actions import (
-    not_have_first_delivery_date,
-    have_rts_or_last_status,
-    more_than_five_date,
-    incorrect_format_date,
-    approve_tickets,
+    handle_change_date_actions,
     apply_action
 )
 from .handler.change_date.collect_data import (
@@ -66,14 +62,10 @@ def handle_change_address_task():
 def handle_change_date_task():
     collect_ticket_change_date()
     load_order_info_change_date()
-    have_rts_or_last_status()
-    not_have_first_delivery_date()
     detect_date()
     time.sleep(5)
     detect_date()
-    more_than_five_date()
-    approve_tickets()
-    incorrect_format_date()
+    handle_change_date_actions()
 
 
 @shared_task(name='[Reco Ticket] Handle Ticket Change Date Apply Action', base=STOsQueueOnce, once={'graceful': True})
@@ -0,0 +1,162 @@
+from datetime import date, datetime, timezone
+from unittest import mock
+
+import pandas as pd
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.test import SimpleTestCase, TestCase
+
+from opv2.base.order import GranularStatusChoices
+from reco_ticket.handler.change_address import alo_link, approve
+from reco_ticket.handler.change_date.rules import (
+    APPLY_ACTION_RULES,
+    CHANGE_DATE_RULES,
+    RULE_FIELDS,
+    ChangeDateRule,
+    evaluate_rules,
+)
+from reco_ticket.models import DetectChangeAddress, TicketChangeAddress
+
+TODAY = date(2026, 10, 19)
+FIRST_DELIVERY_DATE = datetime(2026, 10, 10, tzinfo=timezone.utc)
+
+
+def ticket(**fields) -> dict:
+    return {
+        'rts_flag': False,
+        'order_status': GranularStatusChoices.on_vehicle,
+        'first_delivery_date': FIRST_DELIVERY_DATE,
+        'detected_date': date(2026, 10, 12),
+        **fields,
+    }
+
+
+def tickets(*rows: dict) -> pd.DataFrame:
+    return pd.DataFrame(list(rows), columns=RULE_FIELDS)
+
+
+class EvaluateRulesTest(SimpleTestCase):
+    def test_match_first_rule_by_priority(self):
+        df = tickets(
+            ticket(rts_flag=True, first_delivery_date=None),
+            ticket(order_status=GranularStatusChoices.completed),
+            ticket(first_delivery_date=None),
+            ticket(detected_date=date(2026, 10, 20)),
+            ticket(),
+            ticket(detected_date=None),
+        )
+
+        outcomes = evaluate_rules(df, CHANGE_DATE_RULES, TODAY)
+
+        self.assertEqual(outcomes.tolist(), [
+            'rts_or_last_status',
+            'rts_or_last_status',
+            'no_first_delivery_date',
+            'more_than_five_days',
+            'approve',
+            'incorrect_format',
+        ])
+
+    def test_no_match(self):
+        rules = [
+            ChangeDateRule(
+                name='rts',
+                condition=lambda df, today: df['rts_flag'].astype(bool),
+                action='Reject',
+                action_reason='RTS',
+            ),
+        ]
+        df = tickets(ticket(), ticket(rts_flag=True))
+
+        outcomes = evaluate_rules(df, rules, TODAY)
+
+        self.assertEqual(outcomes.tolist(), [None, 'rts'])
+        self.assertEqual(evaluate_rules(tickets(), rules, TODAY).tolist(), [])
+
+    def test_no_match_on_missing_values(self):
+        df = tickets(ticket(detected_date=None))
+
+        outcomes = evaluate_rules(df, APPLY_ACTION_RULES, TODAY)
+
+        self.assertEqual(outcomes.tolist(), [None])
+
+    def test_five_days_boundary(self):
+        df = tickets(
+            ticket(detected_date=date(2026, 10, 15)),
+            ticket(detected_date=date(2026, 10, 16)),
+            ticket(first_delivery_date=datetime(2026, 10, 10, 8, tzinfo=timezone.utc), detected_date=date(2026, 10, 15)),
+        )
+
+        outcomes = evaluate_rules(df, CHANGE_DATE_RULES, TODAY)
+
+        self.assertEqual(outcomes.tolist(), ['approve', 'more_than_five_days', 'approve'])
+
+    def test_apply_on_detected_date(self):
+        df = tickets(
+            ticket(detected_date=date(2026, 10, 18)),
+            ticket(detected_date=TODAY),
+            ticket(detected_date=date(2026, 10, 20)),
+        )
+
+        outcomes = evaluate_rules(df, APPLY_ACTION_RULES, TODAY)
+
+        self.assertEqual(outcomes.tolist(), ['apply_approved', 'apply_approved', None])
+
+
+class ChangeAddressSearchTest(TestCase):
+    """
+    The folded search columns select the same tickets as the icontains filters they replaced.
+    """
+
+    def ticket(self, ticket_id: int, detect_province: str = None, **fields) -> TicketChangeAddress:
+        ticket = TicketChangeAddress.objects.create(ticket_id=ticket_id, tracking_id=f'SPEVN{ticket_id}', **fields)
+        if detect_province:
+            DetectChangeAddress.objects.create(ticket=ticket, province=detect_province)
+        return ticket
+
+    @staticmethod
+    def resolved(module, handler, *patched) -> set:
+        # The OPv2 calls are patched out, the tickets selected by the handler are the ones it resolves
+        with mock.patch.multiple(module, **{name: mock.DEFAULT for name in ('__resolve_tickets', *patched)}) as mocks:
+            handler()
+        resolve = mocks['__resolve_tickets']
+        return {ticket.ticket_id for ticket in resolve.call_args.args[0]} if resolve.called else set()
+
+    def test_approve_hcm_dn_hn(self):
+        self.ticket(1, 'Hồ Chí Minh', province='Hồ Chí Minh')
+        self.ticket(2, 'Đà Nẵng', province='Quảng Nam', old_address='12 Lê Lợi, Đà Nẵng')
+        self.ticket(3, 'Hà Nội', province='Cần Thơ')
+        self.ticket(4, 'Cần Thơ', province='Hà Nội')
+        self.ticket(5, 'TP HCM', old_province='HN')
+        self.ticket(6, 'Hồ Chí Minh', province='Hồ Chí Minh', action='Approve')
+        self.ticket(7, province='Hà Nội')
+
+        terms = ['Hồ Chí Minh', 'Đà Nẵng', 'Hà Nội', 'HCM', 'ĐN', 'HN']
+        province_filters, address_filters, detect_filters = Q(), Q(), Q()
+        for term in terms:
+            province_filters |= Q(province__icontains=term) | Q(old_province__icontains=term)
+            address_filters |= Q(old_address__icontains=term)
+            detect_filters |= Q(detect__province__icontains=term)
+        expected = set(TicketChangeAddress.objects.filter(
+            (province_filters | address_filters) & detect_filters & Q(action__isnull=True)
+        ).values_list('ticket_id', flat=True))
+
+        self.assertEqual(expected, {1, 2, 5})
+        self.assertEqual(self.resolved(approve, approve.approve_hcm_dn_hn, '__change_address'), expected)
+
+    def test_solve_ticket_have_alo_link(self):
+        self.ticket(1, notes='https://alo.njv.vn/abc', comments='Khách đồng ý RTS')
+        self.ticket(2, exception_reason='https://alo.njv.vn/abc')
+        self.ticket(3, notes='https://example.com', comments='đồng ý RTS')
+        self.ticket(4, notes='HTTPS://ALO.NJV.VN/abc đồng ý rts')
+        self.ticket(5, notes='https://alo.njv.vn/abc đồng ý RTS', action='RTS')
+
+        conditions = Q(action__isnull=True)
+        for term in ['https://alo.njv.vn', 'đồng ý rts']:
+            conditions &= Q(reason__contains=term) | Q(notes_lower__contains=term) | Q(comments_lower__contains=term)
+        expected = set(TicketChangeAddress.objects.annotate(
+            reason=Lower('exception_reason'), notes_lower=Lower('notes'), comments_lower=Lower('comments'),
+        ).filter(conditions).values_list('ticket_id', flat=True))
+
+        self.assertEqual(expected, {1, 4})
+        self.assertEqual(self.resolved(alo_link, alo_link.solve_ticket_have_alo_link), expected)
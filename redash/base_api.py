@@ -1,5 +1,9 @@
+import time
+
 import requests
 
+from core.base.metrics import observe_http
+
 
 class BaseAPI:
     """
@@ -39,9 +43,11 @@ class BaseAPI:
         """
         self._set_session_headers()
 
+        started_at = time.perf_counter()
         try:
             self.__logger.debug(f"Payload: {payload}")
             response = self.session.request(method, url, json=payload, files=files)
+            observe_http(type(self).__name__, method, url, response.status_code, time.perf_counter() - started_at)
             self.__logger.info(f"{response.url} {response.request.method} {response.status_code}")
 
             response.raise_for_status()
@@ -53,6 +59,7 @@ class BaseAPI:
             return http_error.response.status_code, http_error.response.json()
 
         except requests.exceptions.RequestException as req_error:
+            observe_http(type(self).__name__, method, url, type(req_error).__name__, time.perf_counter() - started_at)
             self.__logger.error(f"Request failed due to error: {req_error}")
             return 500, {'error': 'Request failed due to error'}
 
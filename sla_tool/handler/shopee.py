@@ -4,8 +4,10 @@ import logging
 from django.db import DatabaseError
 from django.db.models import Q
 from django.utils import timezone
+from requests.exceptions import HTTPError
 from simple_history.utils import bulk_create_with_history, bulk_update_with_history
 
+from core.base.memory import check_memory_budget, memory_budget
 from google_wrapper.services import GoogleSheetService, GoogleDriveService
 from google_wrapper.utils import get_service_account
 from opv2.services import OrderService
@@ -14,6 +16,9 @@ from ..models import ShopeeBacklog
 
 logger = logging.getLogger(__name__)
 
+# Order search fields of the backlog refresh, the tracking ID first
+ORDER_SEARCH_FIELDS = ['tracking_id', 'id', 'status', 'granular_status', 'is_rts']
+
 
 def __initialize_google_sheet_service(spreadsheet_id: str):
     """
@@ -208,38 +213,40 @@ def create_zns_date():
     logger.info(f'Successfully updated {shopee_backlogs.count()} Shopee Backlog records with ZNS date.')
 
 
-def update_shopee_order_info_form_opv2():
-    # Initialize Order Service
-    order_service = OrderService(logger=logger)
-    # Get all tracking IDs from the database
-    qs_orders = ShopeeBacklog.objects.filter(
-        Q(shipper_date=timezone.now().date())
-    )
-
-    if not qs_orders.exists():
-        logger.info('No orders found for the provided tracking IDs.')
+def __update_shopee_orders(order_service: OrderService, qs_orders, tracking_ids):
+    # Search for orders based on the tracking IDs, only the updated fields are kept from the columnar batches
+    orders = {}
+    try:
+        for batch in order_service.iter_search(tracking_ids, fields=ORDER_SEARCH_FIELDS):
+            for tracking_id, *values in zip(*(batch[field] for field in ORDER_SEARCH_FIELDS)):
+                orders[tracking_id] = values
+    except HTTPError as e:
+        logger.error(f'Failed to search orders on OPv2: {e}')
         return
 
-    tracking_ids = qs_orders.values_list('tracking_id', flat=True)
-
-    # Search for orders based on the tracking IDs
-    status_code, orders = order_service.search_all(tracking_ids)
-
-    if status_code == 404:
+    if not orders:
         logger.warning('No orders found for the provided tracking IDs.')
         return
 
+    # The search results are the bulk of the memory, checked before anything is written
+    check_memory_budget()
+
     order_has_changed = []
     # Update the orders in the database
     for qs_order in qs_orders:
         tracking_id = qs_order.tracking_id
 
         order = orders.get(tracking_id)
+        if order is None:
+            logger.warning(f'Order {tracking_id} not found on OPv2.')
+            continue
+
+        order_id, status, granular_status, is_rts = order
         new_record = copy.deepcopy(qs_order)
-        new_record.status = order.status
-        new_record.granular_status = order.granular_status
-        new_record.order_id = order.id
-        new_record.rts = order.is_rts
+        new_record.status = status
+        new_record.granular_status = granular_status
+        new_record.order_id = order_id
+        new_record.rts = is_rts
 
         is_updated, existing_record, _ = check_record_change(
             existing_record=qs_order,
@@ -262,3 +269,33 @@ def update_shopee_order_info_form_opv2():
         logger.info(f'Updated {updated_count} Shopee Backlog records.')
     else:
         logger.info('No records to update.')
+
+
+@memory_budget(512, chunk_size=5000)
+def update_shopee_order_info_form_opv2(chunk_size: int = None):
+    """
+    Refresh the OPv2 status of today's Shopee backlog orders.
+
+    Args:
+        chunk_size (int, optional): Search and update the orders by chunks of this size, set by `@memory_budget`
+            when the orders do not fit in its budget. Defaults to None, all at once.
+    """
+    # Initialize Order Service
+    order_service = OrderService(logger=logger)
+    # Get all tracking IDs from the database
+    qs_orders = ShopeeBacklog.objects.filter(
+        Q(shipper_date=timezone.now().date())
+    )
+
+    if not qs_orders.exists():
+        logger.info('No orders found for the provided tracking IDs.')
+        return
+
+    tracking_ids = list(qs_orders.values_list('tracking_id', flat=True))
+
+    if chunk_size is None:
+        __update_shopee_orders(order_service, qs_orders, tracking_ids)
+        return
+
+    for chunk in chunk_list(tracking_ids, chunk_size):
+        __update_shopee_orders(order_service, qs_orders.filter(tracking_id__in=chunk), chunk)
@@ -30,44 +30,58 @@ def collect_extend_sla(file_name: str = None):
         logger.warning(f'No file found with name: {file_name}')
         return
 
-    # Read file csv
-    file_content = gdrive_service.csv_get_all_records(files[0].file_id)
+    # Stream the csv, only the used columns, the dates are kept as strings for parse_datetime
+    columns = {
+        'tracking_id': 'string',
+        'shopee_extension_days': 'int64',
+        'shopee_sla_date': 'string',
+        'shopee_breach_sla_date': 'string',
+        'shopee_1st_sla_expectation': 'string',
+        'shopee_breach_sla_expectation': 'string',
+    }
+    batches = gdrive_service.csv_stream_batches(files[0].file_id, columns=list(columns), dtypes=columns)
 
-    tracking_ids = file_content['tracking_id'].tolist()
-
-    # Get existing tracking IDs
-    existing_tracking_ids = ExtendSLATracking.objects.filter(tracking_id__in=tracking_ids).values_list('tracking_id', flat=True)
+    total_records = 0
+    success_records = 0
+    for batch in batches:
+        file_content = batch.to_pandas()
+        total_records += len(file_content)
 
-    new_records = []
-    for index, row in file_content.iterrows():
-        # Skip existing tracking IDs
-        tracking_id = row['tracking_id']
-        if tracking_id in existing_tracking_ids:
-            continue
-        try:
-            new_records.append(ExtendSLATracking(
-                tracking_id=row['tracking_id'],
-                extend_days=row['shopee_extension_days'],
-                sla_date=parse_datetime(row['shopee_sla_date']),
-                breach_sla_date=parse_datetime(row['shopee_breach_sla_date']),
-                first_sla_expectation=parse_datetime(row['shopee_1st_sla_expectation']),
-                breach_sla_expectation=parse_datetime(row['shopee_breach_sla_expectation']),
-            ))
-        except Exception as e:
-            logger.error(f'Error processing row {index}|{tracking_id}: {e}')
-            continue
+        tracking_ids = file_content['tracking_id'].tolist()
 
-    # Bulk create new records
-    total_records = len(file_content)
-    success_records = 0
-    for chunk in chunk_list(new_records, 1000):
-        created_records = bulk_create_with_history(
-            chunk,
-            ExtendSLATracking,
-            ignore_conflicts=True,
-            batch_size=1000
+        # Get existing tracking IDs
+        existing_tracking_ids = set(
+            ExtendSLATracking.objects.filter(tracking_id__in=tracking_ids).values_list('tracking_id', flat=True)
         )
-        success_records += len(created_records)
-        logger.info(f'Inserted {len(created_records)} new Extend SLA records.')
+
+        new_records = []
+        for row in file_content.itertuples():
+            # Skip existing tracking IDs
+            tracking_id = row.tracking_id
+            if tracking_id in existing_tracking_ids:
+                continue
+            try:
+                new_records.append(ExtendSLATracking(
+                    tracking_id=tracking_id,
+                    extend_days=row.shopee_extension_days,
+                    sla_date=parse_datetime(row.shopee_sla_date),
+                    breach_sla_date=parse_datetime(row.shopee_breach_sla_date),
+                    first_sla_expectation=parse_datetime(row.shopee_1st_sla_expectation),
+                    breach_sla_expectation=parse_datetime(row.shopee_breach_sla_expectation),
+                ))
+            except Exception as e:
+                logger.error(f'Error processing row {row.Index}|{tracking_id}: {e}')
+                continue
+
+        # Bulk create new records
+        for chunk in chunk_list(new_records, 1000):
+            created_records = bulk_create_with_history(
+                chunk,
+                ExtendSLATracking,
+                ignore_conflicts=True,
+                batch_size=1000
+            )
+            success_records += len(created_records)
+            logger.info(f'Inserted {len(created_records)} new Extend SLA records.')
 
     logger.info(f'Inserted {success_records}/{total_records} new Extend SLA records.')
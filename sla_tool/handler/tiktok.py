@@ -5,6 +5,7 @@ from django.db.models import Q
 from django.utils import timezone
 from simple_history.utils import bulk_create_with_history, bulk_update_with_history
 
+from core.base.memory import check_memory_budget, memory_budget
 from google_wrapper.services import GoogleSheetService
 from google_wrapper.utils import get_service_account
 from opv2.services import OrderService
@@ -77,21 +78,7 @@ def collect_tiktok_backlogs():
     logger.info(f"Successfully add new {success_count}/{total_records} records.")
 
 
-def update_tiktok_order_info_form_opv2(date: timezone.datetime):
-    # Initialize Order Service
-    order_service = OrderService(logger=logger)
-
-    # Get all tracking IDs from the database
-    qs_orders = TiktokBacklog.objects.filter(
-        Q(extended_date=date)
-    )
-
-    if not qs_orders.exists():
-        logger.info('No orders found for the provided tracking IDs.')
-        return
-
-    tracking_ids = qs_orders.values_list('tracking_id', flat=True)
-
+def __update_tiktok_orders(order_service: OrderService, qs_orders, tracking_ids):
     # Search for orders based on the tracking IDs
     status_code, orders = order_service.search_all(tracking_ids)
 
@@ -99,12 +86,22 @@ def update_tiktok_order_info_form_opv2(date: timezone.datetime):
         logger.warning('No orders found for the provided tracking IDs.')
         return
 
+    if status_code != 200:
+        logger.error(f'Failed to search orders on OPv2 with status code {status_code}.')
+        return
+
+    # The search results are the bulk of the memory, checked before anything is written
+    check_memory_budget()
+
     order_has_changed = []
     # Update the orders in the database
     for qs_order in qs_orders:
 
         tracking_id = qs_order.tracking_id
         order = orders.get(tracking_id)
+        if order is None:
+            logger.warning(f'Order {tracking_id} not found on OPv2.')
+            continue
         new_record = copy.deepcopy(qs_order)
         new_record.status = order.status
         new_record.granular_status = order.granular_status
@@ -133,3 +130,35 @@ def update_tiktok_order_info_form_opv2(date: timezone.datetime):
         logger.info(f'Updated {updated_count} Tiktok Backlog records.')
     else:
         logger.info('No records to update.')
+
+
+@memory_budget(512, chunk_size=5000)
+def update_tiktok_order_info_form_opv2(date: timezone.datetime, chunk_size: int = None):
+    """
+    Refresh the OPv2 status of the TikTok backlog orders extended to a date.
+
+    Args:
+        date (timezone.datetime): The extended date of the orders.
+        chunk_size (int, optional): Search and update the orders by chunks of this size, set by `@memory_budget`
+            when the orders do not fit in its budget. Defaults to None, all at once.
+    """
+    # Initialize Order Service
+    order_service = OrderService(logger=logger)
+
+    # Get all tracking IDs from the database
+    qs_orders = TiktokBacklog.objects.filter(
+        Q(extended_date=date)
+    )
+
+    if not qs_orders.exists():
+        logger.info('No orders found for the provided tracking IDs.')
+        return
+
+    tracking_ids = list(qs_orders.values_list('tracking_id', flat=True))
+
+    if chunk_size is None:
+        __update_tiktok_orders(order_service, qs_orders, tracking_ids)
+        return
+
+    for chunk in chunk_list(tracking_ids, chunk_size):
+        __update_tiktok_orders(order_service, qs_orders.filter(tracking_id__in=chunk), chunk)
@@ -10,7 +10,7 @@ from django_celery_beat.models import (
 from django_celery_beat.models import PeriodicTask
 
 from core.base.admin import BaseAdmin
-from .models import ExtendedPeriodicTask, User, Holiday, Config
+from .models import ExtendedPeriodicTask, User, Holiday, Config, TaskSummary, TaskMemory
 
 
 class STOsPlatformAdminSite(admin.AdminSite):
@@ -177,3 +177,55 @@ class ConfigAdmin(BaseAdmin):
 
 stos_platform_admin.register(Config, ConfigAdmin)
 # endregion
+
+
+# region TaskSummary
+class TaskSummaryAdmin(admin.ModelAdmin):
+    """Read-only admin of the task run summaries."""
+    list_display = ('task_name', 'status', 'duration', 'error', 'worker', 'date_done')
+    list_filter = ('status', 'task_name', 'date_done')
+    search_fields = ('task_id', 'task_name', 'error', 'error_message')
+    date_hierarchy = 'date_done'
+    ordering = ['-date_done']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+stos_platform_admin.register(TaskSummary, TaskSummaryAdmin)
+# endregion
+
+
+# region TaskMemory
+class TaskMemoryAdmin(admin.ModelAdmin):
+    """Read-only admin of the task runs over the memory thresholds."""
+    list_display = ('task_name', 'peak_rss_mb', 'growth_mb', 'retained_mb', 'worker', 'date_done')
+    list_filter = ('task_name', 'date_done')
+    search_fields = ('task_id', 'task_name')
+    date_hierarchy = 'date_done'
+    ordering = ['-date_done']
+
+    @admin.display(description='Peak RSS (MB)', ordering='peak_rss')
+    def peak_rss_mb(self, obj):
+        return obj.peak_rss // (1024 * 1024)
+
+    @admin.display(description='Growth (MB)')
+    def growth_mb(self, obj):
+        return (obj.peak_rss - obj.rss_before) // (1024 * 1024)
+
+    @admin.display(description='Retained (MB)')
+    def retained_mb(self, obj):
+        return (obj.rss_after - obj.rss_before) // (1024 * 1024)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+stos_platform_admin.register(TaskMemory, TaskMemoryAdmin)
+# endregion
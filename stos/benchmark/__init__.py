@@ -0,0 +1,2 @@
+from .runner import Result, Scenario, find_regressions, get_scenarios, run, scenario
+from .stub_server import StubConfig, StubServer
@@ -0,0 +1,183 @@
+import json
+import logging
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from django.db import transaction
+from django.test.utils import override_settings
+
+from .stub_server import StubConfig, StubServer
+
+logger = logging.getLogger(__name__)
+
+# Cache of the benchmark runs, tokens and snapshots of the handlers never reach the shared Redis cache
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}}
+
+
+@dataclass
+class Scenario:
+    """
+    A benchmarked hot path.
+
+    Attributes:
+        name (str): The unique name of the scenario.
+        func (Callable[[int], int]): Runs the hot path once for a size, returns the number of items processed.
+        size (int): The size given to the function, e.g. the number of tracking ids.
+        iterations (int): Number of timed runs.
+        setup (Callable[[int], None], optional): Untimed preparation before each run, e.g. creating rows.
+    """
+    name: str
+    func: Callable[[int], int]
+    size: int
+    iterations: int = 5
+    setup: Optional[Callable[[int], None]] = None
+
+
+@dataclass
+class Result:
+    name: str
+    iterations: int
+    items: int
+    seconds: float
+    throughput: float
+    p50: float
+    p99: float
+    peak_memory_mb: float
+    requests: int
+
+
+_scenarios: Dict[str, Scenario] = {}
+
+
+def scenario(name: str, size: int, iterations: int = 5, setup: Callable[[int], None] = None):
+    """
+    Decorator registering a benchmark scenario.
+    """
+
+    def decorator(func: Callable[[int], int]):
+        _scenarios[name] = Scenario(name=name, func=func, size=size, iterations=iterations, setup=setup)
+        return func
+
+    return decorator
+
+
+def get_scenarios(names: List[str] = None) -> List[Scenario]:
+    """
+    Get the registered scenarios, all of them by default.
+
+    Raises:
+        KeyError: If a name is not a registered scenario.
+    """
+    from . import scenarios  # noqa: F401, registers the scenarios
+
+    if not names:
+        return list(_scenarios.values())
+
+    unknown = set(names) - set(_scenarios)
+    if unknown:
+        raise KeyError(f"Unknown scenarios {sorted(unknown)}, available: {sorted(_scenarios)}")
+    return [_scenarios[name] for name in names]
+
+
+def run_scenario(bench: Scenario, server: StubServer) -> Result:
+    """
+    Run a scenario against the stub server, in a transaction rolled back at the end.
+    """
+    latencies = []
+    items = 0
+    requests_before = server.requests
+    with transaction.atomic():
+        tracemalloc.start()
+        try:
+            for _ in range(bench.iterations):
+                if bench.setup:
+                    bench.setup(bench.size)
+
+                started_at = time.perf_counter()
+                items += bench.func(bench.size)
+                latencies.append(time.perf_counter() - started_at)
+
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            transaction.set_rollback(True)
+
+    seconds = sum(latencies)
+    return Result(
+        name=bench.name,
+        iterations=bench.iterations,
+        items=items,
+        seconds=round(seconds, 4),
+        throughput=round(items / seconds, 2) if seconds else 0.0,
+        p50=round(float(np.percentile(latencies, 50)), 4),
+        p99=round(float(np.percentile(latencies, 99)), 4),
+        peak_memory_mb=round(peak / 1024 / 1024, 2),
+        requests=server.requests - requests_before,
+    )
+
+
+def run(names: List[str] = None, config: StubConfig = None) -> List[Result]:
+    """
+    Run the scenarios against a local stub server.
+
+    Args:
+        names (List[str], optional): The scenarios to run. Defaults to all.
+        config (StubConfig, optional): The latency, error rate and payload sizes of the stub. Defaults to none.
+
+    Returns:
+        List[Result]: The result of each scenario.
+    """
+    from .scenarios import seed_tokens
+
+    results = []
+    with override_settings(CACHES=BENCHMARK_CACHES), StubServer(config) as server, server.redirect():
+        seed_tokens()
+        for bench in get_scenarios(names):
+            logger.info(f"Running benchmark {bench.name}: size {bench.size}, {bench.iterations} iterations")
+            results.append(run_scenario(bench, server))
+    return results
+
+
+def load_baseline(path: Path) -> Dict[str, dict]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(path: Path, results: List[Result]):
+    """
+    Store the results as the baseline, keeping the baselines of the scenarios not run.
+    """
+    baseline = load_baseline(path)
+    baseline.update({result.name: asdict(result) for result in results})
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+
+
+def find_regressions(results: List[Result], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """
+    Compare the results to the baseline.
+
+    Args:
+        results (List[Result]): The results of the run.
+        baseline (Dict[str, dict]): The baseline results by scenario.
+        tolerance (float): Allowed relative degradation, e.g. 0.2 for 20%.
+
+    Returns:
+        List[str]: A description of each regression.
+    """
+    regressions = []
+    for result in results:
+        reference = baseline.get(result.name)
+        if not reference:
+            continue
+
+        if result.throughput < reference['throughput'] * (1 - tolerance):
+            regressions.append(f"{result.name}: throughput {result.throughput}/s < baseline {reference['throughput']}/s")
+        for metric in ('p50', 'p99', 'peak_memory_mb'):
+            if getattr(result, metric) > reference[metric] * (1 + tolerance):
+                regressions.append(f"{result.name}: {metric} {getattr(result, metric)} > baseline {reference[metric]}")
+    return regressions
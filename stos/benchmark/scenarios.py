@@ -0,0 +1,105 @@
+from functools import lru_cache
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.core.cache import cache
+from django.utils import timezone
+
+from google_wrapper.models import ServiceAccount
+from google_wrapper.services import GoogleSheetService
+from opv2.base.service import TokenManager, WMSTokenManager
+from opv2.services import OrderService, RouteService, TicketService, WMSService
+from pre_success.handler.collect_data import load_order_info
+from pre_success.models import Order
+from redash.client import RedashClient
+from .runner import scenario
+
+
+def seed_tokens():
+    """
+    Put stub tokens in the benchmark cache, so the token managers do not fetch the real ones.
+    """
+    cache.set(TokenManager.TOKEN_CACHE_KEY, 'stub-token', timeout=TokenManager.TOKEN_CACHE_TIMEOUT)
+    cache.set(WMSTokenManager.TOKEN_CACHE_KEY, 'stub-token', timeout=WMSTokenManager.TOKEN_CACHE_TIMEOUT)
+
+
+def _tracking_ids(size: int):
+    return [f'BENCH{index:07d}' for index in range(1, size + 1)]
+
+
+@lru_cache(maxsize=None)
+def _service_account() -> ServiceAccount:
+    """
+    An unsaved service account with a throwaway key, the stub issues the access tokens.
+    """
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    account = ServiceAccount(
+        name='benchmark',
+        project_id='benchmark',
+        private_key_id='benchmark',
+        client_email='benchmark@benchmark.iam.gserviceaccount.com',
+        client_id='1',
+    )
+    account.private_key = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    return account
+
+
+@scenario('order_search', size=5000)
+def order_search(size: int) -> int:
+    stt_code, orders = OrderService().search_all(_tracking_ids(size))
+    return len(orders)
+
+
+def _create_orders(size: int):
+    Order.all_objects.filter(tracking_id__startswith='BENCH').delete()
+    Order.objects.bulk_create([
+        Order(tracking_id=tracking_id, project_call='Benchmark', shipper_group='Shopee')
+        for tracking_id in _tracking_ids(size)
+    ], batch_size=1000)
+
+
+@scenario('load_order_info', size=2000, iterations=3, setup=_create_orders)
+def load_orders(size: int) -> int:
+    load_order_info()
+    return Order.objects.filter(created_date__date=timezone.now().date(), granular_status__isnull=False).count()
+
+
+@scenario('ticket_search', size=3000)
+def ticket_search(size: int) -> int:
+    stt_code, tickets = TicketService().get_ticket_by_tracking_ids(_tracking_ids(size))
+    return len(tickets)
+
+
+@scenario('route_manifest', size=20)
+def route_manifest(size: int) -> int:
+    route_service = RouteService()
+    waypoints = 0
+    for route_id in range(1, size + 1):
+        stt_code, result = route_service.get_manifest(route_id)
+        waypoints += len(result.get('data', []))
+    return waypoints
+
+
+@scenario('wms_pick', size=200)
+def wms_pick(size: int) -> int:
+    stt_code, result = WMSService().pick_orders(_tracking_ids(size))
+    return len(result['success'])
+
+
+@scenario('redash_fresh_result', size=1, iterations=3)
+def redash_fresh_result(size: int) -> int:
+    client = RedashClient(api_key='stub')
+    return sum(len(client.fresh_query_result(query_id)) for query_id in range(1, size + 1))
+
+
+@scenario('sheet_records', size=1)
+def sheet_records(size: int) -> int:
+    service_account = _service_account()
+    records = 0
+    for _ in range(size):
+        records += len(GoogleSheetService(service_account, spreadsheet_id='benchmark').get_all_records(0))
+    return records
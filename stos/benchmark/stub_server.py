@@ -0,0 +1,333 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+from graphql import build_schema, introspection_from_schema
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Hosts of the integrations served by the stub
+STUB_HOSTS = (
+    'walrus.ninjavan.co',
+    'api.ninjavan.co',
+    'redash-vn.ninjavan.co',
+    'sheets.googleapis.com',
+    'oauth2.googleapis.com',
+    'www.googleapis.com',
+)
+
+# Schema of the OPv2 order GraphQL endpoint, as much as the handlers query
+ORDER_GRAPHQL_SCHEMA = build_schema("""
+    type Waypoint { id: Int }
+    type Delivery { waypoint: Waypoint }
+    type Order {
+        trackingId: String
+        id: Int
+        status: String
+        granularStatus: String
+        isRts: Boolean
+        lastDelivery: Delivery
+    }
+    type OrderResult { order: Order }
+    type Query {
+        listOrders(tracking_or_stamp_ids: [String!]!, offset: Int!): [OrderResult]
+    }
+""")
+
+GRANULAR_STATUSES = ['Arrived at Sorting Hub', 'On Vehicle for Delivery', 'En-route to Sorting Hub', 'Pending Reschedule']
+
+
+@dataclass
+class StubConfig:
+    """
+    Behaviour of the stub server.
+
+    Attributes:
+        latency (float): Seconds added to every response.
+        jitter (float): Random extra seconds, up to this value, added to every response.
+        error_rate (float): Fraction of the requests answered with a 503.
+        rows (int): Number of rows of the Redash results and of the sheets.
+        columns (int): Number of columns of the sheets.
+        seed (int): Seed of the random errors and jitter, for repeatable runs.
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rows: int = 1000
+    columns: int = 10
+    seed: int = 42
+
+
+Route = Tuple[str, re.Pattern, Callable]
+
+
+class StubServer:
+    """
+    Local HTTP stand-in for the OPv2, WMS, Redash and Google Sheets endpoints used by the handlers.
+
+    The payloads are generated from the request, e.g. the order search answers one order per
+    searched tracking id, so the real services and handlers run unchanged against it.
+
+    Example:
+        with StubServer(StubConfig(latency=0.05)) as server, server.redirect():
+            OrderService().search_all(tracking_ids)
+    """
+
+    def __init__(self, config: StubConfig = None):
+        self.config = config or StubConfig()
+        self.requests = 0
+        self.__random = random.Random(self.config.seed)
+        self.__lock = threading.Lock()
+        self.__server: Optional[ThreadingHTTPServer] = None
+        self.__routes: List[Route] = [
+            ('GET', re.compile(r'^/vn/aaa/1\.0/external/userscopes$'), self._user_scopes),
+            ('POST', re.compile(r'^/vn/order-search/search$'), self._order_search),
+            ('POST', re.compile(r'^/vn/core/graphql/order$'), self._order_graphql),
+            ('POST', re.compile(r'^/vn/ticketing/2\.0/tickets/search$'), self._ticket_search),
+            ('GET', re.compile(r'^/vn/route-v2/routes/(?P<route_id>\d+)/waypoints$'), self._route_waypoints),
+            ('PUT', re.compile(r'^/vn/route-v2/routes/(?P<route_id>\d+)/details$'), self._route_details),
+            ('POST', re.compile(r'^/global/wms/parcels/pick$'), self._wms_pick),
+            ('GET', re.compile(r'^/api/session$'), self._redash_session),
+            ('POST', re.compile(r'^/api/queries/(?P<query_id>\d+)/results$'), self._redash_refresh),
+            ('GET', re.compile(r'^/api/jobs/(?P<job_id>[\w-]+)$'), self._redash_job),
+            ('GET', re.compile(r'^/api/query_results/(?P<result_id>\d+)\.json$'), self._redash_result),
+            ('POST', re.compile(r'^/token$'), self._oauth_token),
+            ('GET', re.compile(r'^/v4/spreadsheets/(?P<spreadsheet_id>[\w-]+)$'), self._sheet_metadata),
+            ('GET', re.compile(r'^/v4/spreadsheets/(?P<spreadsheet_id>[\w-]+)/values/(?P<value_range>[^/]+)$'), self._sheet_values),
+        ]
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self, port: int = 0):
+        """
+        Serve on a local port, a free one by default.
+        """
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, without Nagle each response is not held back by delayed ACKs
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                return
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, response = stub.dispatch(self.command, self.path, body)
+
+                content = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        self.__server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.__server.daemon_threads = True
+        threading.Thread(target=self.__server.serve_forever, name='stub-server', daemon=True).start()
+        logger.info(f"Stub server listening on {self.url}")
+
+    def stop(self):
+        if self.__server:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    @contextmanager
+    def redirect(self, hosts: Iterable[str] = STUB_HOSTS):
+        """
+        Send the requests of every requests session to the integration hosts to the stub instead.
+
+        The whole client stack (sessions, headers, retries, JSON handling) runs as in production,
+        only the connection goes to the local server.
+        """
+        hosts = set(hosts)
+        stub = urlsplit(self.url)
+        send = HTTPAdapter.send
+
+        def redirected_send(adapter, request, **kwargs):
+            parts = urlsplit(request.url)
+            if parts.hostname in hosts:
+                request.url = urlunsplit((stub.scheme, stub.netloc, parts.path, parts.query, ''))
+            return send(adapter, request, **kwargs)
+
+        HTTPAdapter.send = redirected_send
+        try:
+            yield self
+        finally:
+            HTTPAdapter.send = send
+
+    def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, object]:
+        """
+        Answer a request, after the configured latency and with the configured error rate.
+        """
+        with self.__lock:
+            self.requests += 1
+            delay = self.config.latency + self.__random.uniform(0, self.config.jitter)
+            failed = self.__random.random() < self.config.error_rate
+
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return 503, {'error': 'Injected error'}
+
+        parts = urlsplit(path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            # Form bodies, e.g. the OAuth token request
+            payload = None
+        for route_method, pattern, handler in self.__routes:
+            match = pattern.match(parts.path)
+            if route_method == method and match:
+                return handler(payload=payload, query=query, **match.groupdict())
+
+        logger.warning(f"Stub server has no route for {method} {path}")
+        return 404, {'error': f'No route for {method} {parts.path}'}
+
+    # region OPv2
+    def _user_scopes(self, payload, query, **kwargs):
+        return 200, {'scopes': ['ALL']}
+
+    @staticmethod
+    def _order(index: int, tracking_id: str) -> dict:
+        return {
+            'id': index,
+            'tracking_id': tracking_id,
+            'granular_status': GRANULAR_STATUSES[index % len(GRANULAR_STATUSES)],
+            'status': 'Transit',
+            'global_shipper_id': 7512979,
+            'type': 'Normal',
+            'is_rts': False,
+            'to_address1': f'{index} Nguyen Van Linh',
+            'to_address2': 'Phuong Tan Phong',
+            'to_state': 'Ho Chi Minh',
+            'to_city': 'Quan 7',
+            'to_district': 'Tan Phong',
+        }
+
+    def _order_search(self, payload, query, **kwargs):
+        values = payload['search_filters'][0]['values']
+        size = int(query.get('size') or 1000)
+        start = int(query.get('search_after') or 0)
+        page = [{'order': self._order(index + 1, value)} for index, value in enumerate(values[start:start + size], start)]
+        return 200, {'search_data': page, 'total': len(values)}
+
+    def _order_graphql(self, payload, query, **kwargs):
+        if '__schema' in payload.get('query', ''):
+            return 200, {'data': introspection_from_schema(ORDER_GRAPHQL_SCHEMA)}
+
+        tracking_ids = payload['variables']['trackingOrStampIds']
+        orders = []
+        for tracking_id in tracking_ids:
+            index = int(re.sub(r'\D', '', tracking_id) or 0)
+            orders.append({'order': {
+                'trackingId': tracking_id,
+                'id': index,
+                'status': 'Transit',
+                'granularStatus': GRANULAR_STATUSES[index % len(GRANULAR_STATUSES)],
+                'isRts': False,
+                'lastDelivery': {'waypoint': {'id': index}},
+            }})
+        return 200, {'data': {'listOrders': orders}}
+
+    def _ticket_search(self, payload, query, **kwargs):
+        tickets = [
+            {
+                'id': index + 1,
+                'hubId': '1',
+                'createdAt': '2024-10-01T08:00:00Z',
+                'investigatingHubId': 1,
+                'sourceOfEntry': 'RECOVERY SCANNING',
+                'status': 'IN PROGRESS',
+                'ticketTypeId': 1,
+                'subTicketTypeId': None,
+                'trackingId': tracking_id,
+            } for index, tracking_id in enumerate(payload['tracking_ids'])
+        ]
+        return 200, {'data': tickets}
+
+    def _route_waypoints(self, payload, query, route_id, **kwargs):
+        waypoints = [
+            {'id': index, 'seq_no': index, 'status': 'Pending', 'parcels': [{'tracking_id': f'BENCH{route_id}{index:05d}'}]}
+            for index in range(self.config.rows)
+        ]
+        return 200, {'data': waypoints}
+
+    def _route_details(self, payload, query, route_id, **kwargs):
+        return 200, {'data': {'id': int(route_id), **(payload or {})}}
+
+    # endregion
+
+    # region WMS
+    def _wms_pick(self, payload, query, **kwargs):
+        return 200, {'tracking_id': payload['tracking_id'], 'status': 'PICKED'}
+
+    # endregion
+
+    # region Redash
+    def _redash_session(self, payload, query, **kwargs):
+        return 200, {'user': {'id': 1}}
+
+    def _redash_refresh(self, payload, query, query_id, **kwargs):
+        return 200, {'job': {'id': uuid.uuid4().hex, 'status': 1, 'query_result_id': None}}
+
+    def _redash_job(self, payload, query, job_id, **kwargs):
+        return 200, {'job': {'id': job_id, 'status': 3, 'error': '', 'query_result_id': 1}}
+
+    def _redash_result(self, payload, query, result_id, **kwargs):
+        rows = [
+            {'tracking_id': f'BENCH{index:07d}', 'hub_id': index % 100, 'granular_status': GRANULAR_STATUSES[index % len(GRANULAR_STATUSES)]}
+            for index in range(self.config.rows)
+        ]
+        return 200, {'query_result': {'id': int(result_id), 'data': {'rows': rows}}}
+
+    # endregion
+
+    # region Google Sheets
+    def _oauth_token(self, payload, query, **kwargs):
+        return 200, {'access_token': 'stub-token', 'token_type': 'Bearer', 'expires_in': 3600}
+
+    def _sheet_metadata(self, payload, query, spreadsheet_id, **kwargs):
+        return 200, {
+            'spreadsheetId': spreadsheet_id,
+            'properties': {'title': 'Benchmark'},
+            'sheets': [{'properties': {
+                'sheetId': 0,
+                'title': 'Data',
+                'index': 0,
+                'gridProperties': {'rowCount': self.config.rows + 1, 'columnCount': self.config.columns},
+            }}],
+        }
+
+    def _sheet_values(self, payload, query, spreadsheet_id, value_range, **kwargs):
+        header = [f'column_{column}' for column in range(self.config.columns)]
+        values = [[f'{row}-{column}' for column in range(self.config.columns)] for row in range(self.config.rows)]
+        return 200, {'range': value_range, 'majorDimension': 'ROWS', 'values': [header, *values]}
+
+    # endregion
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from stos.benchmark import StubConfig, find_regressions, get_scenarios, run
+from stos.benchmark.runner import load_baseline, save_baseline
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the integration hot paths against a local stub of the OPv2, WMS, Redash and Google Sheets APIs. "
+        "Reports throughput, p50/p99 latency and peak memory, and fails on regressions against the stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help="Scenarios to run, all by default")
+        parser.add_argument('--list', action='store_true', help="List the scenarios and exit")
+        parser.add_argument('--latency', type=float, default=0.01, help="Seconds added to every stub response")
+        parser.add_argument('--jitter', type=float, default=0.0, help="Random extra seconds added to every stub response")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of the stub responses failing with a 503")
+        parser.add_argument('--rows', type=int, default=1000, help="Rows of the Redash results, sheets and route manifests")
+        parser.add_argument('--baseline', type=Path, default=Path(settings.BASE_DIR) / 'benchmark_baseline.json',
+                            help="Baseline file")
+        parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+        parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative degradation before failing")
+
+    def handle(self, *args, **options):
+        try:
+            scenarios = get_scenarios(options['scenarios'])
+        except KeyError as e:
+            raise CommandError(e)
+
+        if options['list']:
+            for bench in scenarios:
+                self.stdout.write(f"{bench.name:<24} size={bench.size:<6} iterations={bench.iterations}")
+            return
+
+        config = StubConfig(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            rows=options['rows'],
+        )
+        results = run([bench.name for bench in scenarios], config)
+
+        self.stdout.write(f"{'scenario':<24}{'items/s':>12}{'p50 (s)':>10}{'p99 (s)':>10}{'peak (MB)':>11}{'requests':>10}")
+        for result in results:
+            self.stdout.write(
+                f"{result.name:<24}{result.throughput:>12}{result.p50:>10}{result.p99:>10}"
+                f"{result.peak_memory_mb:>11}{result.requests:>10}"
+            )
+
+        if options['save_baseline']:
+            save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Saved the baseline to {options['baseline']}"))
+            return
+
+        baseline = load_baseline(options['baseline'])
+        if not baseline:
+            self.stdout.write(self.style.WARNING(f"No baseline at {options['baseline']}, run with --save-baseline to store one"))
+            return
+
+        regressions = find_regressions(results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError("Performance regressions:\n" + "\n".join(regressions))
+
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
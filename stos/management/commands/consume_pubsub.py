@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from google_wrapper.consumer import PubSubConsumer, Route
+from google_wrapper.services import GooglePubSubService
+from google_wrapper.utils import get_service_account
+from stos.utils import configs
+
+
+class Command(BaseCommand):
+    help = (
+        "Consume the Pub/Sub subscriptions of PUBSUB_ROUTES over streaming pulls and start their Celery tasks. "
+        "Set PUBSUB_EMULATOR_HOST to consume from the local Pub/Sub emulator."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('subscriptions', nargs='*', help="Subscriptions to consume, all routes by default")
+        parser.add_argument('--max-messages', type=int, default=settings.PUBSUB_MAX_MESSAGES,
+                            help="Maximum outstanding messages per subscription")
+        parser.add_argument('--max-bytes', type=int, default=settings.PUBSUB_MAX_BYTES,
+                            help="Maximum outstanding bytes per subscription")
+        parser.add_argument('--ack-deadline', type=int, default=settings.PUBSUB_ACK_DEADLINE,
+                            help="Seconds a message is leased before redelivery")
+        parser.add_argument('--service-account', help="Private key id of the service account, GSA_SYSTEM by default")
+        parser.add_argument('--create-subscriptions', action='store_true',
+                            help="Create the missing topics and subscriptions first, e.g. on the emulator")
+        parser.add_argument('--timeout', type=float, help="Seconds to consume before exiting, forever by default")
+
+    def handle(self, *args, **options):
+        routes = [Route(**route) for route in settings.PUBSUB_ROUTES]
+        if options['subscriptions']:
+            unknown = set(options['subscriptions']) - {route.subscription for route in routes}
+            if unknown:
+                raise CommandError(f"Unknown subscriptions {sorted(unknown)}")
+            routes = [route for route in routes if route.subscription in options['subscriptions']]
+
+        service_account = get_service_account(options['service_account'] or configs.get('GSA_SYSTEM'))
+        consumer = PubSubConsumer(
+            service=GooglePubSubService(service_account),
+            routes=routes,
+            max_messages=options['max_messages'],
+            max_bytes=options['max_bytes'],
+            ack_deadline=options['ack_deadline'],
+        )
+        if options['create_subscriptions']:
+            consumer.create_subscriptions()
+
+        self.stdout.write(f"Consuming {', '.join(route.subscription for route in routes)}")
+        consumer.run(timeout=options['timeout'])
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:21
+
+import django.db.models.deletion
+import simple_history.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+                ('delete_at', models.DateTimeField(null=True)),
+                ('tool', models.CharField(help_text='The tool the rollup belongs to.', max_length=255)),
+                ('report_date', models.DateField(help_text='The day the metrics are aggregated on.')),
+                ('metrics', models.JSONField(default=dict, help_text='The pre-aggregated metrics of the day.')),
+            ],
+            options={
+                'verbose_name': 'Daily Rollup',
+                'verbose_name_plural': 'Daily Rollups',
+                'unique_together': {('tool', 'report_date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricalDailyRollup',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('created_date', models.DateTimeField(blank=True, editable=False)),
+                ('updated_date', models.DateTimeField(blank=True, editable=False)),
+                ('delete_at', models.DateTimeField(null=True)),
+                ('tool', models.CharField(help_text='The tool the rollup belongs to.', max_length=255)),
+                ('report_date', models.DateField(help_text='The day the metrics are aggregated on.')),
+                ('metrics', models.JSONField(default=dict, help_text='The pre-aggregated metrics of the day.')),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Daily Rollup',
+                'verbose_name_plural': 'historical Daily Rollups',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-19 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stos', '0002_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(help_text='The id of the task run.', max_length=255)),
+                ('task_name', models.CharField(help_text='The name of the task.', max_length=255)),
+                ('status', models.CharField(help_text='The final state of the run, e.g. SUCCESS or FAILURE.', max_length=50)),
+                ('worker', models.CharField(blank=True, help_text='The worker which ran the task.', max_length=255, null=True)),
+                ('duration', models.FloatField(blank=True, help_text='The run time in seconds.', null=True)),
+                ('error', models.CharField(blank=True, help_text='The exception class of a failed run.', max_length=255, null=True)),
+                ('error_message', models.CharField(blank=True, help_text='The truncated exception message.', max_length=1000, null=True)),
+                ('date_done', models.DateTimeField(help_text='When the run finished.')),
+            ],
+            options={
+                'verbose_name': 'Task Summary',
+                'verbose_name_plural': 'Task Summaries',
+                'indexes': [models.Index(fields=['date_done'], name='stos_tasksu_date_do_f66771_idx'), models.Index(fields=['task_name', 'date_done'], name='stos_tasksu_task_na_68ce30_idx'), models.Index(fields=['status', 'date_done'], name='stos_tasksu_status_199d7c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stos', '0003_task_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskMemory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(help_text='The id of the task run.', max_length=255)),
+                ('task_name', models.CharField(help_text='The name of the task.', max_length=255)),
+                ('worker', models.CharField(blank=True, help_text='The worker which ran the task.', max_length=255, null=True)),
+                ('rss_before', models.BigIntegerField(help_text='The RSS of the pool process at the start of the run, in bytes.')),
+                ('rss_after', models.BigIntegerField(help_text='The RSS of the pool process at the end of the run, in bytes.')),
+                ('peak_rss', models.BigIntegerField(help_text='The peak RSS of the pool process during the run, in bytes.')),
+                ('top_allocations', models.JSONField(blank=True, help_text='The top tracemalloc allocation sites, recorded on the runs following a crossed threshold.', null=True)),
+                ('date_done', models.DateTimeField(help_text='When the run finished.')),
+            ],
+            options={
+                'verbose_name': 'Task Memory',
+                'verbose_name_plural': 'Task Memory',
+                'indexes': [models.Index(fields=['date_done'], name='stos_taskme_date_do_178231_idx'), models.Index(fields=['task_name', 'date_done'], name='stos_taskme_task_na_819bc4_idx')],
+            },
+        ),
+    ]
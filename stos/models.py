@@ -61,3 +61,71 @@ class Holiday(BaseModel):
         indexes = [
             models.Index(fields=['date']),
         ]
+
+
+class DailyRollup(BaseModel):
+    tool = models.CharField(max_length=255, help_text="The tool the rollup belongs to.")
+    report_date = models.DateField(help_text="The day the metrics are aggregated on.")
+    metrics = models.JSONField(default=dict, help_text="The pre-aggregated metrics of the day.")
+
+    def __str__(self):
+        return f"{self.tool} ({self.report_date})"
+
+    class Meta:
+        verbose_name = 'Daily Rollup'
+        verbose_name_plural = 'Daily Rollups'
+        unique_together = ('tool', 'report_date')
+
+
+class TaskSummary(models.Model):
+    """
+    Compact outcome of a Celery task run, the full results only live in Redis for their TTL.
+    """
+    task_id = models.CharField(max_length=255, help_text="The id of the task run.")
+    task_name = models.CharField(max_length=255, help_text="The name of the task.")
+    status = models.CharField(max_length=50, help_text="The final state of the run, e.g. SUCCESS or FAILURE.")
+    worker = models.CharField(max_length=255, null=True, blank=True, help_text="The worker which ran the task.")
+    duration = models.FloatField(null=True, blank=True, help_text="The run time in seconds.")
+    error = models.CharField(max_length=255, null=True, blank=True, help_text="The exception class of a failed run.")
+    error_message = models.CharField(max_length=1000, null=True, blank=True, help_text="The truncated exception message.")
+    date_done = models.DateTimeField(help_text="When the run finished.")
+
+    def __str__(self):
+        return f"{self.task_name} {self.status} ({self.task_id})"
+
+    class Meta:
+        verbose_name = 'Task Summary'
+        verbose_name_plural = 'Task Summaries'
+        indexes = [
+            models.Index(fields=['date_done']),
+            models.Index(fields=['task_name', 'date_done']),
+            models.Index(fields=['status', 'date_done']),
+        ]
+
+
+class TaskMemory(models.Model):
+    """
+    Memory usage of a Celery task run which crossed the peak RSS or RSS growth threshold.
+    """
+    task_id = models.CharField(max_length=255, help_text="The id of the task run.")
+    task_name = models.CharField(max_length=255, help_text="The name of the task.")
+    worker = models.CharField(max_length=255, null=True, blank=True, help_text="The worker which ran the task.")
+    rss_before = models.BigIntegerField(help_text="The RSS of the pool process at the start of the run, in bytes.")
+    rss_after = models.BigIntegerField(help_text="The RSS of the pool process at the end of the run, in bytes.")
+    peak_rss = models.BigIntegerField(help_text="The peak RSS of the pool process during the run, in bytes.")
+    top_allocations = models.JSONField(
+        null=True, blank=True,
+        help_text="The top tracemalloc allocation sites, recorded on the runs following a crossed threshold."
+    )
+    date_done = models.DateTimeField(help_text="When the run finished.")
+
+    def __str__(self):
+        return f"{self.task_name} {self.peak_rss // (1024 * 1024)} MB ({self.task_id})"
+
+    class Meta:
+        verbose_name = 'Task Memory'
+        verbose_name_plural = 'Task Memory'
+        indexes = [
+            models.Index(fields=['date_done']),
+            models.Index(fields=['task_name', 'date_done']),
+        ]
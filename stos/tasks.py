@@ -0,0 +1,13 @@
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from core.base.task import STOsQueueOnce
+from .models import TaskMemory, TaskSummary
+
+
+@shared_task(base=STOsQueueOnce, name='[Background] Purge Task Summaries', once={'graceful': True}, ignore_result=True)
+def purge_task_summaries():
+    cutoff = timezone.now() - timezone.timedelta(days=settings.TASK_SUMMARY_RETENTION_DAYS)
+    TaskSummary.objects.filter(date_done__lt=cutoff).delete()
+    TaskMemory.objects.filter(date_done__lt=cutoff).delete()
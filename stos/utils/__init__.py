@@ -1,8 +1,10 @@
 from .configs import configs
+from .rollups import rollups, day_range
 from .security import encrypt_value, decrypt_value
 from .utils import (
     chunk_dict,
     chunk_list,
+    run_concurrently,
     text_in_text,
     clear_temporary_file,
     parse_datetime,
@@ -11,3 +13,5 @@ from .utils import (
     swap_day_month_if_different,
     create_zns_image
 )
+from .zns import ZNSImageRenderer, get_zns_renderer
+from .bulk_loader import bulk_insert_new
@@ -0,0 +1,132 @@
+import logging
+import uuid
+from typing import List, Tuple, Type
+
+import pandas as pd
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .utils import chunk_list
+
+logger = logging.getLogger(__name__)
+
+
+def _null_safe_equal(left: str, right: str) -> str:
+    if connection.vendor == 'mysql':
+        return f'{left} <=> {right}'
+    if connection.vendor == 'sqlite':
+        return f'{left} IS {right}'
+    return f'{left} IS NOT DISTINCT FROM {right}'
+
+
+def bulk_insert_new(model: Type[models.Model], df: pd.DataFrame, key_fields: List[str], batch_size: int = 5000,
+                    with_history: bool = True, required_fields: List[str] = None) -> List[Tuple]:
+    """
+    Insert the rows of a DataFrame whose natural key is not in the table yet.
+
+    The rows are streamed into a temporary staging table with multi-row inserts, then the new rows are
+    inserted with one INSERT ... SELECT ... WHERE NOT EXISTS on the key, so deduplication is a single
+    indexed anti-join instead of a membership test per row in Python. The key should be indexed.
+    History records are written the same way, with one INSERT ... SELECT.
+
+    Args:
+        model (Type[models.Model]): The model to insert into, a BaseModel.
+        df (pd.DataFrame): The rows, columns named after the model fields. Other columns are ignored.
+        key_fields (List[str]): The fields of the natural key.
+        batch_size (int, optional): Number of rows per staging insert. Defaults to 5000.
+        with_history (bool, optional): Write the history records of the inserted rows. Defaults to True.
+        required_fields (List[str], optional): The key fields which must have a value, rows with an empty one
+            are skipped. The other key fields match empty values too. Defaults to all the key fields.
+
+    Returns:
+        List[Tuple]: The keys of the inserted rows.
+    """
+    concrete_fields = {field.name: field for field in model._meta.concrete_fields}
+    fields = [concrete_fields[column] for column in df.columns if column in concrete_fields and not concrete_fields[column].primary_key]
+    field_names = [field.name for field in fields]
+
+    missing_keys = set(key_fields) - set(field_names)
+    if missing_keys:
+        raise ValueError(f"Key fields {missing_keys} are not columns of the DataFrame")
+
+    required_fields = key_fields if required_fields is None else required_fields
+    if set(required_fields) - set(key_fields):
+        raise ValueError(f"Required fields {set(required_fields) - set(key_fields)} are not key fields")
+
+    # One row per key, rows without a required key value are skipped
+    df = df[field_names].replace({'': None}).dropna(subset=required_fields).drop_duplicates(subset=key_fields)
+    if df.empty:
+        return []
+
+    # Empty values of NOT NULL columns take the field default, e.g. '' for a blank CharField
+    df = df.astype(object).where(df.notna(), None)
+    for field in fields:
+        if not field.null:
+            df[field.name] = df[field.name].where(df[field.name].notna(), field.get_default())
+        # Values as the database expects them, e.g. naive UTC datetimes
+        df[field.name] = df[field.name].map(lambda value, f=field: f.get_db_prep_save(value, connection))
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    staging = qn(f'stg_{model._meta.db_table}_{uuid.uuid4().hex[:8]}')
+    columns = [field.column for field in fields]
+    quoted_columns = ', '.join(qn(column) for column in columns)
+    key_columns = [concrete_fields[name].column for name in key_fields]
+
+    # Empty values of nullable optional keys are NULL, they match each other
+    key_join = ' AND '.join(
+        _null_safe_equal(f't.{qn(field.column)}', f's.{qn(field.column)}')
+        if field.null and field.name not in required_fields else f't.{qn(field.column)} = s.{qn(field.column)}'
+        for field in (concrete_fields[name] for name in key_fields)
+    )
+    key_match = key_join
+    if 'delete_at' in concrete_fields:
+        # Soft-deleted rows do not count as existing, as with the default manager
+        key_match += f' AND t.{qn("delete_at")} IS NULL'
+    new_rows = f'FROM {staging} s WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {key_match})'
+
+    now = timezone.now()
+    db_now = connection.ops.adapt_datetimefield_value(now)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Stage the rows
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {staging} ('
+            + ', '.join(f'{qn(field.column)} {field.db_type(connection)} NULL' for field in fields)
+            + ')'
+        )
+        try:
+            placeholders = ', '.join(['%s'] * len(columns))
+            for chunk in chunk_list(list(df.itertuples(index=False, name=None)), batch_size):
+                cursor.executemany(f'INSERT INTO {staging} ({quoted_columns}) VALUES ({placeholders})', chunk)
+
+            key_select = ', '.join(f's.{qn(column)}' for column in key_columns)
+            cursor.execute(f'SELECT {key_select} {new_rows}')
+            inserted_keys = [tuple(row) for row in cursor.fetchall()]
+
+            if inserted_keys:
+                staged_columns = ', '.join(f's.{qn(column)}' for column in columns)
+                cursor.execute(
+                    f'INSERT INTO {table} ({quoted_columns}, {qn("created_date")}, {qn("updated_date")}) '
+                    f'SELECT {staged_columns}, %s, %s {new_rows}',
+                    [db_now, db_now]
+                )
+
+                if with_history:
+                    # History rows of the inserted rows, the staged keys created at this exact time
+                    history_model = model.history.model
+                    tracked_columns = [
+                        field.column for field in history_model._meta.concrete_fields
+                        if not field.name.startswith('history_')
+                    ]
+                    cursor.execute(
+                        f'INSERT INTO {qn(history_model._meta.db_table)} '
+                        f'({", ".join(qn(column) for column in tracked_columns)}, {qn("history_date")}, {qn("history_type")}) '
+                        f'SELECT {", ".join(f"t.{qn(column)}" for column in tracked_columns)}, %s, %s '
+                        f'FROM {table} t JOIN {staging} s ON {key_join} WHERE t.{qn("created_date")} = %s',
+                        [db_now, '+', db_now]
+                    )
+        finally:
+            cursor.execute(f'DROP TEMPORARY TABLE {staging}' if connection.vendor == 'mysql' else f'DROP TABLE {staging}')
+
+    logger.info(f"Inserted {len(inserted_keys)}/{len(df)} new {model.__name__} records")
+    return inserted_keys
@@ -0,0 +1,76 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Tuple
+
+from django.utils import timezone
+
+from ..models import DailyRollup
+
+logger = logging.getLogger(__name__)
+
+
+def day_range(day: date = None) -> Tuple[datetime, datetime]:
+    """
+    Get the bounds of a day in the current timezone, the days of the rollups, to filter a datetime column with an index-friendly
+    range (created_date__gte=start, created_date__lt=end) instead of created_date__date=day.
+
+    Args:
+        day (date, optional): The day. Defaults to today in the current timezone.
+
+    Returns:
+        Tuple[datetime, datetime]: The start of the day and the start of the next day.
+    """
+    day = day or timezone.localdate()
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+class Rollups:
+    """
+    Per-day, per-tool pre-aggregated metrics.
+
+    A tool registers the function aggregating its metrics of a day and refreshes its rollup after each write
+    to the underlying tables, the aggregation only scans the rows of that day. Reports read the one row.
+    """
+
+    def __init__(self):
+        self.__aggregators: Dict[str, Callable[[date], dict]] = {}
+
+    def register(self, tool: str):
+        """
+        Decorator registering the function aggregating the metrics of a tool for a day.
+        """
+
+        def decorator(func: Callable[[date], dict]):
+            self.__aggregators[tool] = func
+            return func
+
+        return decorator
+
+    def refresh(self, tool: str, day: date = None) -> dict:
+        """
+        Re-aggregate the metrics of a tool for a day and store them.
+        """
+        day = day or timezone.localdate()
+        metrics = self.__aggregators[tool](day)
+
+        # Plain update, the rollup is derived data and does not need a history record per refresh
+        updated = DailyRollup.objects.filter(tool=tool, report_date=day).update(metrics=metrics, updated_date=timezone.now())
+        if not updated:
+            DailyRollup.objects.get_or_create(tool=tool, report_date=day, defaults={'metrics': metrics})
+
+        logger.debug(f"Refreshed {tool} rollup of {day}: {metrics}")
+        return metrics
+
+    def get(self, tool: str, day: date = None) -> dict:
+        """
+        Get the metrics of a tool for a day, aggregated on the first read if the day has no rollup yet.
+        """
+        day = day or timezone.localdate()
+        metrics = DailyRollup.objects.filter(tool=tool, report_date=day).values_list('metrics', flat=True).first()
+        if metrics is None:
+            metrics = self.refresh(tool, day)
+        return metrics
+
+
+rollups = Rollups()
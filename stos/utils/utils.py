@@ -1,17 +1,15 @@
 import os
-import textwrap
 from datetime import datetime
-from io import BytesIO
 from itertools import islice
-from typing import Dict, Optional
+from typing import Dict, Optional, Callable, Iterable
 from typing import List, Any, Generator, Tuple
 from unicodedata import normalize
 
-from PIL import Image, ImageDraw, ImageFont
-from django.conf import settings
 from django.utils import timezone
 
+from core.base.db import DatabaseThreadPoolExecutor
 from core.base.model import BaseModel
+from .zns import get_zns_renderer
 
 
 def chunk_list(input_list: List[Any], chunk_size: int = 1000) -> Generator[List[Any], None, None]:
@@ -64,6 +62,38 @@ def chunk_dict(input_dict: Dict[Any, Any], chunk_size: int = 1000) -> Generator[
         yield chunk
 
 
+def run_concurrently(func: Callable[[Any], Any], items: Iterable[Any], max_workers: int = 10) -> List[Any]:
+    """
+    Applies a function to every item using a thread pool, preserving the input order of the results.
+
+    Intended for I/O-bound work such as HTTP calls. The function may use the database, the connections
+    of the pool threads are recycled after each call and closed with the pool.
+
+    Args:
+        func (Callable[[Any], Any]): The function to apply to each item.
+        items (Iterable[Any]): The items to process.
+        max_workers (int): Maximum number of threads. Defaults to 10.
+
+    Returns:
+        List[Any]: The results of func, in the same order as items.
+
+    Raises:
+        ValueError: If max_workers is less than 1.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be greater than 0")
+
+    items = list(items)
+    if not items:
+        return []
+
+    if len(items) == 1 or max_workers == 1:
+        return [func(item) for item in items]
+
+    with DatabaseThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
 def text_in_text(sub_text: str, main_text: str) -> bool:
     """
     Check if one text is found within another text, case-insensitive and normalized.
@@ -252,6 +282,7 @@ def create_zns_image(data: Dict[str, Any], cell_height: int = 80, header_width:
                      border_color: Tuple[int, int, int, int] = (224, 224, 224, 255)) -> bytes:
     """
     Generates a ZNS image displaying provided field labels and values.
+    The renderer of the options is shared by the process, see ZNSImageRenderer to render in batches.
 
     Args:
         data (Dict[str, Any]): Dictionary of labels and values to display.
@@ -265,53 +296,19 @@ def create_zns_image(data: Dict[str, Any], cell_height: int = 80, header_width:
         border_color (Tuple[int, int, int, int], optional): RGBA color for borders. Defaults to light gray.
 
     Returns:
-        bytes: Binary data of the generated image in JPEG format.
+        bytes: Binary data of the generated image in PNG format.
 
     Raises:
         FileNotFoundError: If font files are not found in the specified directory.
         IOError: If there is an issue creating or saving the image.
     """
-    # Paths to font files
-    font_label_path = os.path.join(settings.BASE_DIR, 'static', 'fonts', 'Roboto-Medium.ttf')
-    font_text_path = os.path.join(settings.BASE_DIR, 'static', 'fonts', 'Roboto-Light.ttf')
-    print(font_label_path)
-    try:
-        font_label = ImageFont.truetype(font_label_path, font_size)
-        font_text = ImageFont.truetype(font_text_path, font_size)
-    except IOError as e:
-        raise FileNotFoundError("Font files not found in the specified directory") from e
-
-    # Calculate image dimensions
-    num_rows = len(data)
-    image_width = header_width + cell_width
-    image_height = cell_height * num_rows
-
-    # Create image and draw object
-    image = Image.new('RGBA', (image_width, image_height), background_color)
-    draw = ImageDraw.Draw(image)
-
-    # Draw borders
-    for i in range(num_rows + 1):
-        y = i * cell_height
-        draw.line([(0, y), (image_width, y)], fill=border_color, width=2)
-    draw.line([(header_width, 0), (header_width, image_height)], fill=border_color, width=2)
-
-    # Draw labels and values
-    for row_index, (label, value) in enumerate(data.items()):
-        # Label position
-        label_x = 10
-        label_y = row_index * cell_height + 10
-        draw.text((label_x, label_y), label, font=font_label, fill=label_color)
-
-        # Value position (wrapped text)
-        value_x = header_width + 10
-        value_y = row_index * cell_height + 10
-        wrapped_text = textwrap.fill(str(value), width=40)
-        draw.text((value_x, value_y), wrapped_text, font=font_text, fill=text_color)
-
-    # Save to binary
-    output = BytesIO()
-    image.save(output, format="PNG")
-    output.seek(0)  # Reset position for reading
-
-    return output.getvalue()
+    return get_zns_renderer(
+        cell_height=cell_height,
+        header_width=header_width,
+        cell_width=cell_width,
+        font_size=font_size,
+        label_color=label_color,
+        text_color=text_color,
+        background_color=background_color,
+        border_color=border_color
+    ).render(data)
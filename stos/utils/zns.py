@@ -0,0 +1,167 @@
+import os
+import textwrap
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, Any, List, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFont
+from django.conf import settings
+
+ZNS_IMAGE_FORMATS = ('PNG', 'JPEG')
+
+
+@lru_cache(maxsize=None)
+def _load_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    """
+    Load a TrueType font once per process.
+
+    Raises:
+        FileNotFoundError: If the font file is not found.
+    """
+    try:
+        return ImageFont.truetype(path, size)
+    except IOError as e:
+        raise FileNotFoundError(f"Font file {path} not found") from e
+
+
+class ZNSImageRenderer:
+    """
+    Renders ZNS images, a two-column table of field labels and values.
+
+    Fonts are loaded once per process and the static part of the image (background, borders and labels)
+    is drawn once per set of labels, each render only draws the values on a copy of that template.
+    """
+
+    def __init__(self, cell_height: int = 80, header_width: int = 260, cell_width: int = 540, font_size: int = 20,
+                 label_color: Tuple[int, int, int, int] = (94, 94, 94, 255),
+                 text_color: Tuple[int, int, int, int] = (0, 0, 0, 255),
+                 background_color: Tuple[int, int, int, int] = (255, 255, 255, 255),
+                 border_color: Tuple[int, int, int, int] = (224, 224, 224, 255),
+                 image_format: str = 'PNG', compress_level: int = 1):
+        """
+        Initialize the renderer and load its fonts.
+
+        Args:
+            cell_height (int, optional): Height of each cell. Defaults to 80.
+            header_width (int, optional): Width of label (header) column. Defaults to 260.
+            cell_width (int, optional): Width of value column. Defaults to 540.
+            font_size (int, optional): Font size for text. Defaults to 20.
+            label_color (Tuple[int, int, int, int], optional): RGBA color for labels. Defaults to gray.
+            text_color (Tuple[int, int, int, int], optional): RGBA color for values. Defaults to black.
+            background_color (Tuple[int, int, int, int], optional): RGBA background color. Defaults to white.
+            border_color (Tuple[int, int, int, int], optional): RGBA color for borders. Defaults to light gray.
+            image_format (str, optional): Format of the encoded images, PNG or JPEG. Defaults to PNG.
+            compress_level (int, optional): PNG compression level, lower encodes faster into bigger files. Defaults to 1.
+
+        Raises:
+            ValueError: If the image format is not supported.
+            FileNotFoundError: If font files are not found in the specified directory.
+        """
+        if image_format not in ZNS_IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format {image_format}, expected one of {ZNS_IMAGE_FORMATS}")
+
+        self.__cell_height = cell_height
+        self.__header_width = header_width
+        self.__cell_width = cell_width
+        self.__label_color = label_color
+        self.__text_color = text_color
+        self.__background_color = background_color
+        self.__border_color = border_color
+        self.__image_format = image_format
+        self.__compress_level = compress_level
+        # Opaque colors do not need an alpha channel, RGB images encode faster
+        colors = (label_color, text_color, background_color, border_color)
+        self.__mode = 'RGBA' if any(len(color) == 4 and color[3] != 255 for color in colors) else 'RGB'
+        self.__templates: Dict[Tuple[str, ...], Image.Image] = {}
+
+        # Paths to font files
+        font_label_path = os.path.join(settings.BASE_DIR, 'static', 'fonts', 'Roboto-Medium.ttf')
+        font_text_path = os.path.join(settings.BASE_DIR, 'static', 'fonts', 'Roboto-Light.ttf')
+        self.__font_label = _load_font(font_label_path, font_size)
+        self.__font_text = _load_font(font_text_path, font_size)
+
+    def __template(self, labels: Tuple[str, ...]) -> Image.Image:
+        """
+        Get the static part of the image for the labels, drawn on the first use.
+        """
+        template = self.__templates.get(labels)
+        if template is not None:
+            return template
+
+        # Calculate image dimensions
+        num_rows = len(labels)
+        image_width = self.__header_width + self.__cell_width
+        image_height = self.__cell_height * num_rows
+
+        template = Image.new(self.__mode, (image_width, image_height), self.__background_color)
+        draw = ImageDraw.Draw(template)
+
+        # Draw borders
+        for i in range(num_rows + 1):
+            y = i * self.__cell_height
+            draw.line([(0, y), (image_width, y)], fill=self.__border_color, width=2)
+        draw.line([(self.__header_width, 0), (self.__header_width, image_height)], fill=self.__border_color, width=2)
+
+        # Draw labels
+        for row_index, label in enumerate(labels):
+            draw.text((10, row_index * self.__cell_height + 10), label, font=self.__font_label, fill=self.__label_color)
+
+        self.__templates[labels] = template
+        return template
+
+    def encode(self, image: Image.Image) -> bytes:
+        """
+        Encode an image in the renderer's format.
+        """
+        output = BytesIO()
+        if self.__image_format == 'JPEG':
+            image.convert('RGB').save(output, format='JPEG')
+        else:
+            image.save(output, format='PNG', compress_level=self.__compress_level)
+        return output.getvalue()
+
+    def render(self, data: Dict[str, Any], encode: bool = True) -> Union[bytes, Image.Image]:
+        """
+        Render a ZNS image displaying provided field labels and values.
+
+        Args:
+            data (Dict[str, Any]): Dictionary of labels and values to display.
+            encode (bool, optional): Return the encoded image instead of the PIL image. Defaults to True.
+
+        Returns:
+            Union[bytes, Image.Image]: The encoded image, or the PIL image when encode is False.
+        """
+        image = self.__template(tuple(data.keys())).copy()
+        draw = ImageDraw.Draw(image)
+
+        # Draw values (wrapped text)
+        for row_index, value in enumerate(data.values()):
+            wrapped_text = textwrap.fill(str(value), width=40)
+            draw.text(
+                (self.__header_width + 10, row_index * self.__cell_height + 10),
+                wrapped_text,
+                font=self.__font_text,
+                fill=self.__text_color
+            )
+
+        return self.encode(image) if encode else image
+
+    def render_many(self, items: List[Dict[str, Any]]) -> List[bytes]:
+        """
+        Render many ZNS images in the current process, reusing the fonts and the templates of the renderer.
+
+        Args:
+            items (List[Dict[str, Any]]): The labels and values of each image.
+
+        Returns:
+            List[bytes]: The encoded images, in the order of the items.
+        """
+        return [self.render(data) for data in items]
+
+
+@lru_cache(maxsize=None)
+def get_zns_renderer(**options) -> ZNSImageRenderer:
+    """
+    Get the renderer for the options, shared by the whole process.
+    """
+    return ZNSImageRenderer(**options)
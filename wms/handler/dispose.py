@@ -1,55 +1,42 @@
 import logging
 from datetime import datetime
+from functools import partial
+from typing import List
 
 from simple_history.utils import bulk_create_with_history
 
-from opv2.base.wms import WMSBin, WMSOrderStatus, WMSAction
+from opv2.base.wms import WMSAction
 from opv2.services import WMSService
+from .snapshot import PendingPickSnapshot, SHEIN_SHIPPER_ID
 from ..models import DisposeOrders
 
 logger = logging.getLogger(__name__)
 
 
-def wms_dispose():
+def dispose_orders(tracking_ids: List[str], wms: WMSService = None):
     """
         Process :
 
-                1. Get SHEIN orders to dispose
-                2. Pick orders
-                3. Pack orders
-                4. Update to database
-    """
-
-    # Get SHEIN orders to dispose :
-    #     - global_shipper_id = 7512979
-    #     - status = PENDING_PICK
-    #     - pick action = DISPOSE
-    #     - bin_id in WH HCM bins
-    wms = WMSService()
-    code_pp, response_pp = wms.load_orders_by_status(status=[WMSOrderStatus.pending_pick.value])
-    pending_pick_orders = response_pp.get("parcels")
-
-    current_bin_ids = [
-        bin[0] for bin in WMSBin.choices
-    ]
-
-    shein_orders = [
-        order["tracking_id"] for order in pending_pick_orders if order["global_shipper_id"] == 7512979 and order["pick_action"] == "DISPOSE" and order["bin_id"] in current_bin_ids
-    ]
+                1. Pick orders
+                2. Pack orders
+                3. Update to database
 
-    if not shein_orders:
+    Raises:
+        Exception: If the pick, the session, the bag or the pack failed, the group is kept for the next task.
+    """
+    if not tracking_ids:
         logger.info("No SHEIN orders to dispose")
         logger.warning("STOP AT COLLECT PENDING PICK PROCESS!")
         return
 
-    logger.info(f"Found SHEIN {len(shein_orders)} orders to dispose")
+    logger.info(f"Found SHEIN {len(tracking_ids)} orders to dispose")
+    wms = wms or WMSService()
 
     # Pick SHEIN orders
-    code_pick, response_pick = wms.pick_orders(tracking_ids=shein_orders)
+    code_pick, response_pick = wms.pick_orders(tracking_ids=tracking_ids)
     if code_pick != 200:
-        logger.error(f"Unable to pick DISPOSE orders : {response_pick}")
         logger.warning("STOP AT PICK PROCESS!")
-        return
+        raise Exception(f"Unable to pick DISPOSE orders : {response_pick}")
 
     success_picked = response_pick.get("success")
     failed_picked = response_pick.get("failed")
@@ -58,10 +45,16 @@ def wms_dispose():
 
     # Create dispose session
     code_session, dispose_session = wms.create_session(action=WMSAction.dispose)
+    if code_session not in (200, 201):
+        logger.warning("STOP AT SESSION PROCESS!")
+        raise Exception(f"Unable to create DISPOSE session : {dispose_session}")
     logger.info(f"Dispose's Session created : {dispose_session}")
 
     # Create dispose bag
     code_bag, dispose_bag = wms.create_bag()
+    if code_bag not in (200, 201):
+        logger.warning("STOP AT BAG PROCESS!")
+        raise Exception(f"Unable to create DISPOSE bag : {dispose_bag}")
     logger.info(f"Reship's Bag created : {dispose_bag}")
 
     # Pack SHEIN orders
@@ -72,9 +65,8 @@ def wms_dispose():
         bag=dispose_bag
     )
     if code_pack != 200:
-        logger.error(f"Unable to pick DISPOSE orders : {response_pack}")
         logger.warning("STOP AT PACK PROCESS!")
-        return
+        raise Exception(f"Unable to pack DISPOSE orders : {response_pack}")
 
     success_packed = response_pack.get("success")
     failed_packed = response_pack.get("failed")
@@ -83,21 +75,18 @@ def wms_dispose():
 
     # Update packed orders to DB
     if success_packed:
-        new_record = []
-        for index, tracking_id in success_packed:
-            code_info, wms_info = wms.load_order_by_tracking_id(tracking_id)
-            try:
-                new_record.append(
-                    DisposeOrders(
-                        date_input=datetime.today().strftime("%Y-%m-%d"),
-                        tracking_id=tracking_id,
-                        bag_name=wms_info.get("bag_name"),
-                        bag_id=wms_info.get("bag_id"),
-                        session_id=wms_info.get("session_id")
-                    )
-                )
-            except Exception:
-                logger.error(f"Error when creating new record: Row {index + 1}")
+        # Load bag info of all packed orders at once
+        packed_info = wms.load_orders_by_tracking_ids(success_packed)
+        new_record = [
+            DisposeOrders(
+                date_input=datetime.today().strftime("%Y-%m-%d"),
+                tracking_id=tracking_id,
+                bag_name=packed_info[tracking_id].get("bag_name"),
+                bag_id=packed_info[tracking_id].get("bag_id"),
+                session_id=packed_info[tracking_id].get("session_id")
+            )
+            for tracking_id in success_packed if tracking_id in packed_info
+        ]
         if new_record:
             creator = bulk_create_with_history(new_record, DisposeOrders)
             logger.info(f"Created {len(creator)} new records")
@@ -110,3 +99,16 @@ def wms_dispose():
         logger.info(f'Closed session {dispose_session.get("id")}')
     else:
         logger.error(f'Fail to close session {dispose_session.get("id")}')
+
+
+def wms_dispose():
+    """
+    Dispose the SHEIN orders of the pending pick snapshot :
+        - global_shipper_id = 7512979
+        - status = PENDING_PICK
+        - pick action = DISPOSE
+        - bin_id in WH HCM bins
+    """
+    wms = WMSService()
+    snapshot = PendingPickSnapshot(wms)
+    snapshot.process(SHEIN_SHIPPER_ID, WMSAction.dispose.action, partial(dispose_orders, wms=wms))
@@ -0,0 +1,44 @@
+import logging
+from functools import partial
+
+from core.base.memory import check_memory_budget, memory_budget
+from opv2.base.wms import WMSAction
+from opv2.services import WMSService
+from .dispose import dispose_orders
+from .relabel import relabel_orders
+from .snapshot import PendingPickSnapshot, SHEIN_SHIPPER_ID
+
+logger = logging.getLogger(__name__)
+
+# Processor of each SHEIN pick action group
+PICK_ACTION_PROCESSORS = {
+    WMSAction.dispose.action: dispose_orders,
+    WMSAction.relabel.action: relabel_orders,
+}
+
+
+@memory_budget(1024)
+def wms_process_pending_pick():
+    """
+    Download the pending pick snapshot once and route each SHEIN pick action group to its processor.
+
+    Raises:
+        MemoryBudgetExceeded: If the pending pick list did not fit in the budget, before any group is processed.
+        Exception: If a processor failed, after all the groups were processed.
+    """
+    wms = WMSService()
+    snapshot = PendingPickSnapshot(wms)
+    snapshot.refresh()
+    check_memory_budget()
+
+    failed_actions = []
+    for pick_action, processor in PICK_ACTION_PROCESSORS.items():
+        try:
+            snapshot.process(SHEIN_SHIPPER_ID, pick_action, partial(processor, wms=wms))
+        except Exception as e:
+            # Keep processing the other groups, the task still fails at the end
+            logger.error(f"Failed to process {pick_action} orders: {e}")
+            failed_actions.append(pick_action)
+
+    if failed_actions:
+        raise Exception(f"Failed to process pending pick actions: {failed_actions}")
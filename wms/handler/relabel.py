@@ -1,60 +1,42 @@
 import logging
 from datetime import datetime
+from functools import partial
+from typing import List
 
 from simple_history.utils import bulk_create_with_history
 
-from opv2.base.wms import WMSBin, WMSOrderStatus, WMSAction
+from opv2.base.wms import WMSAction
 from opv2.services import WMSService
+from .snapshot import PendingPickSnapshot, SHEIN_SHIPPER_ID
 from ..models import RelabelOrders
 
 logger = logging.getLogger(__name__)
 
 
-def wms_relabel():
+def relabel_orders(tracking_ids: List[str], wms: WMSService = None):
     """
         Process :
 
-                1. Get SHEIN orders to relabel
-                2. Pick orders
-                3. Pack orders
-                4. Update to database
-    """
+                1. Pick orders
+                2. Pack orders
+                3. Update to database
 
-    # Get SHEIN orders to relabel :
-    #     - global_shipper_id = 7512979
-    #     - status = PENDING_PICK
-    #     - pick action = RELABEL
-    #     - bin_id in WH HCM bins
-    wms = WMSService()
-    code_pp, response_pp = wms.load_orders_by_status(status=[WMSOrderStatus.pending_pick.value])
-    pending_pick_orders = response_pp.get("parcels")
-    logger.info(f"Found {len(pending_pick_orders)} Pending Pick orders ")
-    if not pending_pick_orders:
-        logger.info("No Pending Pick orders")
-        logger.warning("STOP AT COLLECT PENDING PICK PROCESS!")
-        return
-
-    current_bin_ids = [
-        bin[0] for bin in WMSBin.choices
-    ]
-
-    shein_orders = [
-        order["tracking_id"] for order in pending_pick_orders if order["global_shipper_id"] == 7512979 and order["pick_action"] == "RELABEL" and order["bin_id"] in current_bin_ids
-    ]
-
-    if not shein_orders:
+    Raises:
+        Exception: If the pick, the session or the pack failed, the group is kept for the next task.
+    """
+    if not tracking_ids:
         logger.info("No SHEIN orders to relabel")
         logger.warning("STOP AT COLLECT PENDING PICK PROCESS!")
         return
 
-    logger.info(f"Found SHEIN {len(shein_orders)} orders to relabel")
+    logger.info(f"Found SHEIN {len(tracking_ids)} orders to relabel")
+    wms = wms or WMSService()
 
     # Pick SHEIN orders
-    code_pick, response_pick = wms.pick_orders(tracking_ids=shein_orders)
+    code_pick, response_pick = wms.pick_orders(tracking_ids=tracking_ids)
     if code_pick != 200:
-        logger.error(f"Unable to pick RELABEL orders : {response_pick}")
         logger.warning("STOP AT PICK PROCESS!")
-        return
+        raise Exception(f"Unable to pick RELABEL orders : {response_pick}")
 
     success_picked = response_pick.get("success")
     failed_picked = response_pick.get("failed")
@@ -63,6 +45,9 @@ def wms_relabel():
 
     # Create relabel session
     code_session, relabel_session = wms.create_session(action=WMSAction.relabel)
+    if code_session not in (200, 201):
+        logger.warning("STOP AT SESSION PROCESS!")
+        raise Exception(f"Unable to create RELABEL session : {relabel_session}")
     logger.info(f"Relabel's Session created : {relabel_session}")
 
     # Pack SHEIN orders
@@ -72,9 +57,8 @@ def wms_relabel():
         session=relabel_session
     )
     if code_pack != 200:
-        logger.error(f"Unable to pick RELABEL orders : {response_pack}")
         logger.warning("STOP AT PACK PROCESS!")
-        return
+        raise Exception(f"Unable to pack RELABEL orders : {response_pack}")
 
     success_packed = response_pack.get("success")
     failed_packed = response_pack.get("failed")
@@ -83,28 +67,38 @@ def wms_relabel():
 
     # Update packed orders to DB
     if success_packed:
-        new_record = []
-        for index, tracking_id in success_packed:
-            code_info, wms_info = wms.load_order_by_tracking_id(tracking_id)
-            try:
-                new_record.append(
-                    RelabelOrders(
-                        date_input=datetime.today().strftime("%Y-%m-%d"),
-                        tracking_id=tracking_id,
-                        relabel_tracking_id=wms_info.get("relabel_tid")
-                    )
-                )
-            except Exception as e:
-                logger.error(f"Error when creating new record: Row {index + 1}: {e}")
+        # Load relabel info of all packed orders at once
+        packed_info = wms.load_orders_by_tracking_ids(success_packed)
+        new_record = [
+            RelabelOrders(
+                date_input=datetime.today().strftime("%Y-%m-%d"),
+                tracking_id=tracking_id,
+                relabel_tracking_id=packed_info[tracking_id].get("relabel_tid")
+            )
+            for tracking_id in success_packed if tracking_id in packed_info
+        ]
         if new_record:
             creator = bulk_create_with_history(new_record, RelabelOrders)
             logger.info(f"Created {len(creator)} new records")
         else:
             logger.info("No new records to add to the database")
 
-    # Close relabel sessio
+    # Close relabel session
     code_close, response_close = wms.close_session(relabel_session.get("id"))
     if code_close == 200:
         logger.info(f'Closed session {relabel_session.get("id")}')
     else:
         logger.error(f'Fail to close session {relabel_session.get("id")}')
+
+
+def wms_relabel():
+    """
+    Relabel the SHEIN orders of the pending pick snapshot :
+        - global_shipper_id = 7512979
+        - status = PENDING_PICK
+        - pick action = RELABEL
+        - bin_id in WH HCM bins
+    """
+    wms = WMSService()
+    snapshot = PendingPickSnapshot(wms)
+    snapshot.process(SHEIN_SHIPPER_ID, WMSAction.relabel.action, partial(relabel_orders, wms=wms))
@@ -0,0 +1,118 @@
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from django.core.cache import cache
+
+from opv2.base.wms import WMSBin, WMSOrderStatus
+from opv2.services import WMSService
+
+logger = logging.getLogger(__name__)
+
+SHEIN_SHIPPER_ID = 7512979
+
+SNAPSHOT_LOADED_CACHE_KEY = 'wms_pending_pick_snapshot'
+SNAPSHOT_GROUP_CACHE_KEY = 'wms_pending_pick_{shipper_id}_{pick_action}'
+SNAPSHOT_CLAIM_CACHE_KEY = 'wms_pending_pick_claim_{shipper_id}_{pick_action}'
+SNAPSHOT_TIMEOUT = 60 * 10  # 10 minutes, one processing cycle
+
+
+class PendingPickSnapshot:
+    """
+    Snapshot of the WMS pending pick parcels in the WH HCM bins, indexed by shipper and pick action.
+
+    The warehouse pending pick list is downloaded once per cycle and only the tracking ids are kept,
+    one cache entry per (shipper, pick action) group. Every task of the cycle reads its own group
+    instead of downloading and filtering the whole list again. A group is processed by one task at a time.
+    """
+
+    def __init__(self, wms: WMSService = None):
+        self.__wms = wms or WMSService(logger=logger)
+
+    @staticmethod
+    def __group_key(shipper_id: int, pick_action: str) -> str:
+        return SNAPSHOT_GROUP_CACHE_KEY.format(shipper_id=shipper_id, pick_action=pick_action)
+
+    @staticmethod
+    def __claim_key(shipper_id: int, pick_action: str) -> str:
+        return SNAPSHOT_CLAIM_CACHE_KEY.format(shipper_id=shipper_id, pick_action=pick_action)
+
+    def refresh(self) -> Dict[Tuple[int, str], List[str]]:
+        """
+        Download the pending pick parcels and index them by shipper and pick action.
+
+        Returns:
+            Dict[Tuple[int, str], List[str]]: Tracking ids by (shipper id, pick action).
+        """
+        code, response = self.__wms.load_orders_by_status(status=[WMSOrderStatus.pending_pick.value])
+        if code != 200:
+            logger.error(f"Unable to load Pending Pick orders : {response}")
+            return {}
+
+        parcels = response.get("parcels") or []
+        logger.info(f"Found {len(parcels)} Pending Pick orders")
+
+        # Drop the groups of the previous snapshot, they may have no parcel anymore
+        previous_groups = cache.get(SNAPSHOT_LOADED_CACHE_KEY) or []
+        cache.delete_many([self.__group_key(shipper_id, pick_action) for shipper_id, pick_action in previous_groups])
+
+        current_bin_ids = set(WMSBin.values)
+        index = defaultdict(list)
+        for parcel in parcels:
+            if parcel.get("bin_id") in current_bin_ids:
+                index[(parcel.get("global_shipper_id"), parcel.get("pick_action"))].append(parcel["tracking_id"])
+
+        cache.set_many(
+            {self.__group_key(shipper_id, pick_action): tracking_ids for (shipper_id, pick_action), tracking_ids in index.items()},
+            timeout=SNAPSHOT_TIMEOUT
+        )
+        # Set last, a group without entry in a loaded snapshot has no parcel
+        cache.set(SNAPSHOT_LOADED_CACHE_KEY, list(index.keys()), timeout=SNAPSHOT_TIMEOUT)
+
+        return dict(index)
+
+    def get(self, shipper_id: int, pick_action: str) -> List[str]:
+        """
+        Get the tracking ids of a group, downloading the snapshot if the cycle has none yet.
+
+        Args:
+            shipper_id (int): Global shipper id.
+            pick_action (str): WMS pick action, e.g. DISPOSE.
+
+        Returns:
+            List[str]: The tracking ids of the group.
+        """
+        if cache.get(SNAPSHOT_LOADED_CACHE_KEY) is None:
+            return self.refresh().get((shipper_id, pick_action), [])
+
+        return cache.get(self.__group_key(shipper_id, pick_action), [])
+
+    def process(self, shipper_id: int, pick_action: str, processor: Callable[[List[str]], None]) -> bool:
+        """
+        Claim a group, process its tracking ids, then remove it from the snapshot.
+
+        The claim is taken atomically, a group is never picked and packed by two tasks at once. A failed
+        processing releases the claim and keeps the group, the next task retries it.
+
+        Args:
+            shipper_id (int): Global shipper id.
+            pick_action (str): WMS pick action, e.g. DISPOSE.
+            processor (Callable[[List[str]], None]): Processes the tracking ids, raises on failure.
+
+        Returns:
+            bool: True if the group was processed, False if another task holds it.
+        """
+        claim_key = self.__claim_key(shipper_id, pick_action)
+        if not cache.add(claim_key, True, timeout=SNAPSHOT_TIMEOUT):
+            logger.info(f"Pending pick {pick_action} orders of shipper {shipper_id} are processed by another task")
+            return False
+
+        try:
+            processor(self.get(shipper_id, pick_action))
+        except Exception:
+            cache.delete(claim_key)
+            raise
+
+        # The parcels of the group are leaving the pending pick status
+        cache.delete_many([self.__group_key(shipper_id, pick_action), claim_key])
+        return True
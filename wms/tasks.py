@@ -8,6 +8,7 @@ from .handler.collect_data import (
     update_wms_info
 )
 from .handler.dispose import wms_dispose
+from .handler.pending_pick import wms_process_pending_pick
 from .handler.putaway import wms_putaway
 from .handler.relabel import wms_relabel
 
@@ -41,3 +42,9 @@ def dispose():
 def relabel():
     wms_relabel()
     collect_data.apply_async()
+
+
+@shared_task(name="WMS Pending Pick", base=STOsQueueOnce, once={'graceful': True})
+def pending_pick():
+    wms_process_pending_pick()
+    collect_data.apply_async()